@@ -0,0 +1 @@
+"""Synthetic data generator (benchmarks.synth) and query timing harness (benchmarks.harness)."""
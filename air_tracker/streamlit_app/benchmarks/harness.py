@@ -0,0 +1,328 @@
+"""Time every dashboard query against a database and flag regressions.
+
+Every statement the pages run is benchmarked: the ``core.queries``
+registry (with the parameters the pages pass, read from their source) plus
+representative pages of the Flights table. For each one the harness records
+
+* cold: first execution on a fresh connection (empty SQLite page cache),
+* warm: ``--repeat`` executions on one connection, as p50 / p95,
+* rows returned and the process peak RSS after the query.
+
+``--pages`` also times whole page scripts through Streamlit's AppTest,
+cold (caches cleared) and warm (result cache hits). ``--window`` times the
+windowed queries in one of the preset time windows (see core.window)
+instead of over all of history.
+
+    python -m benchmarks.harness --db /tmp/bench_1m.db --out results/base.json
+    python -m benchmarks.harness --db /tmp/bench_1m.db --compare results/base.json
+
+With ``--compare`` the exit status is 1 when any timing is more than
+``--tolerance`` slower (and at least ``--min-ms`` slower) than the baseline.
+"""
+import argparse
+import ast
+import json
+from datetime import date
+import os
+import platform
+import re
+import resource
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+
+import numpy as np
+
+from core.queries import COLUMNAR_QUERIES, QUERIES, WINDOWED, flights_table_query
+from core.window import PRESETS, preset
+
+APP_DIR = Path(__file__).resolve().parent.parent
+PAGES = [APP_DIR / "app.py", *sorted((APP_DIR / "pages").glob("*.py"))]
+
+# Parameters for calls whose arguments are not literals in the page source.
+DEFAULT_PARAMS = {
+    "dim_values": [["airline"], ["status"], ["origin"]],
+    "delay_sketches": [["all"], ["origin"]],
+}
+
+CALL_RE = re.compile(r'\b(?:load|scalar)\(\s*"(\w+)"\s*(?:,\s*(\[[^\]]*\]))?')
+# ("name", *params) datasets declared in a page's snapshot(...).
+SNAPSHOT_RE = re.compile(r'\(\s*"(\w+)"\s*,\s*([^()]+?)\s*\)')
+
+
+# ======================================================
+# CASES
+# ======================================================
+def own_params(name):
+    """Params a page passes to a named query (the window's come first)."""
+    sql = QUERIES.get(name, "")
+    return sql.count("?") - (2 if name in WINDOWED else 0)
+
+
+def page_calls():
+    """{query name: (pages using it, [literal params seen])}."""
+    calls = {}
+    for page in PAGES:
+        source = page.read_text(encoding="utf-8")
+        rel = str(page.relative_to(APP_DIR))
+        for name in QUERIES:
+            if re.search(rf"\b{name}\b", source):
+                calls.setdefault(name, (set(), []))[0].add(rel)
+        found = CALL_RE.findall(source) + [
+            (name, f"[{args}]") for name, args in SNAPSHOT_RE.findall(source)
+            if own_params(name)
+        ]
+        for name, args in found:
+            if not args or name not in QUERIES:
+                continue
+            try:
+                params = ast.literal_eval(args)
+            except (ValueError, SyntaxError):
+                continue  # a variable; see DEFAULT_PARAMS / busiest airport
+            if params not in calls[name][1]:
+                calls[name][1].append(params)
+    return calls
+
+
+def cases(conn, window="All time"):
+    """(case name, sql, params, pages, columnar?) for every page query;
+    windowed queries get the ``window`` preset's params first."""
+    (last_day,) = conn.execute(
+        "SELECT date(MAX(scheduled_time)) FROM flight_facts"
+    ).fetchone()
+    window = preset(window, last_day and date.fromisoformat(last_day))
+    busiest = conn.execute(
+        "SELECT origin_iata FROM flights WHERE origin_iata IS NOT NULL "
+        "GROUP BY origin_iata ORDER BY COUNT(*) DESC LIMIT 1"
+    ).fetchone()
+    defaults = dict(
+        DEFAULT_PARAMS, linked_flights=[[busiest[0] if busiest else ""]]
+    )
+
+    out = []
+    for name, (pages, seen) in sorted(page_calls().items()):
+        # A page can pass literals in one place and variables in another.
+        variants = seen + [
+            p for p in defaults.get(name, []) if p not in seen
+        ] or [[]]
+        for params in variants:
+            label = f"{name}{params}" if params else name
+            if name in WINDOWED:
+                params = [*window.params(WINDOWED[name]), *params]
+            out.append((label, QUERIES[name], params, sorted(pages),
+                        name in COLUMNAR_QUERIES))
+
+    # The Flights table: first page, a deep keyset page, a filtered page.
+    total = conn.execute("SELECT COUNT(*) FROM flights").fetchone()[0]
+    middle = conn.execute(
+        "SELECT scheduled_time, flight_id FROM flights "
+        "ORDER BY scheduled_time DESC, flight_id DESC LIMIT 1 OFFSET ?",
+        (max(total // 2, 0),),
+    ).fetchone()
+    for label, kwargs in (
+        ("flights_table[page 1]", {}),
+        ("flights_table[deep page]",
+         {"after": tuple(middle) if middle else None}),
+        ("flights_table[status=Delayed]", {"status": "Delayed"}),
+    ):
+        sql, params = flights_table_query(limit=101, **kwargs)
+        out.append((label, sql, params, ["pages/2_Flights.py"], False))
+    return out
+
+
+# ======================================================
+# TIMING
+# ======================================================
+def peak_rss_kb():
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss  # bytes on macOS
+
+
+def _stats(samples):
+    ms = np.array(samples) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(ms, 50)), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+    }
+
+
+def time_queries(db_path, repeat=20, backend="sqlite", window="All time"):
+    import pandas as pd
+
+    from core import columnar, db
+
+    def open_conn():
+        if backend == "duckdb":
+            return columnar.connect_duckdb()
+        return db.connect(db_path, read_only=True)
+
+    def execute(conn, sql, params, columnar_ok):
+        if backend == "duckdb" and columnar_ok:
+            return columnar.read(conn.cursor(), sql, params)
+        return pd.read_sql(sql, sqlite_conn, params=list(params))
+
+    sqlite_conn = db.connect(db_path, read_only=True)
+    results = {}
+    for label, sql, params, pages, columnar_ok in cases(sqlite_conn, window):
+        # Cold: a new connection, so nothing is in SQLite's page cache.
+        sqlite_conn.close()
+        sqlite_conn = db.connect(db_path, read_only=True)
+        conn = open_conn() if backend == "duckdb" else sqlite_conn
+        started = time.perf_counter()
+        df = execute(conn, sql, params, columnar_ok)
+        cold = time.perf_counter() - started
+
+        warm = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            execute(conn, sql, params, columnar_ok)
+            warm.append(time.perf_counter() - started)
+        if conn is not sqlite_conn:
+            conn.close()
+
+        results[label] = {
+            "pages": pages,
+            "backend": backend if columnar_ok else "sqlite",
+            "rows": len(df),
+            "cold_ms": round(cold * 1000, 3),
+            **_stats(warm),
+            "peak_rss_kb": peak_rss_kb(),
+        }
+        print(f"{label:<40} {len(df):>8} rows  cold {cold * 1000:9.2f} ms  "
+              f"p50 {results[label]['p50_ms']:9.2f} ms")
+    sqlite_conn.close()
+    return results
+
+
+def time_pages(repeat=5):
+    """Whole-page reruns; needs streamlit (AppTest) and AIR_TRACKER_DB set."""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    results = {}
+    for page in PAGES:
+        rel = str(page.relative_to(APP_DIR))
+        st.cache_data.clear()
+        st.cache_resource.clear()
+        samples = []
+        for _ in range(repeat + 1):
+            at = AppTest.from_file(str(page), default_timeout=600)
+            started = time.perf_counter()
+            at.run()
+            samples.append(time.perf_counter() - started)
+            if at.exception:
+                raise RuntimeError(f"{rel}: {at.exception[0].message}")
+        results[rel] = {
+            "cold_ms": round(samples[0] * 1000, 3),
+            **_stats(samples[1:]),
+            "peak_rss_kb": peak_rss_kb(),
+        }
+        print(f"{rel:<40} cold {samples[0] * 1000:9.2f} ms  "
+              f"p50 {results[rel]['p50_ms']:9.2f} ms")
+    return results
+
+
+# ======================================================
+# REPORT / COMPARE
+# ======================================================
+def metadata(db_path, backend, repeat, window):
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    try:
+        flights = conn.execute("SELECT COUNT(*) FROM flights").fetchone()[0]
+        airports = conn.execute("SELECT COUNT(*) FROM airport").fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "db": str(db_path),
+        "flights": flights,
+        "airports": airports,
+        "backend": backend,
+        "window": window,
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "machine": platform.platform(),
+    }
+
+
+def compare(current, baseline, tolerance=0.2, min_ms=1.0):
+    """Return [(section, name, metric, old, new)] slower than allowed."""
+    regressions = []
+    for section in ("queries", "pages"):
+        for name, new in current.get(section, {}).items():
+            old = baseline.get(section, {}).get(name)
+            if old is None:
+                continue
+            for metric in ("cold_ms", "p50_ms", "p95_ms"):
+                before, after = old.get(metric), new.get(metric)
+                if before is None or after is None:
+                    continue
+                if after > before * (1 + tolerance) and after - before >= min_ms:
+                    regressions.append((section, name, metric, before, after))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", required=True, help="SQLite database to time")
+    parser.add_argument("--repeat", type=int, default=20,
+                        help="warm executions per query")
+    parser.add_argument("--backend", choices=["sqlite", "duckdb"],
+                        default="sqlite")
+    parser.add_argument("--window", choices=list(PRESETS), default="All time",
+                        help="time window of the windowed queries")
+    parser.add_argument("--pages", action="store_true",
+                        help="also time whole pages through Streamlit AppTest")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON to check against")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed slowdown as a fraction (default 0.2)")
+    parser.add_argument("--min-ms", type=float, default=1.0,
+                        help="ignore slowdowns smaller than this")
+    args = parser.parse_args(argv)
+
+    # The pages resolve the database from the environment at import time.
+    os.environ["AIR_TRACKER_DB"] = str(Path(args.db).resolve())
+    os.environ["AIR_TRACKER_BACKEND"] = args.backend
+
+    results = {
+        "meta": metadata(args.db, args.backend, args.repeat, args.window),
+        "queries": time_queries(
+            args.db, args.repeat, args.backend, args.window
+        ),
+    }
+    if args.pages:
+        results["pages"] = time_pages()
+    results["peak_rss_kb"] = peak_rss_kb()
+    print(f"peak RSS {results['peak_rss_kb'] / 1024:.1f} MiB")
+
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(results, indent=2) + "\n")
+        print(f"results written to {args.out}")
+
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        regressions = compare(results, baseline, args.tolerance, args.min_ms)
+        for section, name, metric, before, after in regressions:
+            print(f"REGRESSION {section}/{name} {metric}: "
+                  f"{before:.2f} -> {after:.2f} ms")
+        if regressions:
+            raise SystemExit(1)
+        print(f"no regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,277 @@
+"""Load-test the HTTP API (core.api) and report requests/sec per core.
+
+Starts ``python -m core.api`` on a database (or targets a running one with
+``--url``), keeps ``--concurrency`` requests in flight for ``--duration``
+seconds over a mix of the endpoints the pages' datasets map to, and reports
+throughput, latency percentiles, status codes and cache hits per endpoint.
+
+For a server it started, the load generator also reads the CPU time its
+processes used during the run (Linux ``/proc``). Requests per CPU-second is
+what one core sustains, however many ``--workers`` shared the load.
+
+    python -m benchmarks.load --db /tmp/bench_1m.db --workers 2
+    python -m benchmarks.load --db /tmp/bench_1m.db --no-cache
+    python -m benchmarks.load --db /tmp/bench_1m.db --revalidate
+    python -m benchmarks.load --url http://10.0.0.5:8000 --duration 30
+
+``--no-cache`` adds a unique param to every request, so none is answered
+from the response cache. ``--revalidate`` makes each client keep the ETag of
+every endpoint, as an HTTP cache would, so unchanged data costs a 304.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from collections import Counter, defaultdict
+from datetime import datetime, timezone
+from pathlib import Path
+
+import aiohttp
+import numpy as np
+
+APP_DIR = Path(__file__).resolve().parent.parent
+
+# One request per dataset family, as the pages would ask for them.
+MIX = [
+    "/datasets/flight_kpis",
+    "/datasets/status_counts",
+    "/datasets/top_airlines?limit=5",
+    "/datasets/delay_kpis?window=Last+7+days",
+    "/datasets/delay_leaderboard",
+    "/datasets/airport_traffic",
+    "/flights?limit=100",
+    "/flights?limit=100&window=Last+7+days&status=Delayed",
+    "/delays?group_by=airline&min_flights=5",
+    "/delays/histogram?window=Last+30+days",
+    "/delays/percentiles?per=airport",
+    "/routes/top?n=20",
+    "/routes/hubs",
+    "/fleet/utilization",
+    "/airports/bins?region=World",
+]
+
+
+# ======================================================
+# SERVER
+# ======================================================
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(db_path, workers, port):
+    server = subprocess.Popen(
+        [sys.executable, "-m", "core.api", "--db", str(db_path),
+         "--port", str(port), "--workers", str(workers)],
+        cwd=APP_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise SystemExit(
+                "core.api exited:\n" + server.stderr.read().decode()
+            )
+        try:
+            with socket.create_connection(("127.0.0.1", port), timeout=1):
+                return server, url
+        except OSError:
+            time.sleep(0.2)
+    server.kill()
+    raise SystemExit("core.api did not start within 60 s")
+
+
+def cpu_seconds(pid):
+    """User + system CPU time of ``pid`` and its descendants, or None
+    without ``/proc``."""
+    ticks = os.sysconf("SC_CLK_TCK")
+    stats = {}
+    try:
+        for entry in os.listdir("/proc"):
+            if entry.isdigit():
+                try:
+                    text = Path(f"/proc/{entry}/stat").read_text()
+                except OSError:
+                    continue
+                # Fields after the parenthesized command name.
+                fields = text.rsplit(")", 1)[1].split()
+                stats[int(entry)] = (int(fields[1]), int(fields[11])
+                                     + int(fields[12]))
+    except FileNotFoundError:
+        return None
+    # uvicorn's supervisor and the worker processes it spawned.
+    tree = {pid}
+    while True:
+        grown = tree | {p for p, (ppid, _) in stats.items() if ppid in tree}
+        if grown == tree:
+            break
+        tree = grown
+    return sum(stats[p][1] for p in tree if p in stats) / ticks
+
+
+# ======================================================
+# LOAD
+# ======================================================
+async def client(session, url, paths, offset, deadline, args, results):
+    etags = {}
+    n = offset
+    while time.monotonic() < deadline:
+        path = paths[n % len(paths)]
+        n += 1
+        target = url + path
+        if args.no_cache:
+            target += ("&" if "?" in path else "?") + f"nonce={offset}-{n}"
+        headers = (
+            {"Accept": "application/vnd.apache.arrow.stream"}
+            if args.format == "arrow" else {}
+        )
+        if args.revalidate and path in etags:
+            headers["If-None-Match"] = etags[path]
+        started = time.perf_counter()
+        try:
+            async with session.get(target, headers=headers) as response:
+                body = await response.read()
+                status = response.status
+                cache = response.headers.get("X-Cache", "")
+                if "ETag" in response.headers:
+                    etags[path] = response.headers["ETag"]
+        except aiohttp.ClientError as exc:
+            status, body, cache = type(exc).__name__, b"", ""
+        results[path].append(
+            (time.perf_counter() - started, status, len(body), cache)
+        )
+
+
+async def run_load(url, paths, args, pid=None):
+    """Warm up, then load for ``args.duration``; returns (samples per
+    path, seconds, CPU seconds of process ``pid`` and its children)."""
+    results = defaultdict(list)
+    connector = aiohttp.TCPConnector(limit=args.concurrency)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(
+        connector=connector, timeout=timeout
+    ) as session:
+        # Warm-up: every endpoint once, so the run measures steady state.
+        for path in paths:
+            async with session.get(url + path) as response:
+                await response.read()
+                if response.status != 200:
+                    raise SystemExit(f"{path}: HTTP {response.status}")
+        cpu = cpu_seconds(pid) if pid else None
+        started = time.monotonic()
+        deadline = started + args.duration
+        await asyncio.gather(*(
+            client(session, url, paths, i, deadline, args, results)
+            for i in range(args.concurrency)
+        ))
+        elapsed = time.monotonic() - started
+        if cpu is not None:
+            cpu = cpu_seconds(pid) - cpu
+    return results, elapsed, cpu
+
+
+def summarize(samples):
+    latency = np.array([s[0] for s in samples]) * 1000
+    return {
+        "requests": len(samples),
+        "p50_ms": round(float(np.percentile(latency, 50)), 2),
+        "p95_ms": round(float(np.percentile(latency, 95)), 2),
+        "p99_ms": round(float(np.percentile(latency, 99)), 2),
+        "bytes": int(sum(s[2] for s in samples)),
+        "status": dict(Counter(str(s[1]) for s in samples)),
+        "cache_hits": sum(s[3] == "hit" for s in samples),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--db", help="start core.api on this database")
+    target.add_argument("--url", help="load an already running server")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="worker processes of the started server")
+    parser.add_argument("--concurrency", type=int, default=32,
+                        help="requests in flight")
+    parser.add_argument("--duration", type=float, default=10,
+                        help="seconds of measured load")
+    parser.add_argument("--format", choices=["json", "arrow"], default="json")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="make every request miss the response cache")
+    parser.add_argument("--revalidate", action="store_true",
+                        help="send If-None-Match with the last ETag")
+    parser.add_argument("--path", action="append", dest="paths",
+                        help="request this path instead of the default mix "
+                             "(repeatable)")
+    parser.add_argument("--out", help="write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    paths = args.paths or MIX
+    server = None
+    if args.db:
+        server, url = start_server(
+            Path(args.db).resolve(), args.workers, free_port()
+        )
+    else:
+        url = args.url.rstrip("/")
+    try:
+        results, elapsed, cpu = asyncio.run(
+            run_load(url, paths, args, server and server.pid)
+        )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=30)
+
+    total = sum(len(samples) for samples in results.values())
+    report = {
+        "meta": {
+            "url": url,
+            "db": args.db,
+            "workers": args.workers if server else None,
+            "concurrency": args.concurrency,
+            "format": args.format,
+            "no_cache": args.no_cache,
+            "revalidate": args.revalidate,
+            "cpu_count": os.cpu_count(),
+            "python": platform.python_version(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+        },
+        "seconds": round(elapsed, 2),
+        "requests": total,
+        "requests_per_sec": round(total / elapsed, 1),
+        "server_cpu_seconds": cpu and round(cpu, 2),
+        "requests_per_core_sec": cpu and round(total / cpu, 1),
+        "overall": summarize(
+            [s for samples in results.values() for s in samples]
+        ),
+        "endpoints": {
+            path: summarize(samples) for path, samples in results.items()
+        },
+    }
+
+    for path, stats in report["endpoints"].items():
+        print(f"{path:<55} {stats['requests']:>7} req  "
+              f"p50 {stats['p50_ms']:>7.2f} ms  p95 {stats['p95_ms']:>7.2f} ms"
+              f"  hits {stats['cache_hits']:>6}  {stats['status']}")
+    overall = report["overall"]
+    print(f"{total} requests in {elapsed:.1f} s: "
+          f"{report['requests_per_sec']} req/s, "
+          f"p50 {overall['p50_ms']} ms, p99 {overall['p99_ms']} ms")
+    if cpu:
+        print(f"server CPU {cpu:.1f} s: "
+              f"{report['requests_per_core_sec']} req/s per core")
+
+    if args.out:
+        Path(args.out).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.out).write_text(json.dumps(report, indent=2) + "\n")
+        print(f"results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,209 @@
+"""Deterministic synthetic data in the shape of data/*.csv.
+
+Writes ``airports.csv``, ``aircraft.csv`` and ``flights.csv`` with the same
+columns as the AeroDataBox snapshots (the schema of _load_to_sql.ipynb),
+scaled to any size. The same ``--seed`` always produces byte-identical
+files, so benchmark runs on different machines or commits compare like for
+like. Flights are generated in fixed-size chunks, so 10M rows need no more
+memory than 10k.
+
+    python -m benchmarks.synth --flights 10k --out /tmp/bench_10k --db /tmp/bench_10k.db
+    python -m benchmarks.synth --flights 1m --airports 2000 --out /tmp/bench_1m
+    python -m benchmarks.synth --flights 10m --airports 5000 --days 365 --out /tmp/bench_10m
+
+With ``--db`` the files are loaded through core.ingest, like real data.
+"""
+import argparse
+import csv
+from pathlib import Path
+
+import numpy as np
+
+CHUNK_SIZE = 500_000
+START_DAY = np.datetime64("2026-01-01T00:00")
+
+# Shares taken from the bundled snapshot.
+STATUSES = {
+    "Expected": 0.69, "Arrived": 0.08, "Departed": 0.067, "Unknown": 0.05,
+    "Delayed": 0.033, "CheckIn": 0.03, "Boarding": 0.024, "GateClosed": 0.013,
+    "Canceled": 0.008, "Approaching": 0.005,
+}
+COUNTRIES = [
+    ("IN", "Asia", "Asia/Kolkata"), ("US", "North America", "America/New_York"),
+    ("GB", "Europe", "Europe/London"), ("AE", "Asia", "Asia/Dubai"),
+    ("SG", "Asia", "Asia/Singapore"), ("FR", "Europe", "Europe/Paris"),
+    ("JP", "Asia", "Asia/Tokyo"), ("AU", "Australia", "Australia/Sydney"),
+]
+MODELS = [
+    "A20N", "A21N", "B38M", "A320", "B738", "AT75", "A321", "B77W", "A359",
+    "B789", "A333", "E190",
+]
+AIRLINE_COUNT = 200
+AIRPORT_COLUMNS = [
+    "icao_code", "iata_code", "name", "city", "country", "continent",
+    "latitude", "longitude", "timezone",
+]
+AIRCRAFT_COLUMNS = [
+    "aircraft_id", "registration", "model", "manufacturer", "icao_type_code",
+    "owner",
+]
+FLIGHT_COLUMNS = [
+    "flight_number", "airline_name", "aircraft_registration", "origin_iata",
+    "destination_iata", "scheduled_time", "actual_time", "status",
+    "flight_type",
+]
+
+
+def parse_count(text):
+    """'10k' -> 10000, '1m' -> 1000000, '2500' -> 2500."""
+    text = str(text).strip().lower().replace("_", "")
+    scale = {"k": 1_000, "m": 1_000_000}.get(text[-1:], 1)
+    return int(float(text.rstrip("km")) * scale)
+
+
+def letters(index, width):
+    """Fixed-width base-26 code: 0 -> 'AAA', 1 -> 'AAB', ..."""
+    out = []
+    for _ in range(width):
+        index, rest = divmod(index, 26)
+        out.append(chr(ord("A") + rest))
+    return "".join(reversed(out))
+
+
+def zipf_weights(n, skew=1.1):
+    """Popularity weights: a few busy hubs and a long tail, like real traffic."""
+    w = 1.0 / np.arange(1, n + 1) ** skew
+    return w / w.sum()
+
+
+def airports(n, rng):
+    if n > 26 ** 3:
+        raise ValueError(f"at most {26 ** 3} airports (3-letter IATA codes)")
+    for i in range(n):
+        country, continent, tz = COUNTRIES[rng.integers(len(COUNTRIES))]
+        code = letters(i, 3)
+        yield (
+            "S" + code, code, f"Synthetic {code}", f"City {i}", country,
+            continent, round(rng.uniform(-60, 70), 6),
+            round(rng.uniform(-180, 180), 6), tz,
+        )
+
+
+def aircraft(n, airlines, rng):
+    for i in range(n):
+        model = MODELS[rng.integers(len(MODELS))]
+        owner = airlines[rng.integers(len(airlines))]
+        yield (i + 1, f"SY-{letters(i, 4)}", model, None, model, owner)
+
+
+def flight_chunk(start, stop, codes, airlines, regs, days, rng):
+    """CSV rows for flights ``start`` .. ``stop - 1`` (None for empty cells)."""
+    n = stop - start
+    airline = rng.choice(len(airlines), n, p=zipf_weights(len(airlines)))
+    weights = zipf_weights(len(codes))
+    origin = rng.choice(len(codes), n, p=weights)
+    destination = rng.choice(len(codes), n, p=weights)
+    destination = np.where(
+        destination == origin, (destination + 1) % len(codes), destination
+    )
+
+    # Five-minute slots across the requested number of days (UTC).
+    slot = rng.integers(0, days * 288, n)
+    scheduled = START_DAY + slot.astype("timedelta64[m]") * 5
+    delay = np.rint(rng.exponential(12.0, n) - 4).astype("timedelta64[m]")
+    actual = scheduled + delay
+    has_actual = rng.random(n) > 0.15
+
+    def stamp(values):
+        return [f"{s.replace('T', ' ')}Z" for s in
+                np.datetime_as_string(values, unit="m")]
+
+    status_names = list(STATUSES)
+    status_p = np.array(list(STATUSES.values()))
+    status = rng.choice(len(status_names), n, p=status_p / status_p.sum())
+    is_arrival = rng.random(n) < 0.5
+    reg = rng.integers(0, len(regs), n)
+    has_reg = rng.random(n) > 0.6
+
+    sched_text, actual_text = stamp(scheduled), stamp(actual)
+    return zip(
+        # Unique per row, so (flight_number, scheduled_time, flight_type)
+        # never collides and every row survives the upsert.
+        (f"{airlines[a][-2:]} {start + i + 1}"
+         for i, a in enumerate(airline)),
+        (airlines[a] for a in airline),
+        (regs[r] if ok else None for r, ok in zip(reg, has_reg)),
+        (codes[o] for o in origin),
+        (codes[d] for d in destination),
+        sched_text,
+        (a if ok else None for a, ok in zip(actual_text, has_actual)),
+        (status_names[s] for s in status),
+        ("arrival" if a else "departure" for a in is_arrival),
+    )
+
+
+def _write(path, header, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+def generate(out_dir, flights=10_000, airport_count=500, aircraft_count=None,
+             days=30, seed=42, log=print):
+    """Write the three CSVs into ``out_dir``; returns the directory."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    aircraft_count = aircraft_count or max(100, airport_count * 2)
+
+    airlines = [f"Airline {letters(i, 2)}" for i in range(AIRLINE_COUNT)]
+    airport_rows = list(airports(airport_count, rng))
+    aircraft_rows = list(aircraft(aircraft_count, airlines, rng))
+    _write(out_dir / "airports.csv", AIRPORT_COLUMNS, airport_rows)
+    _write(out_dir / "aircraft.csv", AIRCRAFT_COLUMNS, aircraft_rows)
+
+    codes = [row[1] for row in airport_rows]
+    regs = [row[1] for row in aircraft_rows]
+    with open(out_dir / "flights.csv", "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(FLIGHT_COLUMNS)
+        for start in range(0, flights, CHUNK_SIZE):
+            stop = min(start + CHUNK_SIZE, flights)
+            writer.writerows(
+                flight_chunk(start, stop, codes, airlines, regs, days, rng)
+            )
+            log(f"flights.csv: {stop}/{flights}")
+    return out_dir
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--flights", type=parse_count, default="10k",
+                        help="number of flights, e.g. 10k, 1m, 10m")
+    parser.add_argument("--airports", type=parse_count, default=500)
+    parser.add_argument("--aircraft", type=parse_count, default=None)
+    parser.add_argument("--days", type=int, default=30,
+                        help="days the schedule is spread over")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", required=True, help="directory for the CSVs")
+    parser.add_argument("--db", help="also load the CSVs into this database")
+    args = parser.parse_args(argv)
+
+    out_dir = generate(
+        args.out, args.flights, args.airports, args.aircraft, args.days,
+        args.seed,
+    )
+    if args.db:
+        from core import db
+        from core.ingest import ingest
+
+        conn = db.connect(args.db)
+        try:
+            ingest(conn, data_dir=out_dir)
+        finally:
+            conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1 @@
+"""Shared data-access and analytics code for the Air Tracker dashboard."""
@@ -0,0 +1,697 @@
+"""Headless HTTP API over the dashboard's datasets.
+
+Every metric used to exist only as SQL inside the Streamlit pages, so other
+services had to scrape the UI. This ASGI app (Starlette, served by uvicorn;
+both come with Streamlit) answers the same datasets as parameterized GET
+endpoints:
+
+    python -m core.api --port 8000 --workers 4
+    curl 'http://127.0.0.1:8000/datasets/delay_leaderboard?window=Last+7+days'
+    curl -H 'Accept: application/vnd.apache.arrow.stream' \\
+        'http://127.0.0.1:8000/flights?limit=50000' > flights.arrow
+
+    GET /                          endpoints and named datasets
+    GET /datasets/{name}           a core.queries query, its params by name
+    GET /flights                   the Flights table: filters, keyset pages
+    GET /delays[/histogram]        the Delay Explorer
+    GET /delays/percentiles        the leaderboard's merged sketch percentiles
+    GET /routes[/top|/hubs|/reachable|/path]
+    GET /fleet/utilization, /fleet/segments
+    GET /airports/bins             the map's viewport binning (core.grid)
+
+Endpoints over flights take the pages' time window: ``window=<preset>``
+(core.window) or ``from``/``to`` days. Results are JSON, an array of
+records, or with ``format=arrow`` (or the Arrow ``Accept`` type) an Arrow
+IPC stream, which needs ``pyarrow``. SQL results stream in batches as
+SQLite returns them, so ``/flights?limit=50000`` never sits in memory whole.
+Arrow types come from the first batch that has a value in every column:
+numbers are sent as doubles, so a later float never meets an int column.
+
+Each request reads the versions of the tables it depends on (core.db) in
+the same read transaction as its rows. The ETag is a hash of the request
+and those versions: ``If-None-Match`` gets a 304 without running the query,
+and bodies up to 1/16 of ``AIR_TRACKER_API_CACHE_MB`` (default 64) are kept
+per worker, least recently used first out, until a table they read changes.
+Queries run in worker threads on a read-only connection pool; the route
+graph, fleet timeline and airport index are built once per data version and
+window, as on the pages, by the Streamlit-free builders (core.route_graph,
+core.timelines, core.grid) rather than the pages' cached wrappers, so the
+API never imports Streamlit. ``benchmarks.load`` measures requests/sec per
+core.
+"""
+import argparse
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import threading
+from base64 import b64encode
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from datetime import date
+from itertools import chain
+from typing import Callable, NamedTuple
+
+import pandas as pd
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.exceptions import HTTPException
+from starlette.responses import JSONResponse, Response, StreamingResponse
+from starlette.routing import Route
+
+from . import db, window as time_window
+from .delays import GROUPS, delay_histogram_query, delay_query
+from .grid import CELLS, VIEWPORTS, GridIndex
+from .queries import QUERIES, WINDOWED, flights_table_query, tables_read
+from .route_graph import RouteGraph
+from .sketch import summarize, week
+from .timelines import FleetTimeline
+
+POOL_SIZE = int(os.environ.get("AIR_TRACKER_API_POOL", "8"))
+BATCH_ROWS = 2_000
+MAX_LIMIT = 50_000
+CACHE_BYTES = int(
+    float(os.environ.get("AIR_TRACKER_API_CACHE_MB", "64")) * 2**20
+)
+RESOURCE_ENTRIES = 8  # route graphs, timelines, indexes: a few windows
+
+JSON = "application/json"
+ARROW = "application/vnd.apache.arrow.stream"
+NOT_MODIFIED = object()
+
+# Params of the named queries after the window's: name -> ((param, type,
+# default), ...); a default of None makes the param required.
+QUERY_PARAMS = {
+    "top_airlines": (("limit", int, 10),),
+    "dim_values": (("dim", str, None),),
+    "delay_sketches": (("dim", str, "all"),),
+    "linked_flights": (("iata", str, None),),
+}
+ROUTE_RANKS = ["flights", "delay_rate_pct", "avg_delay_min", "cancelled"]
+PERCENTILES_PER = {"airport": "origin", "airline": "airline", "day": "all",
+                   "week": "all"}
+
+
+class Frame(NamedTuple):
+    """A result computed in Python: ``build(conn, version)`` -> DataFrame
+    from the ``tables`` it is versioned by."""
+
+    tables: tuple
+    build: Callable
+
+
+# ======================================================
+# CACHES
+# ======================================================
+class ResponseCache:
+    """Encoded bodies by key, least recently used first, within ``budget``
+    bytes."""
+
+    def __init__(self, budget=CACHE_BYTES):
+        self.budget = budget
+        self.size = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            self._entries[key] = body
+            self.size += len(body)
+            while self.size > self.budget:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+
+class Service:
+    """Per-process state: the connection pool and both caches."""
+
+    def __init__(self, path=db.DB_PATH, pool_size=POOL_SIZE):
+        self.pool = db.ConnectionPool(path, size=pool_size, read_only=True)
+        self.cache = ResponseCache()
+        self._resources = OrderedDict()
+        self._lock = threading.Lock()
+
+    def resource(self, key, build):
+        """``build()`` once per key (e.g. kind, data version, window)."""
+        with self._lock:
+            if key in self._resources:
+                self._resources.move_to_end(key)
+                return self._resources[key]
+        value = build()
+        with self._lock:
+            self._resources[key] = value
+            while len(self._resources) > RESOURCE_ENTRIES:
+                self._resources.popitem(last=False)
+        return value
+
+    def chunks(self, request, media_type, prepare):
+        """Generator run in worker threads: yields (etag, body) first, body
+        being the cached bytes, ``NOT_MODIFIED`` or None, then (for None)
+        the encoded response in chunks."""
+        with self.pool.connection() as conn:
+            # One read transaction: the versions and the rows are one snapshot.
+            conn.execute("BEGIN")
+            try:
+                source = prepare(request.query_params, conn)
+                tables = (
+                    source.tables if isinstance(source, Frame)
+                    else tables_read(source[0])
+                )
+                version = db.version_key(conn, tables, self.pool.path)
+                key = _key(request, media_type, version)
+                etag = f'"{key}"'
+                if etag in _etags(request.headers.get("if-none-match")):
+                    yield etag, NOT_MODIFIED
+                    return
+                body = self.cache.get(key)
+                if body is not None:
+                    yield etag, body
+                    return
+
+                # Started before the headers go out, so bad params (an
+                # unknown airport, say) still get their 4xx.
+                if isinstance(source, Frame):
+                    encoded = [_encode_frame(
+                        source.build(conn, version), media_type
+                    )]
+                else:
+                    cursor = conn.execute(*source)
+                    columns = [d[0] for d in cursor.description]
+                    batches = iter(lambda: cursor.fetchmany(BATCH_ROWS), [])
+                    encoded = (
+                        _arrow_rows(columns, batches) if media_type == ARROW
+                        else _json_rows(columns, batches)
+                    )
+                yield etag, None
+
+                kept, size = [], 0
+                for chunk in encoded:
+                    if kept is not None:
+                        kept.append(chunk)
+                        size += len(chunk)
+                        if size > self.cache.budget // 16:
+                            kept = None
+                    yield chunk
+                if kept is not None:
+                    self.cache.put(key, b"".join(kept))
+            finally:
+                conn.rollback()
+
+
+def _key(request, media_type, version):
+    h = hashlib.blake2b(digest_size=16)
+    h.update(request.url.path.encode())
+    h.update(repr(sorted(request.query_params.multi_items())).encode())
+    h.update(repr((media_type, version)).encode())
+    return h.hexdigest()
+
+
+def _etags(header):
+    return {
+        tag.strip().removeprefix("W/") for tag in (header or "").split(",")
+    }
+
+
+# ======================================================
+# ENCODING
+# ======================================================
+def _json_default(value):
+    if isinstance(value, bytes):
+        return b64encode(value).decode()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _json_rows(columns, batches):
+    yield b"["
+    first = True
+    for rows in batches:
+        records = json.dumps(
+            [dict(zip(columns, row)) for row in rows],
+            separators=(",", ":"), default=_json_default,
+        )
+        yield (b"" if first else b",") + records[1:-1].encode()
+        first = False
+    yield b"]"
+
+
+def _arrow_type(values):
+    """Arrow type of a column from its values so far, None while all NULL:
+    numbers are doubles (an int column may hold a float later), any text
+    makes it a string."""
+    import pyarrow as pa
+
+    kinds = {type(v) for v in values} - {type(None)}
+    if not kinds:
+        return None
+    if kinds <= {int, float}:
+        return pa.float64()
+    if kinds == {bytes}:
+        return pa.binary()
+    return pa.string()
+
+
+def _arrow_batch(rows, schema):
+    import pyarrow as pa
+
+    columns = list(zip(*rows))
+    return pa.record_batch([
+        pa.array(
+            [None if v is None else str(v) for v in values]
+            if field.type == pa.string() else values,
+            field.type,
+        )
+        for values, field in zip(columns, schema)
+    ], schema=schema)
+
+
+def _arrow_rows(columns, batches):
+    import pyarrow as pa
+
+    # The schema goes first: read ahead only until every column has shown
+    # a value (usually the first batch); columns still all NULL are strings.
+    batches = iter(batches)
+    ahead = []
+    types = [None] * len(columns)
+    for rows in batches:
+        ahead.append(rows)
+        types = [
+            t or _arrow_type(values)
+            for t, values in zip(types, zip(*rows))
+        ]
+        if None not in types:
+            break
+    schema = pa.schema([
+        (name, t or pa.string()) for name, t in zip(columns, types)
+    ])
+
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for rows in chain(ahead, batches):
+            writer.write_batch(_arrow_batch(rows, schema))
+            yield _drain(sink)
+    yield _drain(sink)
+
+
+def _drain(sink):
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+def _encode_frame(df, media_type):
+    if media_type == JSON:
+        return df.to_json(orient="records", date_format="iso").encode()
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def _media_type(request):
+    fmt = request.query_params.get("format")
+    if fmt is None:
+        fmt = "arrow" if ARROW in request.headers.get("accept", "") else "json"
+    if fmt not in ("json", "arrow"):
+        raise HTTPException(400, "format must be json or arrow")
+    if fmt == "arrow":
+        if importlib.util.find_spec("pyarrow") is None:
+            raise HTTPException(406, "Arrow responses need pyarrow")
+        return ARROW
+    return JSON
+
+
+# ======================================================
+# PARAMS
+# ======================================================
+def _param(query, name, kind=str, default=None, low=None, high=None):
+    """``query[name]`` as ``kind``, ``default`` when missing; a 400 when it
+    does not parse or falls outside ``low``..``high``."""
+    raw = query.get(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        value = kind(raw)
+    except ValueError:
+        raise HTTPException(400, f"{name}: invalid value {raw!r}") from None
+    if (low is not None and value < low) or (
+        high is not None and value > high
+    ):
+        raise HTTPException(400, f"{name} must be within {low}..{high}")
+    return value
+
+
+def _required(query, name, kind=str):
+    value = _param(query, name, kind)
+    if value is None:
+        raise HTTPException(400, f"{name} is required")
+    return value
+
+
+def _choice(query, name, choices, default=None):
+    value = query.get(name) or default
+    if value is not None and value not in choices:
+        raise HTTPException(400, f"{name} must be one of {', '.join(choices)}")
+    return value
+
+
+def _window(query, conn):
+    """The request's time window: ``from``/``to`` days or a preset."""
+    first = _param(query, "from", date.fromisoformat)
+    last = _param(query, "to", date.fromisoformat)
+    if first or last:
+        return time_window.Window(
+            first or time_window.ALL.first, last or time_window.ALL.last
+        )
+    label = _choice(query, "window", list(time_window.PRESETS), "All time")
+    if time_window.PRESETS[label] is None:
+        return time_window.ALL
+    (last_day,) = conn.execute(
+        "SELECT date(MAX(scheduled_time)) FROM flight_facts"
+    ).fetchone()
+    return time_window.preset(label, last_day and date.fromisoformat(last_day))
+
+
+# ======================================================
+# ENDPOINTS
+# ======================================================
+# prepare(query, conn) -> (sql, params) or Frame, run in the read
+# transaction of the response.
+def _named(name):
+    def prepare(query, conn):
+        params = tuple(
+            _required(query, param, kind) if default is None
+            else _param(query, param, kind, default)
+            for param, kind, default in QUERY_PARAMS.get(name, ())
+        )
+        if name in WINDOWED:
+            params = _window(query, conn).params(WINDOWED[name]) + params
+        return QUERIES[name], params
+    return prepare
+
+
+def _flights(query, conn):
+    date_from, date_to = _window(query, conn).clip()
+    after_time = query.get("after_time")
+    after = (
+        (after_time, _required(query, "after_id", int)) if after_time else None
+    )
+    return flights_table_query(
+        airline=query.get("airline"),
+        status=query.get("status"),
+        origin=query.get("origin"),
+        destination=query.get("destination"),
+        flight_type=query.get("flight_type"),
+        date_from=date_from,
+        date_to=date_to,
+        after=after,
+        limit=_param(query, "limit", int, 100, 1, MAX_LIMIT),
+    )
+
+
+def _delay_filters(query, conn):
+    date_from, date_to = _window(query, conn).clip()
+    hours = (
+        _param(query, "hour_from", int, 0, 0, 23),
+        _param(query, "hour_to", int, 23, 0, 23),
+    )
+    return {
+        "airline": query.get("airline"),
+        "origin": query.get("origin"),
+        "destination": query.get("destination"),
+        "hours": None if hours == (0, 23) else hours,
+        "date_from": date_from,
+        "date_to": date_to,
+    }
+
+
+def _delays(query, conn):
+    return delay_query(
+        _choice(query, "group_by", list(GROUPS)),
+        min_flights=_param(query, "min_flights", int, 1, 1),
+        limit=_param(query, "limit", int, None, 1),
+        **_delay_filters(query, conn),
+    )
+
+
+def _delay_histogram(query, conn):
+    return delay_histogram_query(
+        bin_min=_param(query, "bin_min", int, 5, 1, 60),
+        max_min=_param(query, "max_min", int, 180, 1, 24 * 60),
+        **_delay_filters(query, conn),
+    )
+
+
+def _delay_percentiles(query, conn):
+    per = _choice(query, "per", list(PERCENTILES_PER), "airport")
+    sql = QUERIES["delay_sketches"]
+    params = (
+        _window(query, conn).params(WINDOWED["delay_sketches"])
+        + (PERCENTILES_PER[per],)
+    )
+
+    def build(conn, version):
+        rows = conn.execute(sql, params).fetchall()
+        keys = (
+            (week(day) if per == "week" else day if per == "day" else value)
+            for value, day, _, _ in rows
+        )
+        return (
+            pd.DataFrame(
+                summarize(zip(keys, (blob for *_, blob in rows))),
+                columns=["key", "flights", "p50", "p90", "p95", "p99"],
+            )
+            .dropna(subset=["key"])
+            .rename(columns={"key": per})
+            .sort_values("p90", ascending=False)
+        )
+    return Frame(tables_read(sql), build)
+
+
+def _graph_frame(view):
+    """Frame of ``view(graph, query)`` over the window's ``RouteGraph``."""
+    def prepare(query, conn):
+        window = _window(query, conn)
+
+        def build(conn, version):
+            graph = SERVICE.resource(
+                ("routes", version, window),
+                lambda: RouteGraph.from_db(conn, window),
+            )
+            return view(graph, query)
+        return Frame(("airport", "flights"), build)
+    return prepare
+
+
+def _airport(graph, query, name):
+    code = _required(query, name)
+    if code not in graph.node:
+        raise HTTPException(404, f"{name}: no flights at {code}")
+    return code
+
+
+def _routes_top(graph, query):
+    return graph.top_routes(
+        _param(query, "n", int, 20, 1),
+        by=_choice(query, "by", ROUTE_RANKS, "flights"),
+        min_flights=_param(query, "min_flights", int, 1, 1),
+    )
+
+
+def _routes_path(graph, query):
+    origin = _airport(graph, query, "origin")
+    path = graph.path(
+        origin, _airport(graph, query, "destination"),
+        _param(query, "max_hops", int, None, 1),
+    ) or []
+    return pd.DataFrame({"hop": range(len(path)), "iata_code": path})
+
+
+def _fleet_frame(view):
+    def prepare(query, conn):
+        window = _window(query, conn)
+
+        def build(conn, version):
+            fleet = SERVICE.resource(
+                ("fleet", version, window),
+                lambda: FleetTimeline.from_db(conn, window),
+            )
+            return view(fleet, query)
+        return Frame(("aircraft", "flights"), build)
+    return prepare
+
+
+def _fleet_segments(fleet, query):
+    tails = query.getlist("tail")
+    if not tails:
+        raise HTTPException(400, "tail is required (repeat it for several)")
+    return fleet.segments(tails)
+
+
+def _airport_bins(query, conn):
+    window = _window(query, conn)
+    region = _choice(query, "region", list(VIEWPORTS), "World")
+    cells = _param(query, "cells", int, CELLS, 1, 1024)
+    sql = QUERIES["airport_traffic"]
+
+    def build(conn, version):
+        params = list(window.params(WINDOWED["airport_traffic"]))
+        index = SERVICE.resource(
+            ("airports", version, window),
+            lambda: GridIndex(pd.read_sql(sql, conn, params=params)),
+        )
+        return index.bins(VIEWPORTS[region], cells)
+    return Frame(tables_read(sql), build)
+
+
+ENDPOINTS = {
+    "/flights": (_flights, "Flights table; airline, status, origin, "
+                 "destination, flight_type, after_time + after_id, limit"),
+    "/delays": (_delays, "delay metrics; airline, origin, destination, "
+                "hour_from, hour_to, group_by, min_flights, limit"),
+    "/delays/histogram": (_delay_histogram, "flights per delay bucket; "
+                          "the /delays filters, bin_min, max_min"),
+    "/delays/percentiles": (_delay_percentiles, "p50-p99 delay; per="
+                            + "|".join(PERCENTILES_PER)),
+    "/routes": (_graph_frame(lambda graph, query: graph.routes()),
+                "every route"),
+    "/routes/top": (_graph_frame(_routes_top),
+                    f"n, by={'|'.join(ROUTE_RANKS)}, min_flights"),
+    "/routes/hubs": (_graph_frame(lambda graph, query: graph.hubs()),
+                     "routes, volume and centrality per airport"),
+    "/routes/reachable": (_graph_frame(lambda graph, query: graph.reachable(
+        _airport(graph, query, "origin"),
+        _param(query, "max_hops", int, None, 1),
+    )), "origin, max_hops"),
+    "/routes/path": (_graph_frame(_routes_path),
+                     "fewest-hop itinerary; origin, destination, max_hops"),
+    "/fleet/utilization": (
+        _fleet_frame(lambda fleet, query: fleet.utilization()),
+        "per-tail block hours, turnarounds, utilization",
+    ),
+    "/fleet/segments": (_fleet_frame(_fleet_segments),
+                        "timeline of tail (repeatable)"),
+    "/airports/bins": (_airport_bins, f"region={'|'.join(VIEWPORTS)}, cells"),
+}
+
+SERVICE = None  # set at startup, one per worker process
+
+
+async def _respond(request, prepare):
+    media_type = _media_type(request)
+    chunks = SERVICE.chunks(request, media_type, prepare)
+    etag, body = await run_in_threadpool(next, chunks)
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept"}
+    if body is NOT_MODIFIED:
+        return Response(status_code=304, headers=headers)
+    if body is not None:
+        return Response(body, media_type=media_type,
+                        headers={**headers, "X-Cache": "hit"})
+    return StreamingResponse(iterate_in_threadpool(chunks),
+                             media_type=media_type,
+                             headers={**headers, "X-Cache": "miss"})
+
+
+async def index(request):
+    return JSONResponse({
+        "endpoints": {
+            path: f"{help}; window or from/to, format"
+            for path, (_, help) in ENDPOINTS.items()
+        },
+        "datasets": {
+            name: {
+                "windowed": name in WINDOWED,
+                "params": [param for param, *_ in QUERY_PARAMS.get(name, ())],
+            }
+            for name in QUERIES
+        },
+    })
+
+
+async def dataset(request):
+    name = request.path_params["name"]
+    if name not in QUERIES:
+        raise HTTPException(404, f"no dataset {name!r}")
+    return await _respond(request, _named(name))
+
+
+def _endpoint(prepare):
+    async def endpoint(request):
+        return await _respond(request, prepare)
+    return endpoint
+
+
+async def _error(request, exc):
+    return JSONResponse({"error": exc.detail}, status_code=exc.status_code)
+
+
+def create_app(path=db.DB_PATH, pool_size=POOL_SIZE):
+    @asynccontextmanager
+    async def lifespan(app):
+        global SERVICE
+        SERVICE = Service(path, pool_size)
+        try:
+            yield
+        finally:
+            SERVICE.pool.close()
+
+    return Starlette(
+        routes=[
+            Route("/", index),
+            Route("/datasets/{name}", dataset),
+            *(Route(path, _endpoint(prepare))
+              for path, (prepare, _) in ENDPOINTS.items()),
+        ],
+        exception_handlers={HTTPException: _error},
+        lifespan=lifespan,
+    )
+
+
+app = create_app()
+
+
+def main(argv=None):
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=db.DB_PATH, help="SQLite database path")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument(
+        "--workers", type=int, default=1,
+        help="worker processes, each with its own pool and caches",
+    )
+    parser.add_argument(
+        "--pool", type=int, default=POOL_SIZE,
+        help="SQLite connections per worker",
+    )
+    args = parser.parse_args(argv)
+
+    if args.workers > 1:
+        # Workers import the app afresh, resolving the database from the
+        # environment like the pages do.
+        os.environ["AIR_TRACKER_DB"] = str(args.db)
+        os.environ["AIR_TRACKER_API_POOL"] = str(args.pool)
+        target = "core.api:app"
+    else:
+        target = create_app(args.db, args.pool)
+    uvicorn.run(target, host=args.host, port=args.port, workers=args.workers,
+                log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
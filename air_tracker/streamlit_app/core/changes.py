@@ -0,0 +1,197 @@
+"""Change tracking for tables derived from ``flights``.
+
+Derived tables (the ``airport_delays`` rollup, ...) are partitioned by
+(origin airport, UTC day). Each consumer keeps two cursors in ``etl_state``:
+
+* ``<consumer>.hwm`` - the newest ``scheduled_time`` it has processed. New
+  flights past it are found with a range scan on ``idx_flights_scheduled``.
+* ``<consumer>.seq`` - the last row of ``flight_changes`` it has read.
+  Triggers log the partitions of updated or deleted flights, and of inserts
+  that land at or behind a high-water mark (late or re-timed flights),
+  which the range scan alone would miss. ``seq`` is AUTOINCREMENT so it
+  keeps growing after the log is compacted.
+
+A consumer with no state yet does a full rebuild. Log rows are dropped
+once every consumer's ``seq`` has passed them, so a consumer that stops
+running is dropped with :func:`release`; otherwise the log keeps every
+change for it.
+"""
+
+# Installed by migration 4 (see core.migrations).
+CHANGE_TRACKING_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS etl_state (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS flight_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        airport_iata TEXT,
+        day TEXT
+    )
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_flights_changed_insert
+    AFTER INSERT ON flights
+    WHEN NEW.scheduled_time <= (
+        SELECT MAX(value) FROM etl_state WHERE key LIKE '%.hwm'
+    )
+    BEGIN
+        INSERT INTO flight_changes (airport_iata, day)
+        VALUES (NEW.origin_iata, date(NEW.scheduled_time));
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_flights_changed_update
+    AFTER UPDATE ON flights
+    BEGIN
+        INSERT INTO flight_changes (airport_iata, day)
+        VALUES (OLD.origin_iata, date(OLD.scheduled_time));
+        INSERT INTO flight_changes (airport_iata, day)
+        SELECT NEW.origin_iata, date(NEW.scheduled_time)
+        WHERE NEW.origin_iata IS NOT OLD.origin_iata
+           OR NEW.scheduled_time IS NOT OLD.scheduled_time;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS trg_flights_changed_delete
+    AFTER DELETE ON flights
+    BEGIN
+        INSERT INTO flight_changes (airport_iata, day)
+        VALUES (OLD.origin_iata, date(OLD.scheduled_time));
+    END
+    """,
+]
+
+# The same triggers on ``flight_facts``, which replaces the ``flights`` table
+# in migration 9 (see core.encoding); origins are logged as IATA codes.
+_ORIGIN = "(SELECT value FROM dim_iata WHERE id = {}.origin_id)"
+
+FACTS_CHANGE_TRACKING_DDL = [
+    f"""
+    CREATE TRIGGER trg_flights_changed_insert
+    AFTER INSERT ON flight_facts
+    WHEN NEW.scheduled_time <= (
+        SELECT MAX(value) FROM etl_state WHERE key LIKE '%.hwm'
+    )
+    BEGIN
+        INSERT INTO flight_changes (airport_iata, day)
+        VALUES ({_ORIGIN.format("NEW")}, date(NEW.scheduled_time));
+    END
+    """,
+    f"""
+    CREATE TRIGGER trg_flights_changed_update
+    AFTER UPDATE ON flight_facts
+    BEGIN
+        INSERT INTO flight_changes (airport_iata, day)
+        VALUES ({_ORIGIN.format("OLD")}, date(OLD.scheduled_time));
+        INSERT INTO flight_changes (airport_iata, day)
+        SELECT {_ORIGIN.format("NEW")}, date(NEW.scheduled_time)
+        WHERE NEW.origin_id IS NOT OLD.origin_id
+           OR NEW.scheduled_time IS NOT OLD.scheduled_time;
+    END
+    """,
+    f"""
+    CREATE TRIGGER trg_flights_changed_delete
+    AFTER DELETE ON flight_facts
+    BEGIN
+        INSERT INTO flight_changes (airport_iata, day)
+        VALUES ({_ORIGIN.format("OLD")}, date(OLD.scheduled_time));
+    END
+    """,
+]
+
+
+def _get(conn, key):
+    row = conn.execute(
+        "SELECT value FROM etl_state WHERE key = ?", (key,)
+    ).fetchone()
+    return row[0] if row else None
+
+
+def _set(conn, key, value):
+    conn.execute(
+        """
+        INSERT INTO etl_state (key, value) VALUES (?, ?)
+        ON CONFLICT (key) DO UPDATE SET value = excluded.value
+        """,
+        (key, value),
+    )
+
+
+def pending(conn, consumer):
+    """Work for ``consumer`` since its last commit.
+
+    Returns ``(partitions, cursor)``; ``partitions`` is a set of
+    (airport_iata, day) or None when a full rebuild is needed. Pass
+    ``cursor`` to :func:`commit` once the partitions are written.
+    """
+    seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM flight_changes")
+    cursor = {
+        "seq": seq.fetchone()[0],
+        "hwm": conn.execute(
+            "SELECT MAX(scheduled_time) FROM flight_facts"
+        ).fetchone()[0],
+    }
+
+    last_hwm = _get(conn, f"{consumer}.hwm")
+    last_seq = _get(conn, f"{consumer}.seq")
+    if last_hwm is None or last_seq is None:
+        return None, cursor
+
+    partitions = set(conn.execute(
+        """
+        SELECT DISTINCT origin_iata, date(scheduled_time)
+        FROM flights
+        WHERE scheduled_time > ?
+        """,
+        (last_hwm,),
+    ))
+    partitions.update(conn.execute(
+        """
+        SELECT DISTINCT airport_iata, day
+        FROM flight_changes
+        WHERE seq > ? AND seq <= ?
+        """,
+        (int(last_seq), cursor["seq"]),
+    ))
+    return partitions, cursor
+
+
+def commit(conn, consumer, cursor):
+    """Advance ``consumer`` and drop log rows every consumer has read.
+
+    Call inside the transaction that wrote the consumer's partitions.
+    """
+    _set(conn, f"{consumer}.seq", cursor["seq"])
+    if cursor["hwm"] is not None:
+        _set(conn, f"{consumer}.hwm", cursor["hwm"])
+    _prune(conn)
+
+
+def release(conn, consumer):
+    """Forget ``consumer``'s cursors, so the log stops keeping rows for it;
+    its next :func:`pending` asks for a full rebuild.
+
+    Call inside a transaction.
+    """
+    conn.execute(
+        "DELETE FROM etl_state WHERE key IN (?, ?)",
+        (f"{consumer}.seq", f"{consumer}.hwm"),
+    )
+    _prune(conn)
+
+
+def _prune(conn):
+    conn.execute(
+        """
+        DELETE FROM flight_changes
+        WHERE seq <= (
+            SELECT MIN(CAST(value AS INTEGER))
+            FROM etl_state
+            WHERE key LIKE '%.seq'
+        )
+        """
+    )
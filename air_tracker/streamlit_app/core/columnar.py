@@ -0,0 +1,287 @@
+"""Optional columnar copy of the analytical tables (Parquet + DuckDB).
+
+The loader can mirror ``flights`` and ``airport_delays`` into Parquet
+datasets partitioned by UTC day (``flights/day=2026-01-02/part-0.parquet``),
+plus ``flight_cube`` and the small ``airport`` and ``aircraft`` tables as
+single files. With
+``AIR_TRACKER_BACKEND=duckdb`` the pages run the group-bys listed in
+``core.queries.COLUMNAR_QUERIES`` through an in-process DuckDB over those
+files; everything else stays on SQLite.
+
+Each partition file covers one day, so its min/max statistics on
+``scheduled_time``/``delay_date`` let DuckDB skip whole files for
+date-bounded queries. Like the rollup, the export is incremental: only the
+days touched since the last run (see core.changes) are rewritten. Loads run
+without the export (``--no-parquet``) release its change-log cursor, so the
+log does not grow while the copy is unused; the next export is then a full
+rewrite.
+
+    python -m core.columnar            # export changed days
+    python -m core.columnar --full     # rewrite every partition
+    python -m core.columnar --check    # compare both backends query by query
+
+Needs ``pyarrow`` and ``duckdb``; neither is required for the SQLite path.
+"""
+import argparse
+import json
+import os
+import shutil
+from pathlib import Path
+
+from . import changes, db
+
+# "sqlite" (default) or "duckdb"; read by core.data and core.ingest.
+BACKEND = os.environ.get("AIR_TRACKER_BACKEND", "sqlite").lower()
+PARQUET_DIR = Path(
+    os.environ.get("AIR_TRACKER_PARQUET", db.APP_DIR / "database" / "parquet")
+).resolve()
+
+CONSUMER = "parquet"
+MANIFEST = "_manifest.json"
+NULL_DAY = "unknown"  # partition for rows without a usable date
+
+# table -> column whose UTC day names the partition (None: one file)
+DATASETS = {
+    "flights": "scheduled_time",
+    "airport_delays": "delay_date",
+    "flight_cube": None,
+    "airport": None,
+    "aircraft": None,
+}
+
+
+# ======================================================
+# EXPORT
+# ======================================================
+def _arrow_schema(conn, table):
+    import pyarrow as pa
+
+    types = {"INTEGER": pa.int64(), "REAL": pa.float64()}
+    return pa.schema([
+        (name, types.get(decl.upper(), pa.string()))
+        for _, name, decl, *_ in conn.execute(f"PRAGMA table_info({table})")
+    ])
+
+
+def _write(conn, schema, sql, params, path):
+    """Write a query result to ``path`` atomically (readers never see half)."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    rows = conn.execute(sql, params).fetchall()
+    columns = list(zip(*rows)) or [[] for _ in schema]
+    table = pa.Table.from_arrays(
+        [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+        schema=schema,
+    )
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+    return len(rows)
+
+
+def _export_day(conn, table, column, schema, day, out_dir):
+    columns = ", ".join(schema.names)
+    target = out_dir / table / f"day={day or NULL_DAY}"
+    if day is None:
+        where, params = f"date({column}) IS NULL", ()
+    else:
+        # Range on the raw column first so SQLite can use its index.
+        where = (
+            f"{column} >= ? AND {column} < date(?, '+1 day')"
+            f" AND date({column}) = ?"
+        )
+        params = (day, day, day)
+    count = conn.execute(
+        f"SELECT COUNT(*) FROM {table} WHERE {where}", params
+    ).fetchone()[0]
+    if not count:
+        shutil.rmtree(target, ignore_errors=True)  # the day emptied out
+        return 0
+    return _write(
+        conn, schema, f"SELECT {columns} FROM {table} WHERE {where}",
+        params, target / "part-0.parquet",
+    )
+
+
+def export(conn, out_dir=PARQUET_DIR, full=False):
+    """Bring the Parquet copy up to date; returns {table: rows written}."""
+    out_dir = Path(out_dir)
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        partitions, cursor = changes.pending(conn, CONSUMER)
+        if full or partitions is None or not (out_dir / MANIFEST).exists():
+            days = None
+        else:
+            days = {day for _, day in partitions}
+
+        written = {}
+        for table, column in DATASETS.items():
+            schema = _arrow_schema(conn, table)
+            if column is None:
+                written[table] = _write(
+                    conn, schema,
+                    f"SELECT {', '.join(schema.names)} FROM {table}", (),
+                    out_dir / f"{table}.parquet",
+                )
+                continue
+            if days is None:
+                shutil.rmtree(out_dir / table, ignore_errors=True)
+                table_days = {
+                    day for (day,) in
+                    conn.execute(f"SELECT DISTINCT date({column}) FROM {table}")
+                }
+            else:
+                table_days = days
+            written[table] = sum(
+                _export_day(conn, table, column, schema, day, out_dir)
+                for day in table_days
+            )
+
+        changes.commit(conn, CONSUMER, cursor)
+        (out_dir / MANIFEST).write_text(json.dumps({
+            "data_version": db.read_data_version(conn),
+            "full": days is None,
+            "written": written,
+        }))
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+    return written
+
+
+def release(conn):
+    """Stop tracking changes for the Parquet copy.
+
+    Loads that skip the export call this, so the change log does not keep
+    every row until the next export; that export is a full one, and until
+    it runs the copy is stale.
+    """
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        changes.release(conn, CONSUMER)
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def signature(out_dir=PARQUET_DIR):
+    """Cache key component that changes with every export."""
+    try:
+        return (Path(out_dir, MANIFEST).stat().st_mtime_ns,)
+    except FileNotFoundError:
+        return (0,)
+
+
+# ======================================================
+# DUCKDB
+# ======================================================
+def connect_duckdb(out_dir=PARQUET_DIR):
+    """In-memory DuckDB with one view per dataset, named like the tables.
+
+    Views re-list the partition directories on every query, so new exports
+    are picked up without reconnecting. Use ``.cursor()`` per thread.
+    """
+    import duckdb
+
+    out_dir = Path(out_dir)
+    con = duckdb.connect()
+    for table, column in DATASETS.items():
+        if column is None:
+            source = f"read_parquet('{out_dir / table}.parquet')"
+            con.execute(f"CREATE VIEW {table} AS SELECT * FROM {source}")
+        else:
+            source = (
+                f"read_parquet('{out_dir / table}/*/*.parquet', "
+                "hive_partitioning = true, hive_types_autocast = false)"
+            )
+            con.execute(
+                f"CREATE VIEW {table} AS SELECT * EXCLUDE (day) FROM {source}"
+            )
+    return con
+
+
+def read(cursor, sql, params=()):
+    """Run ``sql`` on a DuckDB cursor into a DataFrame typed like SQLite's.
+
+    DuckDB widens SUM over integers to HUGEINT, which pandas receives as
+    float; narrow those back so counts still render as integers.
+    """
+    df = cursor.execute(sql, list(params)).df()
+    for name, type_code, *_ in cursor.description:
+        if str(type_code) == "HUGEINT":
+            df[name] = df[name].astype(
+                "int64" if df[name].notna().all() else "Int64"
+            )
+    return df
+
+
+def check(conn, out_dir=PARQUET_DIR, params=None, window=None):
+    """Run every columnar query on both backends; returns mismatching names.
+
+    Windowed queries run over ``window`` (all of history by default).
+    """
+    import pandas as pd
+
+    from .queries import COLUMNAR_QUERIES, QUERIES, WINDOWED
+    from .window import ALL
+
+    params = params or {"top_airlines": [5]}
+    window = window or ALL
+    duck = connect_duckdb(out_dir)
+    mismatched = []
+    for name in sorted(COLUMNAR_QUERIES):
+        sql, args = QUERIES[name], params.get(name, [])
+        if name in WINDOWED:
+            args = [*window.params(WINDOWED[name]), *args]
+        expected = pd.read_sql(sql, conn, params=args)
+        actual = read(duck, sql, args)
+        if "ORDER BY" not in sql:
+            expected = expected.sort_values(list(expected.columns))
+            actual = actual.sort_values(list(actual.columns))
+        try:
+            pd.testing.assert_frame_equal(
+                expected.reset_index(drop=True),
+                actual.reset_index(drop=True),
+                check_dtype=False,
+            )
+        except AssertionError as exc:
+            mismatched.append(name)
+            print(f"{name}: MISMATCH\n{exc}")
+        else:
+            print(f"{name}: ok ({len(expected)} rows)")
+    duck.close()
+    return mismatched
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=db.DB_PATH, help="SQLite database path")
+    parser.add_argument("--out", default=PARQUET_DIR, help="Parquet directory")
+    parser.add_argument(
+        "--full", action="store_true", help="rewrite every partition"
+    )
+    parser.add_argument(
+        "--check", action="store_true",
+        help="compare DuckDB and SQLite results instead of exporting",
+    )
+    args = parser.parse_args(argv)
+
+    conn = db.connect(args.db)
+    try:
+        if args.check:
+            if check(conn, args.out):
+                raise SystemExit(1)
+            return
+        written = export(conn, args.out, full=args.full)
+    finally:
+        conn.close()
+    for table, rows in written.items():
+        print(f"{table:<15} {rows:>10} rows written")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Pre-aggregated ``flight_cube``: flight counts per day and dimension.
+
+One row per (day, airline_name, status, flight_type, origin_iata,
+destination_iata) with its number of flights and delay measures (flights
+with a delay, delayed flights, summed delay minutes; see core.delays). The
+Overview, Flights and Delay KPIs roll this up with ``SUM(...)`` instead of
+grouping raw flights, so their cost follows the number of distinct keys,
+not of flights. Flight-weighted average delay is
+``SUM(delay_min_sum) / SUM(timed_flights)``.
+
+Maintained like the delay rollup: only the (origin airport, UTC day)
+partitions touched since the last run (see core.changes) are deleted and
+re-aggregated; the first run builds everything.
+
+    python -m core.cube          # incremental
+    python -m core.cube --full   # rebuild
+"""
+import argparse
+
+from . import changes, db
+from .delays import DELAY_MIN_SQL, DELAYED_MIN
+from .encoding import ENCODED
+
+CONSUMER = "flight_cube"
+
+DIMENSIONS = (
+    "airline_name", "status", "flight_type", "origin_iata", "destination_iata"
+)
+
+# Installed by migration 5 (see core.migrations).
+CUBE_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS flight_cube (
+        day TEXT,
+        airline_name TEXT,
+        status TEXT,
+        flight_type TEXT,
+        origin_iata TEXT,
+        destination_iata TEXT,
+        flights INTEGER NOT NULL
+    )
+    """,
+    # Partition lookups for the incremental delete.
+    """
+    CREATE INDEX IF NOT EXISTS idx_flight_cube_origin_day
+    ON flight_cube (origin_iata, day)
+    """,
+]
+
+# Installed by migration 6; clearing the cube's cursors makes the next
+# refresh a full rebuild that fills them.
+MEASURES_DDL = [
+    "ALTER TABLE flight_cube ADD COLUMN timed_flights INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE flight_cube ADD COLUMN delayed_flights INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE flight_cube ADD COLUMN delay_min_sum REAL NOT NULL DEFAULT 0",
+    f"DELETE FROM etl_state WHERE key LIKE '{CONSUMER}.%'",
+]
+
+_COLUMNS = ", ".join(f"f.{d}" for d in DIMENSIONS)
+# Groups on the integer keys (see core.encoding); each value column is a
+# function of its key, so SQLite's bare columns read it from the group.
+_KEYS = ", ".join(f"f.{ENCODED[d][0]}" for d in DIMENSIONS)
+_TARGET = (
+    f"flight_cube (day, {', '.join(DIMENSIONS)}, flights, timed_flights, "
+    "delayed_flights, delay_min_sum)"
+)
+_MEASURES = f"""COUNT(*),
+    COUNT({DELAY_MIN_SQL}),
+    COUNT(*) FILTER (WHERE {DELAY_MIN_SQL} >= {DELAYED_MIN}),
+    COALESCE(SUM({DELAY_MIN_SQL}), 0)"""
+
+FILL_ALL_SQL = f"""
+INSERT INTO {_TARGET}
+SELECT date(f.scheduled_time), {_COLUMNS}, {_MEASURES}
+FROM flights f
+GROUP BY 1, {_KEYS}
+"""
+
+# Dated partitions: the origin key and scheduled_time range let SQLite walk
+# idx_flights_origin_sched. `IS` matches the NULL-origin partition too.
+FILL_PARTITIONS_SQL = f"""
+INSERT INTO {_TARGET}
+SELECT t.day, {_COLUMNS}, {_MEASURES}
+FROM temp.cube_partitions t
+JOIN flights f
+    ON f.origin_id IS (SELECT id FROM dim_iata WHERE value = t.airport_iata)
+   AND f.scheduled_time >= t.day
+   AND f.scheduled_time < date(t.day, '+1 day')
+   AND date(f.scheduled_time) = t.day
+GROUP BY t.day, {_KEYS}
+"""
+
+# Flights whose scheduled_time has no date land in day NULL.
+FILL_UNDATED_SQL = f"""
+INSERT INTO {_TARGET}
+SELECT NULL, {_COLUMNS}, {_MEASURES}
+FROM flights f
+WHERE date(f.scheduled_time) IS NULL
+  AND EXISTS (
+      SELECT 1 FROM temp.cube_partitions t
+      WHERE t.day IS NULL AND t.airport_iata IS f.origin_iata
+  )
+GROUP BY {_KEYS}
+"""
+
+
+def refresh(conn, full=False):
+    """Bring ``flight_cube`` up to date; returns partitions rewritten."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        partitions, cursor = changes.pending(conn, CONSUMER)
+        if full or partitions is None:
+            conn.execute("DELETE FROM flight_cube")
+            conn.execute(FILL_ALL_SQL)
+            count = conn.execute(
+                "SELECT COUNT(*) FROM (SELECT DISTINCT origin_iata, day "
+                "FROM flight_cube)"
+            ).fetchone()[0]
+        else:
+            conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS cube_partitions "
+                "(airport_iata TEXT, day TEXT)"
+            )
+            conn.execute("DELETE FROM temp.cube_partitions")
+            conn.executemany(
+                "INSERT INTO temp.cube_partitions VALUES (?, ?)", partitions
+            )
+            conn.executemany(
+                "DELETE FROM flight_cube WHERE origin_iata IS ? AND day IS ?",
+                partitions,
+            )
+            conn.execute(FILL_PARTITIONS_SQL)
+            if any(day is None for _, day in partitions):
+                conn.execute(FILL_UNDATED_SQL)
+            count = len(partitions)
+
+        changes.commit(conn, CONSUMER, cursor)
+        if count:
+            db.bump_data_version(conn, "flight_cube")
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+    return count
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=db.DB_PATH, help="SQLite database path")
+    parser.add_argument("--full", action="store_true", help="rebuild the cube")
+    args = parser.parse_args(argv)
+
+    conn = db.connect(args.db)
+    try:
+        count = refresh(conn, full=args.full)
+    finally:
+        conn.close()
+    print(f"flight_cube: {count} partitions recomputed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,280 @@
+"""Cached query layer used by every dashboard page.
+
+One read-only connection pool lives for the whole server process
+(``st.cache_resource``) and query results are memoized per
+(sql, params, data version) with ``st.cache_data``, so a widget click that
+re-executes a page script reads from the warm cache instead of SQLite.
+
+With ``AIR_TRACKER_BACKEND=duckdb`` the named queries in
+``COLUMNAR_QUERIES`` are answered from the Parquet copy instead (see
+core.columnar); the pages do not change.
+
+Datasets that no widget affects are declared per page with ``snapshot``:
+they are built once per data version into frames shared by every session
+(``st.cache_resource``), so a widget interaction only executes the
+parameterized queries that depend on it. With ``AIR_TRACKER_SNAPSHOT`` set
+they are memory-mapped from a prebuilt Arrow build instead (core.serving),
+shared by every worker process.
+
+Named queries in ``core.queries.WINDOWED`` are filtered by the session's
+time window (core.window): ``load`` and ``snapshot`` prepend its params, so
+pages pass only their own.
+
+Columns of the dictionary-encoded dimensions (core.encoding) load as pandas
+``category``: a handful of distinct strings shared by every row.
+
+Cached results are keyed by the versions of the tables their SQL reads
+(``db.read_table_versions``), not of the whole file, so when the live feed
+(core.live) updates flight statuses, datasets over ``airport`` or
+``aircraft`` stay cached. ``follow`` reruns the page when the data changes.
+
+When profiling is on for the session (see core.profiling) every call is
+timed and its plan recorded; otherwise the only cost is one flag check.
+"""
+import os
+import threading
+import time
+from collections.abc import Mapping
+
+import pandas as pd
+import streamlit as st
+
+from . import columnar, db, profiling, serving, window as time_window
+from .encoding import ENCODED
+from .queries import COLUMNAR_QUERIES, QUERIES, WINDOWED, tables_read
+
+CACHE_TTL_SECONDS = 15 * 60
+CACHE_MAX_ENTRIES = 512
+SNAPSHOT_MAX_ENTRIES = 64  # (page datasets, window, data version) keys
+POOL_SIZE = 4
+REFRESH_SECONDS = float(os.environ.get("AIR_TRACKER_REFRESH_SECONDS", "10"))
+
+# Set by the cached readers' bodies, which only run on a cache miss.
+_calls = threading.local()
+
+
+@st.cache_resource
+def get_pool():
+    return db.ConnectionPool(db.DB_PATH, size=POOL_SIZE, read_only=True)
+
+
+@st.cache_resource
+def get_duckdb():
+    return columnar.connect_duckdb()
+
+
+def data_version(*tables):
+    """Cache key component that changes whenever the database does; with
+    ``tables``, only when one of them (or the schema) does (see
+    ``db.version_key``)."""
+    with get_pool().connection() as conn:
+        version = db.version_key(conn, tables)
+    if columnar.BACKEND == "duckdb":
+        version += columnar.signature()
+    return version
+
+
+def follow():
+    """Sidebar switch that reruns the page when the data changes.
+
+    Checks the version every ``AIR_TRACKER_REFRESH_SECONDS``; the rerun
+    recomputes only the datasets whose tables changed.
+    """
+    on = st.sidebar.toggle(
+        "Live updates",
+        key=time_window.persisted("live_updates", False),
+        help="Refresh this page while the live feed (core.live) writes.",
+        on_change=_remember_live_updates,
+    )
+    if on:
+        with st.sidebar:
+            _watch()
+
+
+def _remember_live_updates():
+    # The copy time_window.persisted re-seeds the switch from on the next
+    # page; written only when the user flips it.
+    st.session_state["_live_updates"] = st.session_state["live_updates"]
+
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def _watch():
+    version = data_version()
+    if st.session_state.setdefault("_live_seen", version) != version:
+        st.session_state["_live_seen"] = version
+        st.rerun()
+
+
+def _categorical(df):
+    columns = [
+        c for c in df.columns
+        if c in ENCODED and not isinstance(df[c].dtype, pd.CategoricalDtype)
+    ]
+    return df.astype(dict.fromkeys(columns, "category")) if columns else df
+
+
+@st.cache_data(
+    ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False
+)
+def _read(sql, params, version):
+    # `version` is unused in the body; it only takes part in the cache key.
+    _calls.miss = True
+    with get_pool().connection() as conn:
+        return _categorical(pd.read_sql(sql, conn, params=list(params)))
+
+
+@st.cache_data(
+    ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False
+)
+def _read_columnar(sql, params, version):
+    _calls.miss = True
+    cursor = get_duckdb().cursor()  # one cursor per call: thread-safe
+    try:
+        return _categorical(columnar.read(cursor, sql, params))
+    finally:
+        cursor.close()
+
+
+@st.cache_data(
+    ttl=CACHE_TTL_SECONDS, max_entries=CACHE_MAX_ENTRIES, show_spinner=False
+)
+def _plan(sql, params, version):
+    with get_pool().connection() as conn:
+        return profiling.query_plan(conn, sql, params)
+
+
+def _profiled(name, backend, reader, sql, params):
+    version = data_version(*tables_read(sql))
+    if not profiling.enabled():
+        return reader(sql, params, version)
+    _calls.miss = False
+    started = time.perf_counter()
+    df = reader(sql, params, version)
+    seconds = time.perf_counter() - started
+    # Plans come from SQLite, so DuckDB-served queries are recorded without.
+    plan = _plan(sql, params, version) if backend == "sqlite" else None
+    profiling.record_query(
+        name, sql, params, seconds, len(df),
+        "miss" if _calls.miss else "hit", backend, plan,
+    )
+    return df
+
+
+def run(sql, params=(), name=None):
+    """Run an ad-hoc statement through the cache (``name`` labels it in
+    profiles; the SQL fingerprint otherwise)."""
+    return _profiled(name, "sqlite", _read, sql, tuple(params))
+
+
+def query_params(name, params=(), window=None):
+    """Full params of a named query: the window's first when it is in
+    ``WINDOWED`` (``window`` defaults to the session's)."""
+    if name not in WINDOWED:
+        return tuple(params)
+    window = window or time_window.current()
+    return window.params(WINDOWED[name]) + tuple(params)
+
+
+def load(name, params=(), window=None):
+    """Run a named query from ``core.queries.QUERIES`` through the cache."""
+    params = query_params(name, params, window)
+    if columnar.BACKEND == "duckdb" and name in COLUMNAR_QUERIES:
+        return _profiled(name, "duckdb", _read_columnar, QUERIES[name], params)
+    return _profiled(name, "sqlite", _read, QUERIES[name], params)
+
+
+def scalar(name, column, params=()):
+    """First-row value of ``column`` for single-value KPI queries."""
+    return load(name, params)[column][0]
+
+
+# ---------------- STATIC SNAPSHOTS ----------------
+class Snapshot(Mapping):
+    """Read-only frames of one page's static datasets.
+
+    Frames are shared by every session, so each lookup hands out a shallow
+    copy: adding or replacing columns stays local to the rerun, but values
+    must never be edited in place.
+    """
+
+    def __init__(self, frames):
+        self._frames = frames
+
+    def __getitem__(self, dataset):
+        return self._frames[dataset].copy(deep=False)
+
+    def __iter__(self):
+        return iter(self._frames)
+
+    def __len__(self):
+        return len(self._frames)
+
+
+def _dataset(dataset):
+    """``"name"`` or ``("name", *params)`` -> (name, params)."""
+    if isinstance(dataset, str):
+        return dataset, ()
+    return dataset[0], tuple(dataset[1:])
+
+
+@st.cache_resource(max_entries=2, show_spinner=False)
+def _mapped(build):
+    return serving.open_build(build)
+
+
+@st.cache_resource(max_entries=SNAPSHOT_MAX_ENTRIES, show_spinner=False)
+def _snapshot(datasets, window, version, build=None):
+    # `build` set: the memory-mapped serving build (see core.serving) keys the
+    # entry instead of the database, and only datasets it lacks (custom
+    # windows, for one) hit SQL.
+    _calls.snapshot_miss = True
+    mapped = _mapped(build) if build else {}
+    frames = {}
+    for dataset in datasets:
+        name, params = _dataset(dataset)
+        frame = mapped.get(serving.key(name, query_params(name, params, window)))
+        frames[dataset] = (
+            load(name, params, window) if frame is None else frame
+        )
+    return frames
+
+
+def _snapshot_key(datasets):
+    """(version, build) for ``_snapshot``: the published build when serving
+    from memory-mapped files, the versions of the tables read otherwise."""
+    build = serving.current()
+    if build:
+        return (), build
+    tables = {
+        table for dataset in datasets
+        for table in tables_read(QUERIES[_dataset(dataset)[0]])
+    }
+    return data_version(*sorted(tables)), None
+
+
+def snapshot(*datasets):
+    """A page's static datasets, named queries that no widget changes.
+
+    Each dataset is a query name or a ``(name, *params)`` tuple with fixed
+    params, and is looked up in the result under the same key:
+
+        static = snapshot("airport_traffic", ("top_airlines", 5))
+        static["top_airlines", 5]
+
+    The first rerun after a data change or in a new time window runs the
+    queries (through :func:`load`); every later rerun, in any session with
+    the same window, costs one data-version check.
+    """
+    window = time_window.current()
+    if not profiling.enabled():
+        return Snapshot(_snapshot(datasets, window, *_snapshot_key(datasets)))
+    _calls.snapshot_miss = False
+    started = time.perf_counter()
+    frames = _snapshot(datasets, window, *_snapshot_key(datasets))
+    profiling.record(
+        "snapshot", ", ".join(_dataset(d)[0] for d in datasets),
+        time.perf_counter() - started,
+        rows=sum(len(df) for df in frames.values()),
+        cache="miss" if _calls.snapshot_miss else "hit",
+    )
+    return Snapshot(frames)
@@ -0,0 +1,153 @@
+"""SQLite connections shared by the dashboard pages and the offline tools.
+
+Nothing in here depends on Streamlit or pandas, so the loaders and CLIs can
+import it without pulling in the UI stack.
+"""
+import os
+import queue
+import sqlite3
+from contextlib import contextmanager
+from pathlib import Path
+
+# ---------------- PATHS ----------------
+APP_DIR = Path(__file__).resolve().parent.parent
+DATA_DIR = APP_DIR / "data"
+DB_PATH = Path(
+    os.environ.get("AIR_TRACKER_DB", APP_DIR / "database" / "air_tracker.db")
+).resolve()
+
+
+# ---------------- CONNECTIONS ----------------
+def connect(path=DB_PATH, read_only=False):
+    """Open a connection; read-only connections never take a write lock."""
+    path = Path(path).resolve()
+    if read_only:
+        return sqlite3.connect(
+            f"{path.as_uri()}?mode=ro", uri=True, check_same_thread=False
+        )
+    return sqlite3.connect(path, check_same_thread=False)
+
+
+class ConnectionPool:
+    """Fixed-size pool of connections handed out one caller at a time.
+
+    A single sqlite3 connection must not run two statements concurrently, so
+    each Streamlit session thread borrows its own for the duration of a query.
+    """
+
+    def __init__(self, path=DB_PATH, size=4, read_only=True):
+        self.path = Path(path).resolve()
+        self.read_only = read_only
+        self._idle = queue.LifoQueue(maxsize=size)
+        for _ in range(size):
+            self._idle.put(None)
+
+    @contextmanager
+    def connection(self):
+        conn = self._idle.get()
+        try:
+            if conn is None:
+                conn = connect(self.path, read_only=self.read_only)
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while not self._idle.empty():
+            conn = self._idle.get_nowait()
+            if conn is not None:
+                conn.close()
+
+
+# ---------------- DATA VERSION ----------------
+# Loaders bump this counter after every committed change so cached query
+# results can be invalidated without relying on file timestamps alone.
+DATA_VERSION_DDL = """
+CREATE TABLE IF NOT EXISTS data_version (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    version INTEGER NOT NULL
+)
+"""
+
+
+def read_data_version(conn):
+    try:
+        row = conn.execute("SELECT version FROM data_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] if row else 0
+
+
+# One counter per table next to it, so a cached result only has to be
+# recomputed when a table it reads changed (see core.data).
+TABLE_VERSION_DDL = """
+CREATE TABLE IF NOT EXISTS table_version (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+)
+"""
+
+
+def read_table_versions(conn):
+    """{table: version}, plus ``schema_version``; {} while no table has a
+    version yet (or without the tables)."""
+    try:
+        rows = conn.execute(
+            "SELECT name, version FROM table_version"
+        ).fetchall()
+        if not rows:
+            return {}
+        (schema,) = conn.execute(
+            "SELECT MAX(version) FROM schema_version"
+        ).fetchone()
+    except sqlite3.OperationalError:
+        return {}
+    return {**dict(rows), "schema_version": schema}
+
+
+def bump_data_version(conn, *tables):
+    """Increment the counter, and those of ``tables``, inside the caller's
+    transaction."""
+    conn.execute(DATA_VERSION_DDL)
+    conn.execute(
+        """
+        INSERT INTO data_version (id, version) VALUES (1, 1)
+        ON CONFLICT (id) DO UPDATE SET version = version + 1
+        """
+    )
+    if tables:
+        conn.execute(TABLE_VERSION_DDL)
+        conn.executemany(
+            """
+            INSERT INTO table_version (name, version) VALUES (?, 1)
+            ON CONFLICT (name) DO UPDATE SET version = version + 1
+            """,
+            [(table,) for table in tables],
+        )
+    return read_data_version(conn)
+
+
+def version_key(conn, tables=(), path=DB_PATH):
+    """Key that changes whenever one of ``tables`` (or the schema) does.
+
+    Without ``tables``, or on a database whose writers have not versioned
+    any table yet (before migration 10, or an empty ``table_version``), the
+    version of the whole file at ``path``: its mtime and the counter. Once
+    ``table_version`` has rows, writers must bump the tables they change.
+    """
+    versions = read_table_versions(conn) if tables else {}
+    if versions:
+        return tuple(versions.get(t, 0) for t in ("schema_version", *tables))
+    return file_signature(path) + (read_data_version(conn),)
+
+
+def file_signature(path=DB_PATH):
+    """mtimes of the database and its WAL file (changes land there first)."""
+    path = Path(path)
+    signature = []
+    for candidate in (path, path.with_name(path.name + "-wal")):
+        try:
+            signature.append(candidate.stat().st_mtime_ns)
+        except FileNotFoundError:
+            signature.append(0)
+    return tuple(signature)
@@ -0,0 +1,165 @@
+"""Flight-level delay engine on integer epoch timestamps.
+
+``scheduled_time``/``actual_time`` are TEXT ('2026-01-02 05:40Z'). Migration
+6 adds ``scheduled_epoch``/``actual_epoch`` (UTC seconds), filled by the
+loader on every upsert, so delay is plain integer arithmetic instead of
+parsing two strings per row per query.
+
+Definitions (shared by core.rollup, core.cube and core.route_graph):
+
+* delay = actual - scheduled in minutes, negative clipped to 0, NULL when
+  either time is missing;
+* delayed = delay >= ``DELAYED_MIN``;
+* averages are over flights with a delay, i.e. weighted by flights.
+
+``delay_query`` builds the filtered aggregate behind the Delay Analysis
+explorer: any mix of airline, route, hour of day and dates, grouped by one
+of ``GROUPS``.
+"""
+from .encoding import key_match
+from .window import epoch_day
+
+DELAYED_MIN = 15
+
+# Portable (SQLite and DuckDB): no two-argument MAX.
+DELAY_MIN_SQL = """
+    (CASE
+        WHEN f.actual_epoch >= f.scheduled_epoch
+            THEN (f.actual_epoch - f.scheduled_epoch) / 60.0
+        WHEN f.actual_epoch < f.scheduled_epoch THEN 0.0
+    END)
+"""
+
+EPOCH_SQL = "CAST(strftime('%s', {}) AS INTEGER)"
+
+# Installed by migration 6 (see core.migrations). The backfill goes through
+# the change-tracking triggers, so every derived table and the Parquet copy
+# are rewritten once with the new columns.
+EPOCH_DDL = [
+    "ALTER TABLE flights ADD COLUMN scheduled_epoch INTEGER",
+    "ALTER TABLE flights ADD COLUMN actual_epoch INTEGER",
+    f"""
+    UPDATE flights SET
+        scheduled_epoch = {EPOCH_SQL.format("scheduled_time")},
+        actual_epoch = {EPOCH_SQL.format("actual_time")}
+    """,
+]
+
+# Derived columns the loader computes from the CSV columns (see core.ingest).
+FLIGHT_EPOCHS = {
+    "scheduled_epoch": EPOCH_SQL.format("{scheduled_time}"),
+    "actual_epoch": EPOCH_SQL.format("{actual_time}"),
+    # The day partition of the time window (see core.window, migration 8).
+    "epoch_day": EPOCH_SQL.format("{scheduled_time}") + " / 86400",
+}
+
+HOUR_SQL = "((f.scheduled_epoch % 86400) / 3600)"
+
+# group name -> SQL key (UTC)
+GROUPS = {
+    "airline": "f.airline_name",
+    "origin": "f.origin_iata",
+    "destination": "f.destination_iata",
+    "route": "f.origin_iata || ' → ' || f.destination_iata",
+    "hour": HOUR_SQL,
+    "day": "date(f.scheduled_epoch, 'unixepoch')",
+}
+
+# group name -> what it is grouped on, when not its SQL key: the integer keys
+# of encoded dimensions (see core.encoding)
+GROUP_KEYS = {
+    "airline": ("f.airline_id",),
+    "origin": ("f.origin_id",),
+    "destination": ("f.destination_id",),
+    "route": ("f.origin_id", "f.destination_id"),
+}
+
+
+def _where(airline=None, origin=None, destination=None, hours=None,
+           date_from=None, date_to=None):
+    """WHERE clause over ``flights f`` for the explorer filters."""
+    sql = "WHERE f.scheduled_epoch IS NOT NULL"
+    params = []
+
+    for column, value in (
+        ("airline_name", airline),
+        ("origin_iata", origin),
+        ("destination_iata", destination),
+    ):
+        if value is not None:
+            sql += f" AND {key_match(column)}"
+            params.append(value)
+
+    if hours is not None:
+        sql += f" AND {HOUR_SQL} BETWEEN ? AND ?"
+        params.extend(hours)
+
+    # Whole days: a range of the indexed day partition column.
+    if date_from is not None:
+        sql += " AND f.epoch_day >= ?"
+        params.append(epoch_day(date_from))
+
+    if date_to is not None:
+        sql += " AND f.epoch_day <= ?"
+        params.append(epoch_day(date_to))
+    return sql, params
+
+
+def delay_query(group_by=None, min_flights=1, limit=None, **filters):
+    """Flight-weighted delay metrics; returns (sql, params).
+
+    ``filters``: ``airline``, ``origin``, ``destination``, ``hours`` (an
+    inclusive (first, last) UTC hour range) and ``date_from``/``date_to``
+    (inclusive days). With ``group_by`` (a ``GROUPS`` key) one row per group
+    with at least ``min_flights`` flights, most delayed first.
+    """
+    where, params = _where(**filters)
+    key = GROUPS[group_by] if group_by else None
+    if key:
+        keys = GROUP_KEYS.get(group_by, (key,))
+        where += "".join(f" AND {k} IS NOT NULL" for k in keys)
+    sql = f"""
+    SELECT
+        {f"{key} AS {group_by}," if key else ""}
+        COUNT(*) AS flights,
+        COUNT({DELAY_MIN_SQL}) AS timed_flights,
+        COUNT(*) FILTER (WHERE {DELAY_MIN_SQL} >= {DELAYED_MIN})
+            AS delayed_flights,
+        COUNT(*) FILTER (WHERE f.status = 'Canceled')
+            AS cancelled_flights,
+        ROUND(AVG({DELAY_MIN_SQL}), 2) AS avg_delay_min,
+        ROUND(
+            100.0 * COUNT(*) FILTER (WHERE {DELAY_MIN_SQL} >= {DELAYED_MIN})
+            / COUNT(*), 2
+        ) AS delay_pct
+    FROM flights f
+    {where}
+    """
+    if key:
+        sql += f"""
+        GROUP BY {", ".join(keys)}
+        HAVING COUNT(*) >= ?
+        ORDER BY delay_pct DESC, avg_delay_min DESC, {group_by}
+        """
+        params.append(min_flights)
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+    return sql, params
+
+
+def delay_histogram_query(bin_min=5, max_min=180, **filters):
+    """Flights per ``bin_min``-minute delay bucket, the last one open-ended
+    at ``max_min``; ``filters`` as for :func:`delay_query`."""
+    where, params = _where(**filters)
+    sql = f"""
+    SELECT
+        MIN(CAST({DELAY_MIN_SQL} / ? AS INTEGER) * ?, ?) AS delay_min,
+        COUNT(*) AS flights
+    FROM flights f
+    {where}
+      AND f.actual_epoch IS NOT NULL
+    GROUP BY 1
+    ORDER BY 1
+    """
+    return sql, [bin_min, bin_min, max_min, *params]
@@ -0,0 +1,108 @@
+"""Materialized ``flight_dims`` table: distinct filter values of ``flights``.
+
+The Flights page selectboxes read their options from here instead of
+running ``SELECT DISTINCT`` over ``flights`` on every rerun. One row per
+(dimension, value) with its flight count, keyed for a prefix lookup on
+``dim``. Rebuilt by the loader whenever ``flights`` changes:
+
+    python -m core.dims
+
+The live feed (core.live) adjusts the counts of the values its flights
+left or took instead (``update_flight_dims``).
+"""
+import argparse
+from collections import Counter
+
+from . import db
+from .encoding import ENCODED
+
+# dimension name -> flights column
+DIMENSIONS = {
+    "airline": "airline_name",
+    "status": "status",
+    "origin": "origin_iata",
+    "destination": "destination_iata",
+    "flight_type": "flight_type",
+}
+
+DIMS_DDL = """
+CREATE TABLE flight_dims (
+    dim TEXT NOT NULL,
+    value TEXT NOT NULL,
+    flights INTEGER NOT NULL,
+    PRIMARY KEY (dim, value)
+) WITHOUT ROWID
+"""
+
+# Grouped on the integer keys (see core.encoding), each a covering index scan.
+DIMS_FILL = " UNION ALL ".join(
+    f"""
+    SELECT '{dim}', {column}, COUNT(*)
+    FROM flights
+    WHERE {ENCODED[column][0]} IS NOT NULL
+    GROUP BY {ENCODED[column][0]}
+    """
+    for dim, column in DIMENSIONS.items()
+)
+
+
+def rebuild_flight_dims(conn):
+    """Recreate the table from ``flights`` in one transaction."""
+    conn.execute("BEGIN")
+    try:
+        conn.execute("DROP TABLE IF EXISTS flight_dims")
+        conn.execute(DIMS_DDL)
+        conn.execute(
+            f"INSERT INTO flight_dims (dim, value, flights) {DIMS_FILL}"
+        )
+        db.bump_data_version(conn, "flight_dims")
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+    return conn.execute("SELECT COUNT(*) FROM flight_dims").fetchone()[0]
+
+
+def update_flight_dims(conn, before, after):
+    """Move counts from the ``before`` to the ``after`` values of changed
+    flights, inside the caller's transaction.
+
+    Both are lists of {flights column: value} for the same flights (an
+    empty dict for a flight that is new). Returns the number of (dim,
+    value) counts changed.
+    """
+    delta = Counter()
+    for sign, rows in ((-1, before), (1, after)):
+        for row in rows:
+            for dim, column in DIMENSIONS.items():
+                if row.get(column) is not None:
+                    delta[dim, row[column]] += sign
+    changed = [(dim, value, n) for (dim, value), n in delta.items() if n]
+    conn.executemany(
+        """
+        INSERT INTO flight_dims (dim, value, flights) VALUES (?, ?, ?)
+        ON CONFLICT (dim, value) DO UPDATE SET flights = flights + excluded.flights
+        """,
+        changed,
+    )
+    conn.execute("DELETE FROM flight_dims WHERE flights <= 0")
+    if changed:
+        db.bump_data_version(conn, "flight_dims")
+    return len(changed)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=db.DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    conn = db.connect(args.db)
+    try:
+        rows = rebuild_flight_dims(conn)
+    finally:
+        conn.close()
+    print(f"flight_dims rebuilt: {rows} rows")
+
+
+if __name__ == "__main__":
+    main()
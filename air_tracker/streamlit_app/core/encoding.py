@@ -0,0 +1,269 @@
+"""Dictionary-encoded dimensions of ``flights``.
+
+Airline names, statuses, flight types and IATA codes used to be repeated as
+TEXT on every flight. Migration 9 moves the rows to ``flight_facts``, which
+keeps a small-integer key into a two-column dimension table instead, and
+replaces ``flights`` by a view that looks the values up under the old
+column names, so SQL written against ``flights`` keeps working:
+
+    airline_name      -> airline_id      dim_airline
+    status            -> status_id       dim_status
+    flight_type       -> flight_type_id  dim_flight_type
+    origin_iata       -> origin_id       dim_iata
+    destination_iata  -> destination_id  dim_iata
+
+Each value column of the view is a primary-key lookup that SQLite only runs
+for the rows and columns a query reads. A filter or join on a value cannot
+use an index, though: compare the key instead (``key_match``), and group on
+the keys, which the view exposes too, rather than on strings.
+
+The loader encodes every chunk with an ``Encoder`` before upserting it;
+status spellings are canonicalized on the way in (``canonical_status``), so
+"Cancelled", "canceled" and "CANCELED" are all stored as ``'Canceled'``.
+"""
+import re
+
+# flights column -> (key column in flight_facts, dimension table)
+ENCODED = {
+    "airline_name": ("airline_id", "dim_airline"),
+    "origin_iata": ("origin_id", "dim_iata"),
+    "destination_iata": ("destination_id", "dim_iata"),
+    "status": ("status_id", "dim_status"),
+    "flight_type": ("flight_type_id", "dim_flight_type"),
+}
+DIMENSION_TABLES = sorted({table for _, table in ENCODED.values()})
+
+# AeroDataBox flight statuses, spelled as the API does.
+STATUSES = (
+    "Unknown", "Expected", "EnRoute", "CheckIn", "Boarding", "GateClosed",
+    "Departed", "Delayed", "Approaching", "Arrived", "Canceled",
+    "CanceledUncertain", "Diverted",
+)
+CANCELLED = "Canceled"
+
+
+def _fold(value):
+    return re.sub(r"[\s_-]", "", value).lower()
+
+
+STATUS_ALIASES = {
+    **{_fold(status): status for status in STATUSES},
+    "cancelled": "Canceled",
+    "cancelleduncertain": "CanceledUncertain",
+}
+
+
+def canonical_status(value):
+    """The ``STATUSES`` spelling of a status; unknown ones only trimmed."""
+    if value is None:
+        return None
+    return STATUS_ALIASES.get(_fold(value), value.strip())
+
+
+def _status_sql(column):
+    """``canonical_status`` in SQL, for the migration's backfill."""
+    folded = column
+    for char in (" ", "_", "-"):
+        folded = f"REPLACE({folded}, '{char}', '')"
+    cases = " ".join(
+        f"WHEN '{alias}' THEN '{status}'"
+        for alias, status in STATUS_ALIASES.items()
+    )
+    return f"COALESCE(CASE LOWER({folded}) {cases} END, TRIM({column}))"
+
+
+class Encoder:
+    """Value -> key for every dimension table, adding unseen values.
+
+    Keys are handed out inside the caller's transaction, so a chunk that
+    rolls back takes its new values with it; use one encoder per load.
+    """
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.keys = {
+            table: dict(conn.execute(f"SELECT value, id FROM {table}"))
+            for table in DIMENSION_TABLES
+        }
+
+    def key(self, table, value):
+        if value is None:
+            return None
+        keys = self.keys[table]
+        if value not in keys:
+            keys[value] = self.conn.execute(
+                f"INSERT INTO {table} (value) VALUES (?)", (value,)
+            ).lastrowid
+        return keys[value]
+
+    def encode(self, columns, rows):
+        """Rows of ``columns`` with encoded values replaced by their keys."""
+        plan = [
+            (i, ENCODED[c][1], canonical_status if c == "status" else None)
+            for i, c in enumerate(columns) if c in ENCODED
+        ]
+        for row in rows:
+            row = list(row)
+            for i, table, canonical in plan:
+                value = canonical(row[i]) if canonical else row[i]
+                row[i] = self.key(table, value)
+            yield tuple(row)
+
+
+def key_match(column, alias="f"):
+    """``alias.<key> = <key of ?>``: a filter on a ``flights`` value that
+    walks the key's index."""
+    key, table = ENCODED[column]
+    return f"{alias}.{key} = (SELECT id FROM {table} WHERE value = ?)"
+
+
+def stored_columns(columns):
+    """``flights`` column names -> the ``flight_facts`` ones."""
+    return [ENCODED[c][0] if c in ENCODED else c for c in columns]
+
+
+FACTS_DDL = """
+CREATE TABLE flight_facts (
+    flight_id INTEGER PRIMARY KEY,
+    flight_number TEXT,
+    airline_id INTEGER REFERENCES dim_airline (id),
+    aircraft_registration TEXT,
+    origin_id INTEGER REFERENCES dim_iata (id),
+    destination_id INTEGER REFERENCES dim_iata (id),
+    scheduled_time TEXT,
+    actual_time TEXT,
+    status_id INTEGER REFERENCES dim_status (id),
+    flight_type_id INTEGER REFERENCES dim_flight_type (id),
+    scheduled_epoch INTEGER,
+    actual_epoch INTEGER,
+    epoch_day INTEGER
+)
+"""
+
+# Scalar lookups rather than LEFT JOINs: SQLite keeps every join of a view
+# in aggregate queries, even the ones whose columns are never read.
+FLIGHTS_VIEW = """
+CREATE VIEW flights AS
+SELECT
+    f.flight_id,
+    f.flight_number,
+    (SELECT value FROM dim_airline WHERE id = f.airline_id) AS airline_name,
+    f.aircraft_registration,
+    (SELECT value FROM dim_iata WHERE id = f.origin_id) AS origin_iata,
+    (SELECT value FROM dim_iata WHERE id = f.destination_id)
+        AS destination_iata,
+    f.scheduled_time,
+    f.actual_time,
+    (SELECT value FROM dim_status WHERE id = f.status_id) AS status,
+    (SELECT value FROM dim_flight_type WHERE id = f.flight_type_id)
+        AS flight_type,
+    f.scheduled_epoch,
+    f.actual_epoch,
+    f.epoch_day,
+    f.airline_id,
+    f.origin_id,
+    f.destination_id,
+    f.status_id,
+    f.flight_type_id
+FROM flight_facts f
+"""
+
+# The migration 2/3 indexes, on keys instead of values.
+FACTS_INDEXES = [
+    "CREATE INDEX idx_flights_scheduled ON flight_facts (scheduled_time)",
+    """
+    CREATE INDEX idx_flights_airline_sched
+    ON flight_facts (airline_id, scheduled_time)
+    """,
+    """
+    CREATE INDEX idx_flights_airline_status_sched
+    ON flight_facts (airline_id, status_id, scheduled_time)
+    """,
+    """
+    CREATE INDEX idx_flights_status_sched
+    ON flight_facts (status_id, scheduled_time)
+    """,
+    """
+    CREATE INDEX idx_flights_origin_sched
+    ON flight_facts (origin_id, scheduled_time)
+    """,
+    """
+    CREATE INDEX idx_flights_destination_sched
+    ON flight_facts (destination_id, scheduled_time)
+    """,
+    """
+    CREATE INDEX idx_flights_registration_sched
+    ON flight_facts (aircraft_registration, scheduled_time)
+    """,
+    """
+    CREATE INDEX idx_flights_type_status
+    ON flight_facts (flight_type_id, status_id)
+    """,
+    "CREATE INDEX idx_flights_epoch_day ON flight_facts (epoch_day)",
+    """
+    CREATE UNIQUE INDEX ux_flights_natural_key
+    ON flight_facts (flight_number, scheduled_time, flight_type_id)
+    """,
+]
+
+_STATUS = _status_sql("f.status")
+
+# Installed by migration 9 (see core.migrations), together with the
+# change-tracking triggers on flight_facts. Rowids are kept as flight_id, so
+# airport_movements stays valid.
+ENCODING_DDL = [
+    *(
+        f"CREATE TABLE {table} "
+        "(id INTEGER PRIMARY KEY, value TEXT NOT NULL UNIQUE)"
+        for table in DIMENSION_TABLES
+    ),
+    # Partitions whose status spelling changes are recomputed downstream.
+    f"""
+    INSERT INTO flight_changes (airport_iata, day)
+    SELECT DISTINCT f.origin_iata, date(f.scheduled_time)
+    FROM flights f
+    WHERE f.status IS NOT {_STATUS}
+    """,
+    """
+    INSERT INTO dim_airline (value)
+    SELECT DISTINCT airline_name FROM flights
+    WHERE airline_name IS NOT NULL ORDER BY 1
+    """,
+    """
+    INSERT INTO dim_iata (value)
+    SELECT origin_iata FROM flights WHERE origin_iata IS NOT NULL
+    UNION
+    SELECT destination_iata FROM flights WHERE destination_iata IS NOT NULL
+    ORDER BY 1
+    """,
+    f"""
+    INSERT INTO dim_status (value)
+    SELECT DISTINCT {_STATUS} FROM flights f
+    WHERE f.status IS NOT NULL ORDER BY 1
+    """,
+    """
+    INSERT INTO dim_flight_type (value)
+    SELECT DISTINCT flight_type FROM flights
+    WHERE flight_type IS NOT NULL ORDER BY 1
+    """,
+    FACTS_DDL,
+    f"""
+    INSERT INTO flight_facts
+    SELECT
+        f.rowid, f.flight_number, al.id, f.aircraft_registration, o.id,
+        d.id, f.scheduled_time, f.actual_time, st.id, ft.id,
+        f.scheduled_epoch, f.actual_epoch, f.epoch_day
+    FROM flights f
+    LEFT JOIN dim_airline al ON al.value = f.airline_name
+    LEFT JOIN dim_iata o ON o.value = f.origin_iata
+    LEFT JOIN dim_iata d ON d.value = f.destination_iata
+    LEFT JOIN dim_status st ON st.value = {_STATUS}
+    LEFT JOIN dim_flight_type ft ON ft.value = f.flight_type
+    """,
+    "DROP TABLE flights",  # with its indexes and triggers
+    FLIGHTS_VIEW,
+    *FACTS_INDEXES,
+    # The Parquet copy gains the key columns: clear its cursors so the next
+    # export rewrites every day.
+    "DELETE FROM etl_state WHERE key LIKE 'parquet.%'",
+]
@@ -0,0 +1,382 @@
+"""Concurrent, rate-limited AeroDataBox fetcher used by the ingestion notebooks.
+
+One ``aiohttp`` session (pooled keep-alive connections) is shared by a fixed
+number of workers. A token bucket keeps the request rate under the API plan,
+429/5xx responses are retried with exponential backoff (honouring
+``Retry-After``), and every finished key is appended to a JSON-lines
+checkpoint so an interrupted run resumes where it stopped.
+
+From a notebook (IPython supports top-level ``await``)::
+
+    rows = await fetch_all(registrations, AIRCRAFT, api_key=API_KEY,
+                           checkpoint="../data/aircraft_fetch.jsonl")
+
+or from a shell::
+
+    python -m core.fetch aircraft VT-TNM VT-EXL --out aircraft.csv
+
+Point ``base_url`` at ``python -m core.stub_api`` to run without the API.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from pathlib import Path
+
+import aiohttp
+
+API_HOST = "aerodatabox.p.rapidapi.com"
+BASE_URL = f"https://{API_HOST}"
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+# ======================================================
+# SOURCES
+# ======================================================
+# path(key) -> URL path, params(key) -> query params, parse(key, payload) ->
+# parsed value (a row, a list of rows, or None when nothing usable came back).
+Source = namedtuple("Source", "name path params parse")
+
+
+def _parse_airport(code, d):
+    location = d.get("location", {})
+    country = location.get("country", {})
+    return {
+        "icao_code": d.get("icao"),
+        "iata_code": d.get("iata"),
+        "name": d.get("shortname"),
+        "city": location.get("city"),
+        "country": country.get("name"),
+        "continent": country.get("continent"),
+        "latitude": location.get("lat"),
+        "longitude": location.get("lon"),
+        "timezone": d.get("timeZone"),
+    }
+
+
+def _parse_airport_location(lat_lon, data):
+    items = data.get("items", [])
+    if not items:
+        return None
+    item = items[0]
+    return {
+        "name": item.get("name") or item.get("shortName"),
+        "city": item.get("municipalityName"),
+        "country": item.get("countryCode"),
+    }
+
+
+def _parse_aircraft(reg, data):
+    if not isinstance(data, list) or len(data) == 0:
+        return None
+    rec = data[0]
+    return {
+        "registration": rec.get("reg"),
+        "model": rec.get("model"),
+        "manufacturer": None,                 # not provided by API
+        "icao_type_code": rec.get("icaoCode"),
+        "owner": rec.get("airlineName"),
+    }
+
+
+def _flight_row(f, origin, destination, flight_type):
+    movement = f.get("movement", {})
+    return {
+        "flight_number": f.get("number"),
+        "airline_name": f.get("airline", {}).get("name"),
+        "aircraft_registration": f.get("aircraft", {}).get("reg"),
+        "origin_iata": origin.get("airport", {}).get("iata"),
+        "destination_iata": destination.get("airport", {}).get("iata"),
+        "scheduled_time": movement.get("scheduledTime", {}).get("utc"),
+        "actual_time": (
+            movement.get("runwayTime", {}).get("utc")
+            or movement.get("revisedTime", {}).get("utc")
+        ),
+        "status": f.get("status"),
+        "flight_type": flight_type,
+    }
+
+
+def _parse_flights(code, data):
+    rows = []
+    for f in data.get("arrivals", []):
+        if f.get("codeshareStatus") != "IsOperator":
+            continue
+        rows.append(_flight_row(
+            f, f.get("departure", {}), f.get("movement", {}), "arrival"
+        ))
+    for f in data.get("departures", []):
+        if f.get("codeshareStatus") != "IsOperator":
+            continue
+        rows.append(_flight_row(
+            f, f.get("movement", {}), f.get("arrival", {}), "departure"
+        ))
+    return rows
+
+
+AIRPORTS = Source(
+    "airports",
+    lambda code: f"/airports/iata/{code}",
+    lambda code: None,
+    _parse_airport,
+)
+AIRPORT_LOCATION = Source(
+    "airport_location",
+    lambda lat_lon: "/airports/search/location",
+    lambda lat_lon: {
+        "lat": lat_lon[0], "lon": lat_lon[1], "radiusKm": 10, "limit": 1,
+    },
+    _parse_airport_location,
+)
+AIRCRAFT = Source(
+    "aircraft",
+    lambda reg: f"/aircrafts/reg/{reg}/all",
+    lambda reg: None,
+    _parse_aircraft,
+)
+FLIGHTS = Source(
+    "flights",
+    lambda code: f"/flights/airports/iata/{code}",
+    lambda code: None,
+    _parse_flights,
+)
+SOURCES = {s.name: s for s in (AIRPORTS, AIRPORT_LOCATION, AIRCRAFT, FLIGHTS)}
+
+
+# ======================================================
+# RATE LIMITING / CHECKPOINTS
+# ======================================================
+class TokenBucket:
+    """Allow ``rate`` requests per second with bursts of up to ``capacity``."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(
+                    self.capacity,
+                    self._tokens + (now - self._updated) * self.rate,
+                )
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class CheckpointLog:
+    """Append-only JSON-lines record of finished keys.
+
+    Each line is ``{"key": ..., "status": ..., "data": ...}``; appending one
+    line per key replaces rewriting a partial CSV every N rows.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+
+    def load(self):
+        done = {}
+        if self.path.exists():
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except json.JSONDecodeError:
+                        continue  # torn last line from an interrupted run
+                    if _transient(entry):
+                        continue  # retries ran out; a resume tries again
+                    done[_key_id(entry["key"])] = entry
+        return done
+
+    def open(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        out = open(self.path, "a+", encoding="utf-8")
+        if out.tell():
+            out.seek(out.tell() - 1)
+            if out.read(1) != "\n":
+                out.write("\n")  # terminate a torn line before appending
+        return out
+
+
+def _key_id(key):
+    return json.dumps(key)
+
+
+def _transient(entry):
+    return entry["data"] is None and entry.get("status") in RETRY_STATUSES
+
+
+# ======================================================
+# FETCHING
+# ======================================================
+def default_headers(api_key=None):
+    return {
+        "x-rapidapi-key": api_key or os.environ.get("AERODATABOX_API_KEY", ""),
+        "x-rapidapi-host": API_HOST,
+    }
+
+
+async def _get_json(session, bucket, url, params, max_retries):
+    """GET with retry; returns (status, payload or None)."""
+    for attempt in range(max_retries + 1):
+        await bucket.acquire()
+        try:
+            async with session.get(url, params=params) as r:
+                if r.status == 200:
+                    return r.status, await r.json(content_type=None)
+                if r.status not in RETRY_STATUSES or attempt == max_retries:
+                    return r.status, None
+                retry_after = r.headers.get("Retry-After")
+        except (aiohttp.ClientError, asyncio.TimeoutError):
+            if attempt == max_retries:
+                raise
+            retry_after = None
+        delay = min(60.0, 0.5 * 2 ** attempt) * (0.5 + random.random())
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, float(retry_after))
+        await asyncio.sleep(delay)
+
+
+async def fetch_all(keys, source, *, api_key=None, base_url=BASE_URL,
+                    headers=None, concurrency=8, rate=5.0, max_retries=5,
+                    checkpoint=None, timeout=30, progress=None):
+    """Fetch every key of ``source``; returns {key: parsed} in input order.
+
+    Keys already in ``checkpoint`` are not requested again. Keys that end in
+    a non-retryable error (e.g. 404) are checkpointed with ``data`` None so a
+    resume skips them too. Keys still answered with a 429/5xx, or still
+    failing to connect, after ``max_retries`` come back as None and are
+    left out, so a resume requests them again; ``progress`` gets the
+    exception's name as the status of a connection failure.
+    """
+    keys = list(dict.fromkeys(keys))
+    log = CheckpointLog(checkpoint) if checkpoint else None
+    done = log.load() if log else {}
+    results = {
+        key: done[_key_id(key)]["data"] for key in keys if _key_id(key) in done
+    }
+    todo = [key for key in keys if _key_id(key) not in done]
+
+    queue = asyncio.Queue()
+    for key in todo:
+        queue.put_nowait(key)
+
+    bucket = TokenBucket(rate)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    client_timeout = aiohttp.ClientTimeout(total=timeout)
+    out = log.open() if log else None
+    finished = [len(results)]
+
+    async def worker(session):
+        while True:
+            try:
+                key = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            try:
+                status, payload = await _get_json(
+                    session, bucket, base_url + source.path(key),
+                    source.params(key), max_retries,
+                )
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                # Not checkpointed, so a resume requests the key again.
+                results[key] = None
+                finished[0] += 1
+                if progress:
+                    progress(finished[0], len(keys), key, type(exc).__name__)
+                continue
+            data = source.parse(key, payload) if payload is not None else None
+            results[key] = data
+            entry = {"key": key, "status": status, "data": data}
+            if out and not _transient(entry):
+                out.write(json.dumps(entry) + "\n")
+                out.flush()
+            finished[0] += 1
+            if progress:
+                progress(finished[0], len(keys), key, status)
+
+    try:
+        async with aiohttp.ClientSession(
+            headers=headers or default_headers(api_key),
+            connector=connector,
+            timeout=client_timeout,
+        ) as session:
+            await asyncio.gather(
+                *(worker(session) for _ in range(min(concurrency, len(todo))))
+            )
+    finally:
+        if out:
+            out.close()
+
+    return {key: results.get(key) for key in keys}
+
+
+def rows(results):
+    """Flatten {key: row | [rows] | None} into a list of rows."""
+    flat = []
+    for data in results.values():
+        if isinstance(data, list):
+            flat.extend(data)
+        elif data:
+            flat.append(data)
+    return flat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "source", choices=[n for n in SOURCES if n != "airport_location"]
+    )
+    parser.add_argument("keys", nargs="*", help="IATA codes / registrations")
+    parser.add_argument(
+        "--keys-file", help="read keys from this file, one per line"
+    )
+    parser.add_argument("--out", required=True, help="CSV file to write")
+    parser.add_argument("--base-url", default=BASE_URL)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--rate", type=float, default=5.0,
+                        help="requests per second")
+    parser.add_argument("--checkpoint", help="JSON-lines resume log")
+    args = parser.parse_args(argv)
+
+    keys = list(args.keys)
+    if args.keys_file:
+        with open(args.keys_file, encoding="utf-8") as f:
+            keys += [line.strip() for line in f if line.strip()]
+
+    def progress(done, total, key, status):
+        print(f"\r{done}/{total} {key} [{status}]", end="", file=sys.stderr)
+
+    results = asyncio.run(fetch_all(
+        keys, SOURCES[args.source], base_url=args.base_url,
+        concurrency=args.concurrency, rate=args.rate,
+        checkpoint=args.checkpoint, progress=progress,
+    ))
+    print(file=sys.stderr)
+
+    flat = rows(results)
+    if not flat:
+        print("Nothing fetched.")
+        return
+    with open(args.out, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(flat[0]))
+        writer.writeheader()
+        writer.writerows(flat)
+    print(f"{len(flat)} rows written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Process-wide cache of built Plotly figures.
+
+Building a figure is most of what a chart costs: plotly.express groups the
+frame and validates every trace property (about 0.4 s for the airline
+treemap on 200k flights), while serializing the result takes milliseconds.
+Every rerun of every session used to pay it again for the same data.
+``figure`` builds each chart once per (chart spec, content of its inputs)
+and keeps the figure's JSON:
+
+    fig = figure(px.bar, top_df, x="route", y=rank_by, title="Top Routes")
+    st.plotly_chart(fig, use_container_width=True)
+
+The spec is the builder and every argument that is not data; frames,
+series and arrays are keyed by a hash of their content, so a chart comes
+back from the cache whenever its input has the same values, whichever query,
+snapshot or session produced it. Changes made to the figure after it is
+built go in ``layout`` so that they are part of the spec too.
+
+Entries are evicted least recently used once their JSON exceeds
+``AIR_TRACKER_FIGURE_CACHE_MB`` (default 64). A hit turns the JSON back into
+a figure without validating it again; the figure is the caller's to use.
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+import plotly.io as pio
+import streamlit as st
+
+from . import profiling
+
+BUDGET_BYTES = int(
+    float(os.environ.get("AIR_TRACKER_FIGURE_CACHE_MB", "64")) * 2**20
+)
+
+
+class FigureCache:
+    """Figure JSON by key, least recently used first, within ``budget`` bytes."""
+
+    def __init__(self, budget=BUDGET_BYTES):
+        self.budget = budget
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            spec = self._entries.get(key)
+            if spec is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return spec
+
+    def put(self, key, spec):
+        size = sys.getsizeof(spec)
+        if size > self.budget:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.size -= sys.getsizeof(old)
+            self._entries[key] = spec
+            self.size += size
+            while self.size > self.budget:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= sys.getsizeof(evicted)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+@st.cache_resource
+def get_cache():
+    return FigureCache()
+
+
+def _digest(value, h):
+    """Feed ``value`` to hash ``h``: data by content, anything else by repr."""
+    if isinstance(value, pd.DataFrame):
+        h.update(repr((list(value.columns), list(value.dtypes))).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy())
+    elif isinstance(value, pd.Series):
+        h.update(repr((value.name, value.dtype)).encode())
+        h.update(pd.util.hash_pandas_object(value, index=True).to_numpy())
+    elif isinstance(value, np.ndarray):
+        h.update(repr((value.dtype, value.shape)).encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    else:
+        h.update(repr(value).encode())
+
+
+def figure_key(build, args, kwargs, layout=None):
+    """Key of the figure ``build(*args, **kwargs)`` with ``layout`` applied."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(f"{build.__module__}.{build.__qualname__}".encode())
+    for value in args:
+        _digest(value, h)
+    for name in sorted(kwargs):
+        h.update(f"|{name}=".encode())
+        _digest(kwargs[name], h)
+    h.update(repr(sorted((layout or {}).items())).encode())
+    return h.hexdigest()
+
+
+def figure(build, *args, layout=None, **kwargs):
+    """``build(*args, **kwargs)`` (a plotly.express function), then
+    ``update_layout(layout)``, served from the shared cache when the same
+    chart was built before."""
+    started = time.perf_counter()
+    cache = get_cache()
+    key = figure_key(build, args, kwargs, layout)
+    spec = cache.get(key)
+    if spec is not None:
+        fig = go.Figure(json.loads(spec), _validate=False)
+    else:
+        fig = build(*args, **kwargs)
+        if layout:
+            fig.update_layout(layout)
+        cache.put(key, pio.to_json(fig, validate=False))
+    if profiling.enabled():
+        frame = args[0] if args else kwargs.get("data_frame")
+        profiling.record(
+            "figure", kwargs.get("title") or build.__name__,
+            time.perf_counter() - started,
+            rows=len(frame) if frame is not None else None,
+            cache="hit" if spec is not None else "miss",
+        )
+    return fig
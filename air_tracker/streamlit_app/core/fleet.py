@@ -0,0 +1,20 @@
+"""The Aircraft page's fleet timeline (core.timelines), cached per data
+version and time window."""
+import streamlit as st
+
+from .data import data_version, get_pool
+from .timelines import MAX_TURNAROUND, FleetTimeline  # noqa: F401
+from .window import current
+
+
+# A few windows of the current and the previous data version.
+@st.cache_resource(max_entries=8, show_spinner="Building aircraft timelines...")
+def _fleet_timeline(version, window):
+    with get_pool().connection() as conn:
+        return FleetTimeline.from_db(conn, window)
+
+
+def fleet_timeline():
+    """The ``FleetTimeline`` of the current data in the session's time
+    window, rebuilt when either changes."""
+    return _fleet_timeline(data_version("flights", "aircraft"), current())
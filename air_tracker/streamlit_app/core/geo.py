@@ -0,0 +1,32 @@
+"""The Airports page's density map: the airport ``GridIndex``
+(core.grid) cached per data version and time window."""
+import streamlit as st
+
+from .data import data_version, load
+from .grid import CELLS, VIEWPORTS, GridIndex, map_view  # noqa: F401
+from .queries import QUERIES, tables_read
+from .window import current
+
+
+def _version():
+    return data_version(*tables_read(QUERIES["airport_traffic"]))
+
+
+@st.cache_resource(max_entries=8)  # a few windows, two data versions
+def _airport_index(version, window):
+    return GridIndex(load("airport_traffic", window=window))
+
+
+def airport_index():
+    """The ``GridIndex`` of ``airport_traffic`` in the session's time window,
+    rebuilt when data changes."""
+    return _airport_index(_version(), current())
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def _airport_bins(bounds, cells, version, window):
+    return _airport_index(version, window).bins(bounds, cells)
+
+
+def airport_bins(bounds, cells=CELLS):
+    return _airport_bins(tuple(bounds), cells, _version(), current())
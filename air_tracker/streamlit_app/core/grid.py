@@ -0,0 +1,119 @@
+"""Viewport-aware grid binning for the airport density map.
+
+Instead of one marker per airport, the map gets one marker per occupied
+grid cell inside the visible area. The cell size follows the viewport
+(``cells`` columns across it, doubled until at most ``max_points`` cells
+are occupied), so the figure stays bounded whether it shows the whole world
+or one metro area; zoomed in far enough, every cell holds a single airport
+and the map shows airports again.
+
+Coordinates are kept in a ``GridIndex`` sorted by latitude, built once per
+data version and time window; a viewport query is two binary searches plus
+a longitude mask, and the binning is a handful of NumPy passes.
+"""
+import math
+
+import numpy as np
+import pandas as pd
+
+CELLS = 48          # grid columns across the viewport
+MAX_POINTS = 1_000  # markers per figure, whatever the viewport
+
+# name -> (south, west, north, east); west > east wraps the antimeridian.
+VIEWPORTS = {
+    "World": (-60.0, -180.0, 75.0, 180.0),
+    "Africa": (-36.0, -20.0, 38.0, 55.0),
+    "Asia": (-11.0, 25.0, 56.0, 150.0),
+    "Europe": (34.0, -25.0, 72.0, 45.0),
+    "North America": (7.0, -170.0, 72.0, -50.0),
+    "Oceania": (-50.0, 110.0, 0.0, -175.0),
+    "South America": (-56.0, -82.0, 13.0, -34.0),
+}
+
+
+def _span(west, east):
+    return (east - west) % 360 or 360.0
+
+
+def map_view(bounds):
+    """Plotly mapbox ``center`` and ``zoom`` that frame ``bounds``."""
+    south, west, north, east = bounds
+    width = _span(west, east)
+    lon = (west + width / 2 + 180) % 360 - 180
+    # Web-mercator tiles are 360 degrees wide at zoom 0.
+    zoom = math.log2(360 / max(width, (north - south) * 2))
+    return {"lat": (south + north) / 2, "lon": lon}, max(zoom, 0.0)
+
+
+class GridIndex:
+    """Airport coordinates and weights sorted by latitude."""
+
+    def __init__(self, df, weight="total_movements"):
+        df = df.dropna(subset=["latitude", "longitude"])
+        order = np.argsort(df["latitude"].to_numpy(), kind="stable")
+        self.lat = df["latitude"].to_numpy(float)[order]
+        self.lon = df["longitude"].to_numpy(float)[order]
+        self.weight = df[weight].fillna(0).to_numpy(float)[order]
+        self.iata = df["iata_code"].to_numpy(object)[order]
+        self.name = df["name"].to_numpy(object)[order]
+        self.city = df["city"].to_numpy(object)[order]
+
+    def __len__(self):
+        return len(self.lat)
+
+    def window(self, bounds):
+        """Positions of the airports inside ``bounds``."""
+        south, west, north, east = bounds
+        lo = np.searchsorted(self.lat, south, side="left")
+        hi = np.searchsorted(self.lat, north, side="right")
+        lon = self.lon[lo:hi]
+        if west <= east:
+            inside = (lon >= west) & (lon <= east)
+        else:
+            inside = (lon >= west) | (lon <= east)
+        return lo + np.flatnonzero(inside)
+
+    def bins(self, bounds, cells=CELLS, max_points=MAX_POINTS):
+        """One row per occupied grid cell inside ``bounds``."""
+        south, west, north, east = bounds
+        rows = self.window(bounds)
+        lat, weight = self.lat[rows], self.weight[rows]
+        x = (self.lon[rows] - west) % 360  # wrap-safe offset from the west edge
+
+        size = max(_span(west, east), north - south) / cells
+        while True:
+            col = np.floor(x / size).astype(np.int64)
+            row = np.floor((lat - south) / size).astype(np.int64)
+            keys = row * (int(360 / size) + 2) + col
+            cells_used, inverse = np.unique(keys, return_inverse=True)
+            if len(cells_used) <= max_points:
+                break
+            size *= 2
+
+        # Centroids weighted by traffic (+1 so idle airports still count).
+        w = weight + 1
+        total_w = np.bincount(inverse, w)
+        centre_lat = np.bincount(inverse, lat * w) / total_w
+        centre_x = np.bincount(inverse, x * w) / total_w
+
+        # The busiest airport names each cell.
+        order = np.lexsort((weight, inverse))
+        last = np.r_[np.flatnonzero(np.diff(inverse[order])), len(order) - 1]
+        top = rows[order[last]] if len(order) else rows[:0]
+
+        airports = np.bincount(inverse).astype(np.int64)
+        names = np.where(
+            airports == 1,
+            self.name[top],
+            [f"{n} airports around {code}"
+             for n, code in zip(airports, self.iata[top])],
+        )
+        return pd.DataFrame({
+            "latitude": centre_lat,
+            "longitude": (centre_x + west + 180) % 360 - 180,
+            "name": names,
+            "iata_code": self.iata[top],
+            "city": self.city[top],
+            "airports": airports,
+            "total_movements": np.bincount(inverse, weight).astype(np.int64),
+        })
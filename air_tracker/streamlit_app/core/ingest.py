@@ -0,0 +1,251 @@
+"""Streaming, idempotent CSV -> SQLite loader.
+
+Replaces the ``to_sql(if_exists="append")`` cells of _load_to_sql.ipynb.
+Every CSV in ``data/`` is read in fixed-size chunks and upserted on its
+natural key, one transaction per chunk, so memory stays bounded and running
+the loader twice leaves the database unchanged:
+
+    python -m core.ingest                    # airport, aircraft, flights
+    python -m core.ingest --tables flights   # just one
+
+``airport_delays`` is derived from ``flights`` by core.rollup after every
+load; its CSV snapshot is only loaded when asked for explicitly. Flights are
+stored dictionary-encoded in ``flight_facts`` (see core.encoding).
+"""
+import argparse
+import csv
+import time
+from itertools import islice
+from pathlib import Path
+
+from . import columnar, cube, db, sketch
+from .delays import FLIGHT_EPOCHS
+from .dims import rebuild_flight_dims
+from .encoding import ENCODED, Encoder, stored_columns
+from .migrations import migrate
+from .movements import rebuild_airport_movements
+from .rollup import rollup
+
+DEFAULT_CHUNK_SIZE = 50_000
+
+# Load order matters only for readability; there are no foreign keys.
+TABLES = {
+    "airport": {
+        "csv": "airports.csv",
+        "columns": [
+            "icao_code", "iata_code", "name", "city", "country",
+            "continent", "latitude", "longitude", "timezone",
+        ],
+        "key": ["iata_code"],
+    },
+    "aircraft": {
+        "csv": "aircraft.csv",
+        "columns": [
+            "registration", "model", "manufacturer", "icao_type_code", "owner",
+        ],
+        "key": ["registration"],
+    },
+    "flights": {
+        "csv": "flights.csv",
+        "columns": [
+            "flight_number", "airline_name", "aircraft_registration",
+            "origin_iata", "destination_iata", "scheduled_time",
+            "actual_time", "status", "flight_type",
+        ],
+        "key": ["flight_number", "scheduled_time", "flight_type"],
+        # Computed by SQLite from the loaded columns on every upsert.
+        "derived": FLIGHT_EPOCHS,
+        # Written to this table with ENCODED columns replaced by their keys.
+        "table": "flight_facts",
+        "encoded": ENCODED,
+    },
+    "airport_delays": {
+        "csv": "airport_delays.csv",
+        "columns": [
+            "airport_iata", "delay_date", "total_flights", "delayed_flights",
+            "avg_delay_min", "median_delay_min", "canceled_flights",
+        ],
+        "key": ["airport_iata", "delay_date"],
+    },
+}
+DEFAULT_TABLES = ("airport", "aircraft", "flights")
+
+# Bulk-load settings; the file is switched back to a rollback journal at the
+# end so the read-only dashboard never needs -wal/-shm files next to it.
+BULK_PRAGMAS = [
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-262144",  # 256 MiB
+    "PRAGMA mmap_size=268435456",
+]
+
+
+def upsert_sql(table, columns, key, derived=None):
+    """INSERT ... ON CONFLICT DO UPDATE that skips rows which did not change.
+
+    ``derived`` maps extra columns to SQL expressions over the loaded ones,
+    written as ``{column}`` placeholders (bound to the same parameter).
+    """
+    derived = derived or {}
+    slots = {c: f"?{i}" for i, c in enumerate(columns, start=1)}
+    values = [*slots.values(), *(e.format(**slots) for e in derived.values())]
+    updates = [c for c in columns if c not in key]
+    assignments = ", ".join(
+        f"{c} = excluded.{c}" for c in [*updates, *derived]
+    )
+    changed = " OR ".join(f"{c} IS NOT excluded.{c}" for c in updates)
+    return (
+        f"INSERT INTO {table} ({', '.join([*columns, *derived])}) "
+        f"VALUES ({', '.join(values)}) "
+        f"ON CONFLICT ({', '.join(key)}) DO UPDATE SET {assignments} "
+        f"WHERE {changed}"
+    )
+
+
+def read_rows(path, columns, key, stats):
+    """Yield CSV rows as tuples with '' -> NULL.
+
+    Rows missing part of their natural key cannot be upserted idempotently,
+    so they are counted in ``stats["skipped"]`` and dropped.
+    """
+    key_idx = [columns.index(k) for k in key]
+    with open(path, newline="", encoding="utf-8") as f:
+        for record in csv.DictReader(f):
+            row = tuple(
+                (record.get(c) or "").strip() or None for c in columns
+            )
+            if any(row[i] is None for i in key_idx):
+                stats["skipped"] += 1
+                continue
+            yield row
+
+
+def upsert_rows(conn, table, rows, encoder=None):
+    """Upsert tuples of ``TABLES[table]["columns"]`` inside the caller's
+    transaction; returns the number of rows changed.
+
+    Pass the ``Encoder`` of the load for tables with encoded columns.
+    """
+    spec = TABLES[table]
+    encoded = spec.get("encoded")
+    sql = upsert_sql(
+        spec.get("table", table),
+        stored_columns(spec["columns"]) if encoded else spec["columns"],
+        stored_columns(spec["key"]) if encoded else spec["key"],
+        spec.get("derived"),
+    )
+    if encoded:
+        rows = encoder.encode(spec["columns"], rows)
+    # Rows the statement itself wrote: not the change log's, nor new keys.
+    changed = conn.executemany(sql, rows).rowcount
+    if changed:
+        db.bump_data_version(conn, table)
+    return changed
+
+
+def load_table(conn, table, data_dir=db.DATA_DIR, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Upsert one CSV; returns (rows_read, rows_changed, rows_skipped)."""
+    spec = TABLES[table]
+    encoder = Encoder(conn) if spec.get("encoded") else None
+    stats = {"skipped": 0}
+    rows = read_rows(
+        Path(data_dir) / spec["csv"], spec["columns"], spec["key"], stats
+    )
+
+    key_idx = [spec["columns"].index(k) for k in spec["key"]]
+    total = 0
+    changed = 0
+    while chunk := list(islice(rows, chunk_size)):
+        # Later rows win, exactly as the upsert would resolve them, but
+        # without writing the earlier versions first.
+        latest = {tuple(row[i] for i in key_idx): row for row in chunk}
+        conn.execute("BEGIN")
+        try:
+            chunk_changes = upsert_rows(conn, table, latest.values(), encoder)
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+        total += len(chunk)
+        changed += chunk_changes
+    return total, changed, stats["skipped"]
+
+
+def ingest(conn, tables=DEFAULT_TABLES, data_dir=db.DATA_DIR,
+           chunk_size=DEFAULT_CHUNK_SIZE, parquet=columnar.BACKEND == "duckdb",
+           log=print):
+    """Migrate, load ``tables`` and rebuild the derived tables.
+
+    With ``parquet`` the changed days are also exported for the columnar
+    backend (on by default when ``AIR_TRACKER_BACKEND=duckdb``); without
+    it the export's change-log cursor is released (see core.columnar).
+    """
+    for pragma in BULK_PRAGMAS:
+        conn.execute(pragma)
+    # Migrations can rewrite flights (de-duplication), so derived tables
+    # are rebuilt after them even when the CSVs bring nothing new.
+    applied = migrate(conn)
+
+    changed = {}
+    for table in tables:
+        started = time.perf_counter()
+        rows, changed[table], skipped = load_table(
+            conn, table, data_dir, chunk_size
+        )
+        log(
+            f"{table:<15} {rows:>10} rows read, {changed[table]} changed"
+            f"{f', {skipped} skipped (missing key)' if skipped else ''}"
+            f" in {time.perf_counter() - started:.1f}s"
+        )
+
+    if changed.get("flights") or applied:
+        rebuild_airport_movements(conn)
+        rebuild_flight_dims(conn)
+    log(f"{'airport_delays':<15} {rollup(conn):>10} partitions recomputed")
+    log(f"{'flight_cube':<15} {cube.refresh(conn):>10} partitions recomputed")
+    log(f"{'delay_sketch':<15} {sketch.refresh(conn):>10} days rebuilt")
+    if parquet:
+        written = columnar.export(conn)
+        log(f"{'parquet':<15} {sum(written.values()):>10} rows exported")
+    else:
+        columnar.release(conn)
+
+    conn.execute("PRAGMA optimize")
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("PRAGMA journal_mode=DELETE")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=db.DB_PATH, help="SQLite database path")
+    parser.add_argument(
+        "--data-dir", default=db.DATA_DIR, help="directory holding the CSVs"
+    )
+    parser.add_argument(
+        "--tables", nargs="+", choices=list(TABLES),
+        default=list(DEFAULT_TABLES),
+        help=f"tables to load (default: {' '.join(DEFAULT_TABLES)})",
+    )
+    parser.add_argument(
+        "--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE,
+        help="rows per transaction",
+    )
+    parser.add_argument(
+        "--parquet", action=argparse.BooleanOptionalAction,
+        default=columnar.BACKEND == "duckdb",
+        help="also export the Parquet copy for the DuckDB backend",
+    )
+    args = parser.parse_args(argv)
+
+    conn = db.connect(args.db)
+    try:
+        ingest(
+            conn, args.tables, args.data_dir, args.chunk_size, args.parquet
+        )
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,11 @@
+"""Flight-level KPIs shared by the Overview and Flights pages."""
+from .data import snapshot
+
+
+def flight_kpis():
+    """Every KPI from the single-pass ``flight_kpis`` query as a dict.
+
+    Both pages read the same snapshot, so a data version costs one scan of
+    ``flights`` across all sessions and reruns.
+    """
+    return snapshot("flight_kpis")["flight_kpis"].to_dict("records")[0]
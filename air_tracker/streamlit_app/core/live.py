@@ -0,0 +1,263 @@
+"""Live-feed worker: polls a flight feed and applies it incrementally.
+
+The dashboard used to see new data only after a full notebook run and
+reload. This worker polls a feed on an interval and upserts the flights it
+returns on their natural key, skipping unchanged rows, as core.ingest does:
+
+    python -m core.live --db /tmp/live.db                       # replay flights.csv
+    python -m core.live --source api --airports BLR DEL --base-url http://127.0.0.1:8089
+
+Each poll is one transaction over ``flight_facts`` and the rows of the
+flights that changed in ``flight_dims`` (counts moved between values) and
+``airport_movements``. ``airport_delays``, ``flight_cube``,
+``flight_delay_sketch`` and the Parquet copy then recompute only the
+partitions the change log (core.changes) points at. Nothing is rebuilt.
+
+Every write bumps the version of its table (``db.bump_data_version``).
+Pages with "Live updates" on rerun when the data changes, and only the
+datasets over the changed tables are recomputed (core.data).
+
+The replay feed starts every flight as Expected and later writes the row
+the CSV recorded, so point it at a fresh database rather than at a loaded
+one; the reference tables (airports, aircraft) are loaded at start-up.
+"""
+import argparse
+import asyncio
+import time
+from bisect import bisect_right
+from datetime import datetime, timedelta
+
+from . import columnar, cube, db, sketch
+from .dims import DIMENSIONS, update_flight_dims
+from .encoding import Encoder
+from .ingest import TABLES, ingest, read_rows, upsert_rows
+from .movements import refresh_airport_movements
+from .rollup import rollup
+
+COLUMNS = TABLES["flights"]["columns"]
+KEY = TABLES["flights"]["key"]
+REFERENCE_TABLES = ("airport", "aircraft")
+DEFAULT_INTERVAL = 10.0
+
+# Current values of the polled flights (temp.live_keys), by flight_id.
+TOUCHED_SQL = f"""
+SELECT f.flight_id, {", ".join(f"f.{c}" for c in DIMENSIONS.values())}
+FROM temp.live_keys k
+JOIN flights f
+    ON f.flight_number = k.flight_number
+   AND f.scheduled_time = k.scheduled_time
+   AND f.flight_type_id = (
+       SELECT id FROM dim_flight_type WHERE value = k.flight_type
+   )
+"""
+
+
+# ======================================================
+# FEEDS
+# ======================================================
+# poll() -> rows of COLUMNS since the last poll, or None once the feed ends.
+def _parse_time(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+class ReplayFeed:
+    """``flights.csv`` played back on a clock, ``step`` of feed time a poll.
+
+    Each flight shows up ``lead`` before its scheduled time as Expected with
+    no actual time, and becomes its recorded row (status, actual time) once
+    the clock passes the later of its scheduled and actual times.
+    """
+
+    def __init__(self, path=db.DATA_DIR / "flights.csv",
+                 step=timedelta(minutes=15), lead=timedelta(hours=3)):
+        status, actual = COLUMNS.index("status"), COLUMNS.index("actual_time")
+        scheduled = COLUMNS.index("scheduled_time")
+        events = []
+        for row in read_rows(path, COLUMNS, KEY, {"skipped": 0}):
+            at = _parse_time(row[scheduled])
+            announced = list(row)
+            announced[status], announced[actual] = "Expected", None
+            events.append((at - lead, tuple(announced)))
+            landed = _parse_time(row[actual]) if row[actual] else at
+            events.append((max(at, landed), row))
+        events.sort(key=lambda event: event[0])
+
+        self.times = [at for at, _ in events]
+        self.rows = [row for _, row in events]
+        self.step = step
+        self.clock = self.times[0] - step if events else None
+        self.position = 0
+
+    def poll(self):
+        if self.position >= len(self.rows):
+            return None
+        self.clock += self.step
+        end = bisect_right(self.times, self.clock)
+        rows = self.rows[self.position:end]
+        self.position = end
+        return rows
+
+
+class ApiFeed:
+    """The AeroDataBox flights of ``airports``, fetched in full every poll.
+
+    Point ``base_url`` at ``python -m core.stub_api`` to run without the
+    API; the upsert skips the flights that did not change.
+    """
+
+    def __init__(self, airports, base_url=None, api_key=None, rate=5.0):
+        self.airports = list(airports)
+        self.base_url = base_url
+        self.api_key = api_key
+        self.rate = rate
+
+    def poll(self):
+        from . import fetch  # aiohttp is only needed for this feed
+
+        results = asyncio.run(fetch.fetch_all(
+            self.airports, fetch.FLIGHTS, api_key=self.api_key,
+            base_url=self.base_url or fetch.BASE_URL, rate=self.rate,
+        ))
+        return [
+            tuple(row.get(c) for c in COLUMNS) for row in fetch.rows(results)
+            if all(row.get(k) for k in KEY)
+        ]
+
+
+# ======================================================
+# APPLYING A POLL
+# ======================================================
+def _touched(conn):
+    return {
+        row[0]: dict(zip(DIMENSIONS.values(), row[1:]))
+        for row in conn.execute(TOUCHED_SQL)
+    }
+
+
+def apply(conn, rows):
+    """Upsert one poll's flights and the per-flight tables in one
+    transaction; returns {table: rows changed}."""
+    key_idx = [COLUMNS.index(k) for k in KEY]
+    latest = {tuple(row[i] for i in key_idx): row for row in rows}
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS live_keys "
+            "(flight_number TEXT, scheduled_time TEXT, flight_type TEXT)"
+        )
+        conn.execute("DELETE FROM temp.live_keys")
+        conn.executemany("INSERT INTO temp.live_keys VALUES (?, ?, ?)", latest)
+
+        before = _touched(conn)
+        changed = {"flights": upsert_rows(
+            conn, "flights", latest.values(), Encoder(conn)
+        )}
+        if changed["flights"]:
+            after = _touched(conn)
+            moved = [i for i, values in after.items() if values != before.get(i)]
+            changed["flight_dims"] = update_flight_dims(
+                conn, [before.get(i, {}) for i in moved],
+                [after[i] for i in moved],
+            )
+            # Only the endpoints of a flight decide its movement rows.
+            ends = ("origin_iata", "destination_iata")
+            relinked = [
+                i for i in moved
+                if i not in before
+                or any(after[i][c] != before[i][c] for c in ends)
+            ]
+            if relinked:
+                refresh_airport_movements(conn, relinked)
+            changed["airport_movements"] = len(relinked)
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+    return changed
+
+
+def step(conn, rows, parquet=False):
+    """Apply ``rows``, then bring the change-tracked tables up to date;
+    returns {table: rows or partitions changed}."""
+    changed = apply(conn, rows)
+    if changed["flights"]:
+        changed["airport_delays"] = rollup(conn)
+        changed["flight_cube"] = cube.refresh(conn)
+        changed["flight_delay_sketch"] = sketch.refresh(conn)
+        if parquet:
+            changed["parquet"] = sum(columnar.export(conn).values())
+        else:
+            columnar.release(conn)
+    return changed
+
+
+def run(conn, feed, interval=DEFAULT_INTERVAL, parquet=False, polls=None,
+        log=print):
+    """Poll ``feed`` every ``interval`` seconds until it ends (or for
+    ``polls`` polls); returns the number of polls."""
+    done = 0
+    while polls is None or done < polls:
+        started = time.monotonic()
+        rows = feed.poll()
+        if rows is None:
+            break
+        changed = step(conn, rows, parquet) if rows else {"flights": 0}
+        done += 1
+        log(
+            f"poll {done:>4}: {len(rows):>6} rows, "
+            + ", ".join(f"{t} {n}" for t, n in changed.items())
+            + f" in {time.monotonic() - started:.2f}s"
+        )
+        time.sleep(max(0.0, interval - (time.monotonic() - started)))
+    return done
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=db.DB_PATH, help="SQLite database path")
+    parser.add_argument(
+        "--source", choices=["replay", "api"], default="replay",
+        help="replay data/flights.csv, or poll the AeroDataBox API (or stub)",
+    )
+    parser.add_argument(
+        "--interval", type=float, default=DEFAULT_INTERVAL,
+        help="seconds between polls",
+    )
+    parser.add_argument(
+        "--polls", type=int, help="stop after this many polls"
+    )
+    parser.add_argument(
+        "--step-minutes", type=float, default=15,
+        help="replay: feed time that passes per poll",
+    )
+    parser.add_argument(
+        "--airports", nargs="+", default=[], help="api: IATA codes to poll"
+    )
+    parser.add_argument("--base-url", help="api: e.g. the core.stub_api URL")
+    parser.add_argument(
+        "--parquet", action=argparse.BooleanOptionalAction,
+        default=columnar.BACKEND == "duckdb",
+        help="also export changed days for the DuckDB backend",
+    )
+    args = parser.parse_args(argv)
+
+    if args.source == "replay":
+        feed = ReplayFeed(step=timedelta(minutes=args.step_minutes))
+    elif args.airports:
+        feed = ApiFeed(args.airports, base_url=args.base_url)
+    else:
+        parser.error("--source api needs --airports")
+
+    conn = db.connect(args.db)
+    try:
+        # Schema and reference data first; flights come from the feed.
+        ingest(conn, REFERENCE_TABLES, parquet=args.parquet)
+        run(conn, feed, args.interval, args.parquet, args.polls)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,238 @@
+"""Versioned schema migrations for air_tracker.db.
+
+Each migration runs in its own transaction and is recorded in
+``schema_version``, so running the tool again only applies what is missing:
+
+    python -m core.migrations            # upgrade to the latest version
+    python -m core.migrations --status   # show applied / pending versions
+"""
+import argparse
+from datetime import datetime, timezone
+
+from . import db
+from .changes import CHANGE_TRACKING_DDL, FACTS_CHANGE_TRACKING_DDL
+from .cube import CUBE_DDL, MEASURES_DDL
+from .delays import EPOCH_DDL
+from .encoding import ENCODING_DDL
+from .sketch import SKETCH_DDL
+from .window import WINDOW_DDL
+
+SCHEMA_VERSION_DDL = """
+CREATE TABLE IF NOT EXISTS schema_version (
+    version INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at TEXT NOT NULL
+)
+"""
+
+# (version, description, statements) -- append only, never edit a shipped one.
+MIGRATIONS = [
+    (1, "baseline schema from _load_to_sql.ipynb", [
+        """
+        CREATE TABLE IF NOT EXISTS airport (
+            airport_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            icao_code TEXT UNIQUE,
+            iata_code TEXT UNIQUE,
+            name TEXT,
+            city TEXT,
+            country TEXT,
+            continent TEXT,
+            latitude REAL,
+            longitude REAL,
+            timezone TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS aircraft (
+            aircraft_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            registration TEXT UNIQUE,
+            model TEXT,
+            manufacturer TEXT,
+            icao_type_code TEXT,
+            owner TEXT
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS airport_delays (
+            delay_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            airport_iata TEXT,
+            delay_date TEXT,
+            total_flights INTEGER,
+            delayed_flights INTEGER,
+            avg_delay_min INTEGER,
+            median_delay_min INTEGER,
+            canceled_flights INTEGER
+        )
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS flights (
+            flight_number TEXT,
+            airline_name TEXT,
+            aircraft_registration TEXT,
+            origin_iata TEXT,
+            destination_iata TEXT,
+            scheduled_time TEXT,
+            actual_time TEXT,
+            status TEXT,
+            flight_type TEXT
+        )
+        """,
+        db.DATA_VERSION_DDL,
+    ]),
+    (2, "flights filter/sort and airport_delays lookup indexes", [
+        # ORDER BY scheduled_time DESC LIMIT n with no filter.
+        "CREATE INDEX IF NOT EXISTS idx_flights_scheduled ON flights (scheduled_time)",
+        # Flights table filters; the trailing scheduled_time serves the sort.
+        """
+        CREATE INDEX IF NOT EXISTS idx_flights_airline_sched
+        ON flights (airline_name, scheduled_time)
+        """,
+        # (airline_name, status) also covers the airline x status treemap.
+        """
+        CREATE INDEX IF NOT EXISTS idx_flights_airline_status_sched
+        ON flights (airline_name, status, scheduled_time)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_flights_status_sched
+        ON flights (status, scheduled_time)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_flights_origin_sched
+        ON flights (origin_iata, scheduled_time)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_flights_destination_sched
+        ON flights (destination_iata, scheduled_time)
+        """,
+        # Aircraft joins and per-tail history.
+        """
+        CREATE INDEX IF NOT EXISTS idx_flights_registration_sched
+        ON flights (aircraft_registration, scheduled_time)
+        """,
+        # Covering index for the flight_type / status distributions.
+        """
+        CREATE INDEX IF NOT EXISTS idx_flights_type_status
+        ON flights (flight_type, status)
+        """,
+        """
+        CREATE INDEX IF NOT EXISTS idx_airport_delays_airport_date
+        ON airport_delays (airport_iata, delay_date)
+        """,
+    ]),
+    (3, "unique natural keys for idempotent upserts", [
+        # Re-running the old notebook loader appended duplicates; keep the
+        # most recently loaded copy of each key.
+        """
+        DELETE FROM flights
+        WHERE flight_number IS NOT NULL
+          AND scheduled_time IS NOT NULL
+          AND flight_type IS NOT NULL
+          AND rowid NOT IN (
+              SELECT MAX(rowid)
+              FROM flights
+              GROUP BY flight_number, scheduled_time, flight_type
+          )
+        """,
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_flights_natural_key
+        ON flights (flight_number, scheduled_time, flight_type)
+        """,
+        """
+        DELETE FROM airport_delays
+        WHERE delay_id NOT IN (
+            SELECT MAX(delay_id)
+            FROM airport_delays
+            GROUP BY airport_iata, delay_date
+        )
+        """,
+        "DROP INDEX IF EXISTS idx_airport_delays_airport_date",
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_airport_delays_airport_date
+        ON airport_delays (airport_iata, delay_date)
+        """,
+    ]),
+    (4, "change tracking for incremental rollups", CHANGE_TRACKING_DDL),
+    (5, "flight_cube pre-aggregate", CUBE_DDL),
+    (6, "epoch timestamps and flight_cube delay measures",
+     EPOCH_DDL + MEASURES_DDL),
+    (7, "flight_delay_sketch quantile sketches", SKETCH_DDL),
+    (8, "day partition column and indexes for time windows", WINDOW_DDL),
+    (9, "dictionary-encoded flight dimensions behind a flights view",
+     ENCODING_DDL + FACTS_CHANGE_TRACKING_DDL),
+    (10, "per-table data versions", [db.TABLE_VERSION_DDL]),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+def current_version(conn):
+    conn.execute(SCHEMA_VERSION_DDL)
+    row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    return row[0] or 0
+
+
+def migrate(conn, target=LATEST_VERSION):
+    """Apply pending migrations up to ``target``; returns the versions applied."""
+    applied = []
+    start = current_version(conn)
+    for version, description, statements in MIGRATIONS:
+        if version <= start or version > target:
+            continue
+        conn.execute("BEGIN")
+        try:
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(
+                "INSERT INTO schema_version (version, description, applied_at) "
+                "VALUES (?, ?, ?)",
+                (version, description, datetime.now(timezone.utc).isoformat()),
+            )
+        except Exception:
+            conn.rollback()
+            raise
+        conn.commit()
+        applied.append(version)
+    if applied:
+        conn.execute("ANALYZE")
+    return applied
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=db.DB_PATH, help="SQLite database path")
+    parser.add_argument(
+        "--target", type=int, default=LATEST_VERSION,
+        help="stop after this version (default: latest)",
+    )
+    parser.add_argument(
+        "--status", action="store_true", help="list versions and exit"
+    )
+    parser.add_argument(
+        "--vacuum", action="store_true",
+        help="rewrite the file afterwards to reclaim space freed by migrations "
+        "that rebuild tables (e.g. 9)",
+    )
+    args = parser.parse_args(argv)
+
+    conn = db.connect(args.db)
+    try:
+        if args.status:
+            done = current_version(conn)
+            for version, description, _ in MIGRATIONS:
+                state = "applied" if version <= done else "pending"
+                print(f"{version:>4}  {state:<8} {description}")
+            return
+        applied = migrate(conn, target=args.target)
+        if args.vacuum:
+            conn.execute("VACUUM")
+    finally:
+        conn.close()
+
+    if applied:
+        print(f"Applied migrations: {', '.join(map(str, applied))}")
+    else:
+        print("Schema is up to date.")
+
+
+if __name__ == "__main__":
+    main()
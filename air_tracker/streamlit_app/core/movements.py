@@ -0,0 +1,109 @@
+"""Materialized ``airport_movements`` table.
+
+One row per (airport, flight) side: the origin and destination columns of
+``flights`` stacked with UNION ALL and indexed on ``iata_code``. Counting an
+airport's arrivals + departures then becomes an index range count instead of
+the ``a.iata_code IN (f.origin_iata, f.destination_iata)`` nested loop.
+
+Rows point back at ``flights.flight_id`` (the rowid of ``flight_facts``),
+so rebuild whenever ``flights`` is re-created (a fresh load):
+
+    python -m core.movements
+
+The live feed (core.live) rewrites only the rows of the flights it changed
+(``refresh_airport_movements``).
+"""
+import argparse
+
+from . import db
+
+MOVEMENTS_DDL = """
+CREATE TABLE airport_movements (
+    iata_code TEXT NOT NULL,
+    flight_rowid INTEGER NOT NULL,
+    direction TEXT NOT NULL,
+    scheduled_time TEXT
+)
+"""
+
+# A flight whose origin equals its destination is counted once, matching the
+# IN (...) join this table replaces.
+MOVEMENTS_FILL = """
+INSERT INTO airport_movements (iata_code, flight_rowid, direction, scheduled_time)
+SELECT origin_iata, flight_id, 'departure', scheduled_time
+FROM flights
+WHERE origin_id IS NOT NULL {flights}
+UNION ALL
+SELECT destination_iata, flight_id, 'arrival', scheduled_time
+FROM flights
+WHERE destination_id IS NOT NULL
+  AND destination_id IS NOT origin_id {flights}
+"""
+
+# Only the flights listed in temp.movement_flights.
+SOME_FLIGHTS = "AND flight_id IN (SELECT flight_id FROM temp.movement_flights)"
+
+MOVEMENTS_INDEX = """
+CREATE INDEX idx_airport_movements_iata
+ON airport_movements (iata_code, scheduled_time, flight_rowid)
+"""
+
+# For rewriting single flights; tables built before it get it on first use.
+MOVEMENTS_FLIGHT_INDEX = """
+CREATE INDEX IF NOT EXISTS idx_airport_movements_flight
+ON airport_movements (flight_rowid)
+"""
+
+
+def rebuild_airport_movements(conn):
+    """Recreate the table from ``flights`` in one transaction."""
+    conn.execute("BEGIN")
+    try:
+        conn.execute("DROP TABLE IF EXISTS airport_movements")
+        conn.execute(MOVEMENTS_DDL)
+        conn.execute(MOVEMENTS_FILL.format(flights=""))
+        conn.execute(MOVEMENTS_INDEX)
+        conn.execute(MOVEMENTS_FLIGHT_INDEX)
+        db.bump_data_version(conn, "airport_movements")
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+    return conn.execute("SELECT COUNT(*) FROM airport_movements").fetchone()[0]
+
+
+def refresh_airport_movements(conn, flight_ids):
+    """Rewrite the rows of ``flight_ids`` inside the caller's transaction."""
+    conn.execute(MOVEMENTS_FLIGHT_INDEX)
+    conn.execute(
+        "CREATE TEMP TABLE IF NOT EXISTS movement_flights "
+        "(flight_id INTEGER PRIMARY KEY)"
+    )
+    conn.execute("DELETE FROM temp.movement_flights")
+    conn.executemany(
+        "INSERT INTO temp.movement_flights VALUES (?)",
+        [(flight_id,) for flight_id in flight_ids],
+    )
+    conn.execute(
+        "DELETE FROM airport_movements WHERE flight_rowid IN "
+        "(SELECT flight_id FROM temp.movement_flights)"
+    )
+    conn.execute(MOVEMENTS_FILL.format(flights=SOME_FLIGHTS))
+    db.bump_data_version(conn, "airport_movements")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=db.DB_PATH, help="SQLite database path")
+    args = parser.parse_args(argv)
+
+    conn = db.connect(args.db)
+    try:
+        rows = rebuild_airport_movements(conn)
+    finally:
+        conn.close()
+    print(f"airport_movements rebuilt: {rows} rows")
+
+
+if __name__ == "__main__":
+    main()
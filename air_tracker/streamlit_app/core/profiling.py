@@ -0,0 +1,124 @@
+"""Per-session timings of the queries and charts behind each page.
+
+Off by default. When the Performance page's toggle is on for a session (or
+``AIR_TRACKER_PROFILE=1`` is set for every session), core.data records one
+event per query, ``timed`` one per chart block, core.figures one per figure
+(cache hit or miss) and core.sections one per tab it builds:
+
+* the page that ran it, a fingerprint of the SQL (literals stripped),
+* wall time, rows returned, cache hit or miss, backend,
+* the ``EXPLAIN QUERY PLAN`` and whether it scans a whole table.
+
+Events live in ``st.session_state`` only, so nothing is shared between
+users or written to disk unless the Performance page exports it.
+"""
+import hashlib
+import os
+import re
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+import streamlit as st
+
+from .db import APP_DIR
+
+SESSION_KEY = "profiling"
+EVENTS_KEY = "profiling_events"
+MAX_EVENTS = 5_000
+ALWAYS = os.environ.get("AIR_TRACKER_PROFILE", "") not in ("", "0")
+
+APP_SCRIPT = APP_DIR / "app.py"
+PAGES_DIR = APP_DIR / "pages"
+
+# Every event has these keys (chart events leave the query ones empty).
+FIELDS = (
+    "at", "page", "kind", "name", "ms", "fingerprint", "rows", "cache",
+    "backend", "full_scan", "plan", "sql", "params",
+)
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+# "SCAN flights" or "SCAN f" is a full table scan; "SCAN f USING COVERING
+# INDEX ...", "SCAN CONSTANT ROW" and scans of subquery results are not.
+_FULL_SCAN = re.compile(r"^SCAN (?!CONSTANT ROW|\()(?!.*\bINDEX\b)")
+
+
+def enabled():
+    return ALWAYS or st.session_state.get(SESSION_KEY, False)
+
+
+def fingerprint(sql):
+    """Short stable id for a statement, independent of literals and layout."""
+    normal = " ".join(_LITERALS.sub("?", sql).split()).lower()
+    return hashlib.sha1(normal.encode()).hexdigest()[:12]
+
+
+def query_plan(conn, sql, params=()):
+    """``EXPLAIN QUERY PLAN`` as indented detail lines."""
+    rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", list(params)).fetchall()
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return lines
+
+
+def full_scans(plan):
+    return [line.strip() for line in plan or ()
+            if _FULL_SCAN.match(line.strip())]
+
+
+def _page():
+    """The page script (relative path) somewhere up the call stack."""
+    frame = sys._getframe(1)
+    while frame is not None:
+        path = Path(frame.f_code.co_filename)
+        if path == APP_SCRIPT or path.parent == PAGES_DIR:
+            return str(path.relative_to(APP_DIR))
+        frame = frame.f_back
+    return None
+
+
+def record(kind, name, seconds, **fields):
+    """Append one event to this session's log (oldest dropped past the cap)."""
+    events = st.session_state.setdefault(EVENTS_KEY, [])
+    event = dict.fromkeys(FIELDS)
+    event.update(
+        at=time.time(), page=_page(), kind=kind, name=name,
+        ms=round(seconds * 1000, 3), **fields,
+    )
+    events.append(event)
+    del events[:-MAX_EVENTS]
+
+
+def record_query(name, sql, params, seconds, rows, cache, backend, plan=None):
+    scans = full_scans(plan)
+    record(
+        "query", name or fingerprint(sql), seconds,
+        fingerprint=fingerprint(sql), rows=rows, cache=cache,
+        backend=backend, full_scan=bool(scans), plan=plan,
+        sql=" ".join(sql.split()), params=list(params),
+    )
+
+
+@contextmanager
+def timed(name, kind="chart"):
+    """Time the block (figure construction and rendering) as one event."""
+    if not enabled():
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(kind, name, time.perf_counter() - started)
+
+
+def events():
+    return list(st.session_state.get(EVENTS_KEY, []))
+
+
+def clear():
+    st.session_state[EVENTS_KEY] = []
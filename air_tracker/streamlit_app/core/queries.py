@@ -0,0 +1,347 @@
+"""Named SQL used by the dashboard pages.
+
+Pages refer to queries by name so the same statement (and its cached result)
+is shared wherever it appears, e.g. the status distribution on the Overview
+and Flights pages.
+
+Queries in ``WINDOWED`` take the session's time window (see core.window) as
+their first two params; core.data supplies them, so the params pages pass,
+and the ``params:`` notes below, are the ones after the window.
+"""
+import re
+from functools import lru_cache
+
+from .encoding import DIMENSION_TABLES, key_match
+
+_TABLE = re.compile(r"\b(?:FROM|JOIN)\s+(\w+)", re.IGNORECASE)
+# The flights view's storage is versioned as "flights".
+_VERSIONED_AS = {
+    "flight_facts": "flights", **dict.fromkeys(DIMENSION_TABLES, "flights")
+}
+
+# Statements are kept to the SQL subset SQLite and DuckDB share (FILTER
+# clauses rather than SUM(boolean), explicit tie-breakers in ORDER BY) so
+# the columnar backend can run them unchanged; see COLUMNAR_QUERIES.
+QUERIES = {
+    # ================= KPIs =================
+    # Every flight-level KPI on the Overview and Flights pages in one pass
+    # over `flight_cube`; the scalar subquery only touches `airport`.
+    "flight_kpis": """
+        SELECT
+            COALESCE(SUM(flights), 0) AS total_flights,
+            COUNT(DISTINCT airline_name) AS active_airlines,
+            COALESCE(
+                SUM(flights) FILTER (WHERE flight_type = 'arrival'), 0
+            ) AS arrivals,
+            COALESCE(
+                SUM(flights) FILTER (WHERE flight_type = 'departure'), 0
+            ) AS departures,
+            COALESCE(
+                SUM(flights) FILTER (WHERE status = 'Delayed'), 0
+            ) AS delayed,
+            -- Spellings are canonicalized at ingest (core.encoding).
+            COALESCE(
+                SUM(flights) FILTER (WHERE status = 'Canceled'), 0
+            ) AS cancelled,
+            ROUND(
+                100.0 * SUM(flights) FILTER (WHERE status = 'Delayed')
+                / SUM(flights), 2
+            ) AS delayed_pct,
+            (SELECT COUNT(*) FROM airport) AS total_airports,
+            -- Flight-weighted, not a mean of per-airport averages.
+            ROUND(
+                SUM(delay_min_sum) / NULLIF(SUM(timed_flights), 0), 2
+            ) AS avg_delay
+        FROM flight_cube
+        WHERE day BETWEEN ? AND ?
+    """,
+
+    # ================= FLIGHT DISTRIBUTIONS =================
+    # Roll-ups of the pre-aggregated `flight_cube` (see core.cube): they
+    # read one row per distinct key instead of one per flight.
+    "status_counts": """
+        SELECT status, SUM(flights) AS flights
+        FROM flight_cube
+        WHERE day BETWEEN ? AND ?
+        GROUP BY status
+    """,
+    "flight_type_counts": """
+        SELECT flight_type, SUM(flights) AS flights
+        FROM flight_cube
+        WHERE day BETWEEN ? AND ?
+        GROUP BY flight_type
+    """,
+    "status_by_flight_type": """
+        SELECT flight_type, status, SUM(flights) AS flights
+        FROM flight_cube
+        WHERE day BETWEEN ? AND ?
+        GROUP BY flight_type, status
+    """,
+    # params: [limit]
+    "top_airlines": """
+        SELECT airline_name, SUM(flights) AS flights
+        FROM flight_cube
+        WHERE day BETWEEN ? AND ?
+        GROUP BY airline_name
+        ORDER BY flights DESC, airline_name
+        LIMIT ?
+    """,
+    "airline_status": """
+        SELECT airline_name, status, SUM(flights) AS flights
+        FROM flight_cube
+        WHERE day BETWEEN ? AND ?
+        GROUP BY airline_name, status
+    """,
+    "flights_by_origin_country": """
+        SELECT o.country, SUM(c.flights) AS flights
+        FROM flight_cube c
+        JOIN airport o
+            ON c.origin_iata = o.iata_code
+        WHERE c.day BETWEEN ? AND ?
+        GROUP BY o.country
+        ORDER BY flights DESC, o.country
+    """,
+
+    # ================= FLIGHT FILTERS =================
+    # Selectbox options from the small `flight_dims` table (see core.dims).
+    "dim_values": """
+        SELECT value FROM flight_dims WHERE dim = ? ORDER BY value
+    """,
+    # MIN/MAX on the indexed column are single index probes; on the table,
+    # as SQLite only optimizes them over a single table, not the view.
+    "flight_date_bounds": """
+        SELECT
+            date(MIN(scheduled_time)) AS first_day,
+            date(MAX(scheduled_time)) AS last_day
+        FROM flight_facts
+    """,
+
+    # ================= AIRPORTS =================
+    # Busiest-airport KPI, density map and movement table all read this one
+    # indexed group-by over `airport_movements` (see core.movements).
+    "airport_traffic": """
+        SELECT
+            a.iata_code,
+            a.name,
+            a.city,
+            a.latitude,
+            a.longitude,
+            COUNT(m.flight_rowid) AS total_movements
+        FROM airport a
+        LEFT JOIN airport_movements m
+            ON m.iata_code = a.iata_code
+           AND m.scheduled_time >= ? AND m.scheduled_time < ?
+        GROUP BY a.airport_id
+        ORDER BY total_movements DESC
+    """,
+    "airport_list": """
+        SELECT iata_code, name, city, country, timezone
+        FROM airport
+        ORDER BY iata_code
+    """,
+    # params: [iata]
+    "linked_flights": """
+        SELECT
+            f.flight_number,
+            f.airline_name,
+            f.origin_iata,
+            f.destination_iata,
+            f.status,
+            f.flight_type
+        FROM airport_movements m
+        JOIN flights f
+            ON f.flight_id = m.flight_rowid
+        WHERE m.scheduled_time >= ? AND m.scheduled_time < ?
+          AND m.iata_code = ?
+        ORDER BY m.scheduled_time DESC
+        LIMIT 50
+    """,
+
+    # ================= AIRCRAFT =================
+    # Per-tail utilization comes from core.timelines.
+    "total_aircraft": "SELECT COUNT(*) cnt FROM aircraft",
+
+    # ================= DELAYS =================
+    # Over every flight (weighted by flights), from the cube's delay
+    # measures; definitions in core.delays.
+    "delay_kpis": """
+        SELECT
+            ROUND(
+                SUM(delay_min_sum) / NULLIF(SUM(timed_flights), 0), 2
+            ) AS avg_delay,
+            ROUND(
+                100.0 * SUM(delayed_flights) / NULLIF(SUM(flights), 0), 2
+            ) AS delay_pct,
+            ROUND(
+                100.0 * SUM(flights) FILTER (
+                    WHERE status = 'Canceled'
+                ) / NULLIF(SUM(flights), 0), 2
+            ) AS cancel_pct
+        FROM flight_cube
+        WHERE day BETWEEN ? AND ?
+    """,
+    # Per-day DDSketches of flight delay (see core.sketch); merged in Python.
+    "delay_sketches": """
+        SELECT value, day, flights, sketch
+        FROM flight_delay_sketch
+        WHERE day BETWEEN ? AND ?
+          AND dim = ?
+        ORDER BY day, value
+    """,
+    "delay_severity": """
+        SELECT
+            CASE
+                WHEN avg_delay_min <= 15 THEN '0–15 min'
+                WHEN avg_delay_min <= 30 THEN '15–30 min'
+                WHEN avg_delay_min <= 60 THEN '30–60 min'
+                ELSE '60+ min'
+            END AS delay_bucket,
+            COUNT(*) AS airports
+        FROM airport_delays
+        WHERE delay_date BETWEEN ? AND ?
+          AND avg_delay_min IS NOT NULL
+        GROUP BY delay_bucket
+    """,
+    "delay_contribution": """
+        SELECT
+            airport_iata,
+            delayed_flights
+        FROM airport_delays
+        WHERE delay_date BETWEEN ? AND ?
+          AND delayed_flights > 0
+        ORDER BY delayed_flights DESC, airport_iata
+        LIMIT 8
+    """,
+    "delay_rate_vs_volume": """
+        SELECT
+            airport_iata,
+            total_flights,
+            delayed_flights,
+            ROUND(100.0 * delayed_flights / total_flights, 2) AS delay_pct
+        FROM airport_delays
+        WHERE delay_date BETWEEN ? AND ?
+          AND total_flights > 0
+    """,
+    "delay_leaderboard": """
+        SELECT
+            airport_iata,
+            total_flights,
+            delayed_flights,
+            canceled_flights,
+            avg_delay_min,
+            ROUND(100.0 * delayed_flights / total_flights, 2) AS delay_pct
+        FROM airport_delays
+        WHERE delay_date BETWEEN ? AND ?
+          AND total_flights > 0
+        ORDER BY delay_pct DESC, airport_iata, delay_date
+    """,
+}
+
+# Queries over flights / airport_delays / airport / aircraft only, which the
+# optional DuckDB-over-Parquet backend can answer (see core.columnar). The
+# rest read SQLite-only tables (airport_movements, flight_dims,
+# flight_delay_sketch) or rely on flight ids, and always go to SQLite.
+COLUMNAR_QUERIES = frozenset({
+    "flight_kpis",
+    "status_counts",
+    "flight_type_counts",
+    "status_by_flight_type",
+    "top_airlines",
+    "airline_status",
+    "flights_by_origin_country",
+    "total_aircraft",
+    "delay_kpis",
+    "delay_severity",
+    "delay_contribution",
+    "delay_rate_vs_volume",
+    "delay_leaderboard",
+})
+
+# Queries filtered by the time window -> kind of their day column (see
+# core.window). The rest are dimension lookups that cover all of history.
+WINDOWED = {
+    **dict.fromkeys([
+        "flight_kpis",
+        "status_counts",
+        "flight_type_counts",
+        "status_by_flight_type",
+        "top_airlines",
+        "airline_status",
+        "flights_by_origin_country",
+        "delay_kpis",
+        "delay_sketches",
+        "delay_severity",
+        "delay_contribution",
+        "delay_rate_vs_volume",
+        "delay_leaderboard",
+    ], "day"),
+    "airport_traffic": "time",
+    "linked_flights": "time",
+}
+
+
+# ---------------- FLIGHTS TABLE (FILTERED) ----------------
+def flights_table_query(airline=None, status=None, origin=None,
+                        destination=None, flight_type=None, date_from=None,
+                        date_to=None, after=None, limit=100):
+    """Build one page of the Flights page table; returns (sql, params).
+
+    Keyset pagination, newest first: ``after`` is the
+    ``(scheduled_time, flight_rowid)`` of the previous page's last row, so
+    every page is an index range read of ``limit`` rows whatever its depth.
+    ``date_from``/``date_to`` are inclusive ``YYYY-MM-DD`` strings (UTC).
+    """
+    sql = """
+    SELECT
+        f.flight_number,
+        f.airline_name,
+        o.city AS origin_city,
+        d.city AS destination_city,
+        f.scheduled_time,
+        f.status,
+        f.flight_type,
+        f.flight_id AS flight_rowid
+    FROM flights f
+    LEFT JOIN airport o ON f.origin_iata = o.iata_code
+    LEFT JOIN airport d ON f.destination_iata = d.iata_code
+    WHERE f.scheduled_time IS NOT NULL
+    """
+    params = []
+
+    for column, value in (
+        ("airline_name", airline),
+        ("status", status),
+        ("origin_iata", origin),
+        ("destination_iata", destination),
+        ("flight_type", flight_type),
+    ):
+        if value is not None:
+            sql += f" AND {key_match(column)}"
+            params.append(value)
+
+    # scheduled_time is ISO text ('2026-01-02 05:40Z'), so days compare as
+    # string prefixes and the range stays sargable.
+    if date_from is not None:
+        sql += " AND f.scheduled_time >= ?"
+        params.append(str(date_from))
+
+    if date_to is not None:
+        sql += " AND f.scheduled_time < date(?, '+1 day')"
+        params.append(str(date_to))
+
+    if after is not None:
+        sql += " AND (f.scheduled_time, f.flight_id) < (?, ?)"
+        params.extend(after)
+
+    sql += " ORDER BY f.scheduled_time DESC, f.flight_id DESC LIMIT ?"
+    params.append(limit)
+    return sql, params
+
+
+@lru_cache(maxsize=1024)
+def tables_read(sql):
+    """Names after FROM / JOIN in ``sql`` (CTE names included, harmlessly),
+    as the tables versioned in ``table_version`` (core.db)."""
+    return tuple(sorted({
+        _VERSIONED_AS.get(name, name) for name in _TABLE.findall(sql)
+    }))
@@ -0,0 +1,143 @@
+"""Incremental ``airport_delays`` rollup.
+
+Replaces the full rebuild in _delays.ipynb. Only the (origin airport, UTC
+day) partitions touched since the last run (see core.changes) are
+recomputed from ``flights`` and upserted; the first run rebuilds everything.
+
+    python -m core.rollup          # incremental
+    python -m core.rollup --full   # recompute every partition
+
+Metric definitions match the notebook: delay = actual - scheduled in
+minutes (negative clipped to 0, missing actual_time ignored), delayed means
+delay >= 15 min, cancelled means status Canceled (the canonical spelling;
+see core.encoding), and the average and median are rounded half-to-even
+like pandas. Delays come from the epoch columns (see core.delays).
+"""
+import argparse
+from itertools import groupby
+
+from . import changes, db
+from .delays import DELAY_MIN_SQL, DELAYED_MIN
+
+CONSUMER = "airport_delays"
+
+# Flights of the touched partitions, ordered by delay within each partition
+# so the median is read straight off the sorted run.
+PARTITION_FLIGHTS_SQL = f"""
+SELECT
+    t.airport_iata,
+    t.day,
+    f.flight_number,
+    f.status = 'Canceled' AS is_cancelled,
+    {DELAY_MIN_SQL} AS delay_min
+FROM temp.rollup_partitions t
+JOIN flights f
+    ON f.origin_id = (SELECT id FROM dim_iata WHERE value = t.airport_iata)
+   AND f.scheduled_time >= t.day
+   AND f.scheduled_time < date(t.day, '+1 day')
+   AND date(f.scheduled_time) = t.day
+ORDER BY t.airport_iata, t.day, delay_min
+"""
+
+UPSERT_SQL = """
+INSERT INTO airport_delays (
+    airport_iata, delay_date, total_flights, delayed_flights,
+    avg_delay_min, median_delay_min, canceled_flights
+) VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (airport_iata, delay_date) DO UPDATE SET
+    total_flights = excluded.total_flights,
+    delayed_flights = excluded.delayed_flights,
+    avg_delay_min = excluded.avg_delay_min,
+    median_delay_min = excluded.median_delay_min,
+    canceled_flights = excluded.canceled_flights
+"""
+
+
+def _median(ordered):
+    mid = len(ordered) // 2
+    if len(ordered) % 2:
+        return ordered[mid]
+    return (ordered[mid - 1] + ordered[mid]) / 2
+
+
+def summarize(rows):
+    """Reduce one partition's flights (sorted by delay) to a delay row."""
+    total = delayed = cancelled = 0
+    delays = []
+    for flight_number, is_cancelled, delay_min in rows:
+        total += flight_number is not None
+        cancelled += is_cancelled or 0
+        if delay_min is not None:
+            delays.append(delay_min)
+            delayed += delay_min >= DELAYED_MIN
+    avg = round(sum(delays) / len(delays)) if delays else None
+    med = round(_median(delays)) if delays else None
+    return total, delayed, avg, med, cancelled
+
+
+def rollup(conn, full=False):
+    """Bring ``airport_delays`` up to date; returns partitions rewritten."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        partitions, cursor = changes.pending(conn, CONSUMER)
+        if full or partitions is None:
+            partitions = set(conn.execute(
+                "SELECT DISTINCT origin_iata, date(scheduled_time) FROM flights"
+            ))
+            conn.execute("DELETE FROM airport_delays")
+        # pandas' groupby drops NULL keys; so do we.
+        partitions = {
+            (airport, day) for airport, day in partitions
+            if airport is not None and day is not None
+        }
+
+        conn.execute(
+            "CREATE TEMP TABLE IF NOT EXISTS rollup_partitions "
+            "(airport_iata TEXT, day TEXT, PRIMARY KEY (airport_iata, day))"
+        )
+        conn.execute("DELETE FROM temp.rollup_partitions")
+        conn.executemany(
+            "INSERT INTO temp.rollup_partitions VALUES (?, ?)", partitions
+        )
+
+        written = set()
+        rows = conn.execute(PARTITION_FLIGHTS_SQL)
+        for key, group in groupby(rows, key=lambda r: (r[0], r[1])):
+            conn.execute(
+                UPSERT_SQL, key + summarize(r[2:] for r in group)
+            )
+            written.add(key)
+
+        # Partitions whose flights all moved away or were deleted.
+        conn.executemany(
+            "DELETE FROM airport_delays WHERE airport_iata = ? AND delay_date = ?",
+            partitions - written,
+        )
+        changes.commit(conn, CONSUMER, cursor)
+        if partitions:
+            db.bump_data_version(conn, "airport_delays")
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+    return len(partitions)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=db.DB_PATH, help="SQLite database path")
+    parser.add_argument(
+        "--full", action="store_true", help="recompute every partition"
+    )
+    args = parser.parse_args(argv)
+
+    conn = db.connect(args.db)
+    try:
+        count = rollup(conn, full=args.full)
+    finally:
+        conn.close()
+    print(f"airport_delays: {count} partitions recomputed")
+
+
+if __name__ == "__main__":
+    main()
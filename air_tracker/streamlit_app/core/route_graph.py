@@ -0,0 +1,218 @@
+"""Origin-destination route graph in compressed sparse row (CSR) form.
+
+``flights`` is reduced once per data version and time window (reading only
+the day partitions it covers) to one edge per (origin, destination) pair
+with its flight count, delayed/cancelled counts and average delay
+(definitions in core.delays). The edges are stored as
+NumPy CSR arrays over the airports, so the Routes page answers top-route,
+hub, connectivity and reachability questions with array operations instead
+of re-joining ``flights``:
+
+* ``indptr[i]:indptr[i + 1]`` are airport ``i``'s outgoing edges,
+* ``indices`` holds each edge's destination, sorted within the slice,
+* ``flights``/``delayed``/``cancelled``/``avg_delay`` are per-edge columns.
+
+Only flights with both endpoints known become edges; rows that record a
+single side of the trip are left out.
+"""
+import numpy as np
+import pandas as pd
+
+from .delays import DELAY_MIN_SQL, DELAYED_MIN
+from .window import ALL
+
+ROUTE_EDGES_SQL = f"""
+SELECT
+    f.origin_iata,
+    f.destination_iata,
+    COUNT(*) AS flights,
+    COUNT(*) FILTER (WHERE {DELAY_MIN_SQL} >= {DELAYED_MIN}) AS delayed,
+    COUNT(*) FILTER (
+        WHERE f.status = 'Canceled'
+    ) AS cancelled,
+    AVG({DELAY_MIN_SQL}) AS avg_delay_min
+FROM flights f
+WHERE f.origin_id IS NOT NULL
+  AND f.destination_id IS NOT NULL
+  AND f.origin_id <> f.destination_id
+  {{window}}
+GROUP BY f.origin_id, f.destination_id
+"""
+
+# Only added for a bounded window: over all of history a plain table scan
+# beats walking the day index.
+WINDOW_SQL = "AND f.epoch_day BETWEEN ? AND ?"
+
+DAMPING = 0.85
+
+
+class RouteGraph:
+    """Directed, flight-weighted route graph over airport codes."""
+
+    def __init__(self, edges, airports=()):
+        """``edges``: rows of ROUTE_EDGES_SQL; ``airports``: extra nodes."""
+        edges = pd.DataFrame(edges, columns=[
+            "origin_iata", "destination_iata", "flights", "delayed",
+            "cancelled", "avg_delay_min",
+        ])
+        self.codes = np.unique(np.concatenate([
+            np.asarray(list(airports), dtype=object),
+            edges["origin_iata"].to_numpy(object),
+            edges["destination_iata"].to_numpy(object),
+        ]).astype(str))
+        self.node = {code: i for i, code in enumerate(self.codes)}
+
+        src = np.searchsorted(self.codes, edges["origin_iata"].to_numpy(str))
+        dst = np.searchsorted(
+            self.codes, edges["destination_iata"].to_numpy(str)
+        )
+        order = np.lexsort((dst, src))
+        self.src = src[order]
+        self.indices = dst[order]
+        self.indptr = np.r_[
+            0, np.cumsum(np.bincount(self.src, minlength=len(self.codes)))
+        ]
+        self.flights = edges["flights"].to_numpy(np.int64)[order]
+        self.delayed = edges["delayed"].to_numpy(np.int64)[order]
+        self.cancelled = edges["cancelled"].to_numpy(np.int64)[order]
+        self.avg_delay = edges["avg_delay_min"].to_numpy(float)[order]
+        self._pagerank = None
+
+    @classmethod
+    def from_db(cls, conn, window=ALL):
+        airports = [code for (code,) in conn.execute(
+            "SELECT iata_code FROM airport WHERE iata_code IS NOT NULL"
+        )]
+        edges = conn.execute(
+            ROUTE_EDGES_SQL.format(window=WINDOW_SQL if window.bounded else ""),
+            window.params("epoch_day") if window.bounded else (),
+        )
+        return cls(edges.fetchall(), airports)
+
+    @property
+    def airport_count(self):
+        return len(self.codes)
+
+    @property
+    def route_count(self):
+        return len(self.indices)
+
+    # ---------------- ROUTES ----------------
+    def routes(self):
+        """Every route with volume and delay metrics."""
+        return pd.DataFrame({
+            "origin_iata": self.codes[self.src],
+            "destination_iata": self.codes[self.indices],
+            "flights": self.flights,
+            "delayed": self.delayed,
+            "cancelled": self.cancelled,
+            "delay_rate_pct": np.round(
+                100 * self.delayed / np.maximum(self.flights, 1), 2
+            ),
+            "avg_delay_min": np.round(self.avg_delay, 2),
+        })
+
+    def top_routes(self, n=20, by="flights", min_flights=1):
+        routes = self.routes()
+        routes = routes[routes["flights"] >= min_flights]
+        return (
+            routes.sort_values([by, "flights", "origin_iata", "destination_iata"],
+                               ascending=[False, False, True, True])
+            .head(n)
+            .reset_index(drop=True)
+        )
+
+    # ---------------- HUBS ----------------
+    def pagerank(self, tol=1e-10, max_iter=100):
+        """Flight-weighted PageRank: the share of traffic a hub attracts."""
+        if self._pagerank is None:
+            n = self.airport_count
+            out_weight = np.bincount(self.src, self.flights, minlength=n)
+            share = self.flights / np.maximum(out_weight[self.src], 1)
+            dangling = out_weight == 0
+            rank = np.full(n, 1.0 / max(n, 1))
+            for _ in range(max_iter):
+                inflow = np.bincount(
+                    self.indices, rank[self.src] * share, minlength=n
+                )
+                new = (1 - DAMPING) / n + DAMPING * (
+                    inflow + rank[dangling].sum() / n
+                )
+                done = np.abs(new - rank).sum() < tol
+                rank = new
+                if done:
+                    break
+            self._pagerank = rank
+        return self._pagerank
+
+    def hubs(self):
+        """Per airport: route counts, flight volume and centrality."""
+        n = self.airport_count
+        return pd.DataFrame({
+            "iata_code": self.codes,
+            "outbound_routes": np.diff(self.indptr),
+            "inbound_routes": np.bincount(self.indices, minlength=n),
+            "departures": np.bincount(
+                self.src, self.flights, minlength=n
+            ).astype(np.int64),
+            "arrivals": np.bincount(
+                self.indices, self.flights, minlength=n
+            ).astype(np.int64),
+            "centrality": np.round(self.pagerank(), 6),
+        }).sort_values(["centrality", "iata_code"], ascending=[False, True])
+
+    # ---------------- CONNECTIVITY ----------------
+    def components(self):
+        """Weakly connected component label per airport (smallest node id)."""
+        label = np.arange(self.airport_count)
+        while True:
+            low = np.minimum(label[self.src], label[self.indices])
+            new = label.copy()
+            np.minimum.at(new, self.src, low)
+            np.minimum.at(new, self.indices, low)
+            new = new[new]  # pointer jumping
+            if np.array_equal(new, label):
+                return label
+            label = new
+
+    def _bfs(self, start, max_hops=None):
+        """Fewest-hop distance and BFS parent of every airport from ``start``."""
+        hops = np.full(self.airport_count, -1)
+        parent = np.full(self.airport_count, -1)
+        hops[start] = 0
+        frontier, depth = np.array([start]), 0
+        while frontier.size and (max_hops is None or depth < max_hops):
+            depth += 1
+            begin = self.indptr[frontier]
+            counts = self.indptr[frontier + 1] - begin
+            total = counts.sum()
+            if not total:
+                break
+            # Concatenated CSR slices of every frontier airport.
+            offsets = np.repeat(begin - (np.cumsum(counts) - counts), counts)
+            neighbours = self.indices[np.arange(total) + offsets]
+            via = np.repeat(frontier, counts)
+            fresh = hops[neighbours] == -1
+            frontier, first = np.unique(neighbours[fresh], return_index=True)
+            hops[frontier] = depth
+            parent[frontier] = via[fresh][first]
+        return hops, parent
+
+    def reachable(self, code, max_hops=None):
+        """Airports reachable from ``code`` with their fewest-hop count."""
+        hops, _ = self._bfs(self.node[code], max_hops)
+        found = np.flatnonzero(hops > 0)
+        return pd.DataFrame({
+            "iata_code": self.codes[found], "hops": hops[found]
+        }).sort_values(["hops", "iata_code"]).reset_index(drop=True)
+
+    def path(self, origin, destination, max_hops=None):
+        """Fewest-hop route as a list of codes, or None if unreachable."""
+        target = self.node[destination]
+        hops, parent = self._bfs(self.node[origin], max_hops)
+        if hops[target] < 0:
+            return None
+        path = [target]
+        while path[-1] != self.node[origin]:
+            path.append(parent[path[-1]])
+        return [str(self.codes[i]) for i in reversed(path)]
@@ -0,0 +1,20 @@
+"""The Routes page's route graph (core.route_graph), cached per data
+version and time window."""
+import streamlit as st
+
+from .data import data_version, get_pool
+from .route_graph import RouteGraph
+from .window import current
+
+
+# A few windows of the current and the previous data version.
+@st.cache_resource(max_entries=8, show_spinner="Building the route graph...")
+def _route_graph(version, window):
+    with get_pool().connection() as conn:
+        return RouteGraph.from_db(conn, window)
+
+
+def route_graph():
+    """The ``RouteGraph`` of the current data in the session's time window,
+    rebuilt when either changes."""
+    return _route_graph(data_version("airport", "flights"), current())
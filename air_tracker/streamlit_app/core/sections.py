@@ -0,0 +1,53 @@
+"""Lazily built page sections.
+
+``st.tabs`` normally runs the body of every tab on every rerun, so a page
+pays for the queries, snapshot datasets and Plotly figures of the tabs the
+user is not looking at. ``tabs`` takes one builder function per tab and
+turns the tab bar into a tracked widget (``on_change="rerun"``): only the
+open tab's builder runs, and the other tabs stay empty until they are
+picked, which reruns the page with that tab open.
+
+    def overview():
+        static = snapshot("status_counts")   # datasets of this tab only
+        ...
+
+    tabs({"📊 Overview": overview, "📋 Table": table}, key="flights_tab")
+
+Builders declare their own static datasets (``snapshot``) rather than the
+page, so a hidden tab does not build them either. Page-level content above
+the tabs (KPIs, the time window) still runs on every rerun.
+
+Streamlit forgets the state of widgets that a rerun does not render, so a
+tab would come back reset. Widgets keyed ``"<builder name>.<name>"`` (e.g.
+``key="table.airline"`` in ``table``) keep their values while their tab is
+hidden.
+"""
+import streamlit as st
+
+from .profiling import timed
+
+
+def tabs(sections, key):
+    """Render ``{label: builder}`` as tabs, building only the open one.
+
+    ``key`` names the tab bar's state, unique on the page. Returns the label
+    of the open tab.
+    """
+    containers = st.tabs(list(sections), key=key, on_change="rerun")
+    opened = None
+    for (label, build), container in zip(sections.items(), containers):
+        if container.open:
+            with container, timed(label, kind="section"):
+                build()
+            opened = label
+        else:
+            _keep(f"{build.__name__}.")
+    return opened
+
+
+def _keep(prefix):
+    # Re-storing a value makes it plain session state, which outlives the
+    # widget; only done while the widget is not rendered, so the rerun that
+    # brings it back does not see a value set under it.
+    for name in [k for k in st.session_state if str(k).startswith(prefix)]:
+        st.session_state[name] = st.session_state[name]
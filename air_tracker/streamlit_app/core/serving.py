@@ -0,0 +1,215 @@
+"""Memory-mapped dataset snapshots for multi-process serving.
+
+Behind a load balancer every Streamlit process would otherwise run the
+pages' static queries itself and keep its own pickled copies of the
+results. A build step writes every static dataset (see ``snapshot`` in
+core.data) once to an Arrow IPC file:
+
+    <dir>/<build>/manifest.json
+    <dir>/<build>/<dataset>.arrow
+    <dir>/CURRENT                     # name of the build to serve
+
+With ``AIR_TRACKER_SNAPSHOT=<dir>`` each worker memory-maps the current
+build and hands the pages Arrow-backed frames over the mapped buffers
+(``pd.ArrowDtype``), so the data sits once in the OS page cache however
+many workers there are, and a new worker serves warm data as soon as it
+starts. Publishing a build is an atomic rename of ``CURRENT``; workers pick
+it up on their next rerun. Windowed datasets are built for every preset
+time window (core.window). Datasets missing from the build (a page added
+later, a custom window) fall back to SQL, refreshed with the next build.
+
+    python -m core.serving              # build from SQLite and publish
+    python -m core.serving --check      # compare the served build with SQLite
+
+Needs ``pyarrow``; the default (unset) mode does not.
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
+
+from . import db, window
+from .dims import DIMENSIONS
+from .queries import QUERIES, WINDOWED
+
+SNAPSHOT_DIR = os.environ.get("AIR_TRACKER_SNAPSHOT") or None
+CURRENT = "CURRENT"
+MANIFEST = "manifest.json"
+KEEP_BUILDS = 2  # the served build and the one before (workers still on it)
+
+# Fixed parameters the pages pass to parameterized static datasets (after
+# the window's, for windowed ones).
+PARAMS = {
+    "top_airlines": [(5,), (10,)],
+    "dim_values": [(dim,) for dim in DIMENSIONS],
+    "delay_sketches": [("all",), ("origin",), ("airline",)],
+}
+
+
+def key(name, params=()):
+    """File stem of a dataset: ``name`` or ``name[param,...]``."""
+    return f"{name}[{','.join(map(str, params))}]" if params else name
+
+
+def datasets(conn):
+    """(name, params) of every dataset a build contains."""
+    (last_day,) = conn.execute(
+        "SELECT date(MAX(scheduled_time)) FROM flight_facts"
+    ).fetchone()
+    windows = sorted(set(window.presets(
+        last_day and date.fromisoformat(last_day)
+    ).values()))
+    for name, sql in QUERIES.items():
+        variants = list(PARAMS.get(name, ()))
+        if sql.count("?") == (2 if name in WINDOWED else 0):
+            variants.insert(0, ())
+        for params in variants:
+            if name not in WINDOWED:
+                yield name, params
+                continue
+            for w in windows:
+                yield name, w.params(WINDOWED[name]) + params
+
+
+# ======================================================
+# BUILD
+# ======================================================
+def _write_arrow(df, path):
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(str(path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def build(conn, snapshot_dir=SNAPSHOT_DIR, log=print):
+    """Write every dataset to a new build and publish it; returns its name."""
+    import pandas as pd
+
+    snapshot_dir = Path(snapshot_dir)
+    name = "{:%Y%m%dT%H%M%S%f}-v{}".format(
+        datetime.now(timezone.utc), db.read_data_version(conn)
+    )
+    staging = snapshot_dir / f".{name}.tmp"
+    staging.mkdir(parents=True)
+
+    manifest = {
+        "built_at": datetime.now(timezone.utc).isoformat(),
+        "data_version": db.read_data_version(conn),
+        "datasets": {},
+    }
+    for dataset, params in datasets(conn):
+        started = time.perf_counter()
+        df = pd.read_sql(QUERIES[dataset], conn, params=list(params))
+        stem = key(dataset, params)
+        _write_arrow(df, staging / f"{stem}.arrow")
+        manifest["datasets"][stem] = {"file": f"{stem}.arrow", "rows": len(df)}
+        log(f"{stem:<48} {len(df):>8} rows in "
+            f"{(time.perf_counter() - started) * 1000:.1f} ms")
+    (staging / MANIFEST).write_text(json.dumps(manifest, indent=2))
+
+    # Publish: the build directory, then the pointer, each atomically.
+    os.replace(staging, snapshot_dir / name)
+    pointer = snapshot_dir / f".{CURRENT}.tmp"
+    pointer.write_text(name)
+    os.replace(pointer, snapshot_dir / CURRENT)
+    _prune(snapshot_dir, name)
+    return name
+
+
+def _prune(snapshot_dir, served):
+    builds = sorted(
+        p for p in snapshot_dir.iterdir()
+        if p.is_dir() and not p.name.startswith(".")
+    )
+    # Open maps survive the unlink, so a worker mid-rerun is unaffected.
+    for old in builds[:-KEEP_BUILDS]:
+        if old.name != served:
+            shutil.rmtree(old, ignore_errors=True)
+
+
+# ======================================================
+# SERVE
+# ======================================================
+def current(snapshot_dir=SNAPSHOT_DIR):
+    """Name of the published build, or None."""
+    if not snapshot_dir:
+        return None
+    try:
+        return Path(snapshot_dir, CURRENT).read_text().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def open_build(name, snapshot_dir=SNAPSHOT_DIR):
+    """{dataset stem: DataFrame over the memory-mapped Arrow file}."""
+    import pandas as pd
+    import pyarrow as pa
+
+    root = Path(snapshot_dir, name)
+    manifest = json.loads((root / MANIFEST).read_text())
+    frames = {}
+    for stem, entry in manifest["datasets"].items():
+        source = pa.memory_map(str(root / entry["file"]))
+        table = pa.ipc.open_file(source).read_all()
+        # ArrowDtype columns wrap the mapped buffers instead of copying them.
+        frames[stem] = table.to_pandas(types_mapper=pd.ArrowDtype)
+    return frames
+
+
+def check(conn, snapshot_dir=SNAPSHOT_DIR):
+    """Compare the served build with fresh SQL results; returns mismatches."""
+    import pandas as pd
+
+    name = current(snapshot_dir)
+    if name is None:
+        raise SystemExit(f"no published build in {snapshot_dir}")
+    frames = open_build(name, snapshot_dir)
+    failures = []
+    for dataset, params in datasets(conn):
+        stem = key(dataset, params)
+        fresh = pd.read_sql(QUERIES[dataset], conn, params=list(params))
+        served = frames.get(stem)
+        if served is None:
+            status = "missing"
+        else:
+            served = served.astype(object).where(served.notna(), None)
+            fresh = fresh.astype(object).where(fresh.notna(), None)
+            status = "ok" if served.equals(fresh) else "DIFFERENT"
+        print(f"{stem}: {status} ({len(fresh)} rows)")
+        if status != "ok":
+            failures.append(stem)
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=db.DB_PATH, help="SQLite database path")
+    parser.add_argument(
+        "--out", default=SNAPSHOT_DIR or db.APP_DIR / "database" / "snapshot",
+        help="snapshot directory (default: $AIR_TRACKER_SNAPSHOT)",
+    )
+    parser.add_argument(
+        "--check", action="store_true",
+        help="compare the published build with SQLite instead of building",
+    )
+    args = parser.parse_args(argv)
+
+    conn = db.connect(args.db, read_only=True)
+    try:
+        if args.check:
+            if check(conn, args.out):
+                raise SystemExit(1)
+            return
+        name = build(conn, args.out)
+    finally:
+        conn.close()
+    print(f"published {name} in {args.out}")
+
+
+if __name__ == "__main__":
+    main()
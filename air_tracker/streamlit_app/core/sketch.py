@@ -0,0 +1,320 @@
+"""Mergeable delay sketches (DDSketch) per day, airport and airline.
+
+Medians and percentiles cannot be averaged across partitions, so the loader
+keeps a DDSketch of per-flight delay for every UTC day in
+``flight_delay_sketch``, once per dimension:
+
+* ``dim='all'``     - every flight of the day (``value`` is '')
+* ``dim='origin'``  - per origin airport (``value`` NULL: no origin)
+* ``dim='airline'`` - per airline
+
+Sketches add bucket by bucket, so any roll-up (a week, an airline over a
+month, the whole history) is a merge of O(partitions) small arrays instead of
+a rescan of ``flights``.
+
+Error bound: a DDSketch with relative accuracy ``ALPHA`` returns, for any
+quantile q, a value within ``ALPHA`` (1%) of the exact q-quantile, i.e. the
+element of rank ``floor(q * (n - 1))`` of the sorted delays; zero delays are
+exact. Histograms place each bucket's flights in the bin of the bucket's
+representative value, so a flight may fall into a neighbouring bin when its
+delay is within 1% of a bin edge. Counts are exact. ``--check`` verifies
+both against the raw flights at every roll-up level.
+
+Like the rollup, only days touched since the last run (see core.changes)
+are rebuilt:
+
+    python -m core.sketch            # incremental
+    python -m core.sketch --full     # rebuild
+    python -m core.sketch --check    # compare sketch quantiles with exact ones
+"""
+import argparse
+import math
+import struct
+from collections import defaultdict
+from datetime import date, timedelta
+
+import numpy as np
+
+from . import changes, db
+from .delays import DELAY_MIN_SQL
+
+CONSUMER = "delay_sketch"
+ALPHA = 0.01
+GAMMA = (1 + ALPHA) / (1 - ALPHA)
+LOG_GAMMA = math.log(GAMMA)
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+_HEADER = struct.Struct("<Ii")  # zero count, index of the first bucket
+
+# Installed by migration 7 (see core.migrations).
+SKETCH_DDL = [
+    """
+    CREATE TABLE IF NOT EXISTS flight_delay_sketch (
+        dim TEXT NOT NULL,
+        value TEXT,
+        day TEXT NOT NULL,
+        flights INTEGER NOT NULL,
+        sketch BLOB NOT NULL
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS idx_flight_delay_sketch_dim_day
+    ON flight_delay_sketch (dim, day)
+    """,
+]
+
+# Flights with a delay on one UTC day; the range walks idx_flights_scheduled.
+DAY_DELAYS_SQL = f"""
+SELECT f.origin_iata, f.airline_name, {DELAY_MIN_SQL} AS delay_min
+FROM flights f
+WHERE f.scheduled_time >= ?
+  AND f.scheduled_time < date(?, '+1 day')
+  AND date(f.scheduled_time) = ?
+  AND f.actual_epoch IS NOT NULL
+  AND f.scheduled_epoch IS NOT NULL
+"""
+
+
+class DDSketch:
+    """Log-bucketed counts: bucket ``i`` holds (gamma^(i-1), gamma^i]."""
+
+    __slots__ = ("zero", "offset", "counts")
+
+    def __init__(self, zero=0, offset=0, counts=None):
+        self.zero = int(zero)
+        self.offset = int(offset)
+        self.counts = (np.zeros(0, np.int64) if counts is None
+                       else np.asarray(counts, np.int64))
+
+    @classmethod
+    def of(cls, values):
+        values = np.asarray(values, float)
+        positive = values[values > 0]
+        zero = len(values) - len(positive)
+        if not len(positive):
+            return cls(zero)
+        index = np.ceil(np.log(positive) / LOG_GAMMA).astype(np.int64)
+        offset = int(index.min())
+        return cls(zero, offset, np.bincount(index - offset))
+
+    @property
+    def count(self):
+        return self.zero + int(self.counts.sum())
+
+    def merge(self, other):
+        """Add ``other`` into this sketch (in place); returns self."""
+        self.zero += other.zero
+        if not len(other.counts):
+            return self
+        if not len(self.counts):
+            self.offset, self.counts = other.offset, other.counts.copy()
+            return self
+        lo = min(self.offset, other.offset)
+        hi = max(self.offset + len(self.counts),
+                 other.offset + len(other.counts))
+        merged = np.zeros(hi - lo, np.int64)
+        merged[self.offset - lo:self.offset - lo + len(self.counts)] += self.counts
+        merged[other.offset - lo:other.offset - lo + len(other.counts)] += other.counts
+        self.offset, self.counts = lo, merged
+        return self
+
+    def values(self):
+        """Representative value of every bucket (within ALPHA of its items)."""
+        index = self.offset + np.arange(len(self.counts))
+        return 2 * GAMMA ** index / (GAMMA + 1)
+
+    def quantile(self, q):
+        """Estimate of the sorted value at rank floor(q * (count - 1))."""
+        n = self.count
+        if not n:
+            return None
+        rank = math.floor(q * (n - 1))
+        if rank < self.zero:
+            return 0.0
+        position = np.searchsorted(
+            np.cumsum(self.counts), rank - self.zero, side="right"
+        )
+        return float(self.values()[position])
+
+    def histogram(self, edges):
+        """Flights per ``[edges[i], edges[i + 1])``; the last bin is open."""
+        edges = np.asarray(edges, float)
+        bins = np.clip(
+            np.searchsorted(edges, self.values(), side="right") - 1,
+            0, len(edges) - 1,
+        )
+        out = np.bincount(bins, self.counts, minlength=len(edges))
+        out[0] += self.zero
+        return out.astype(np.int64)
+
+    def to_bytes(self):
+        return _HEADER.pack(self.zero, self.offset) + (
+            self.counts.astype("<u4").tobytes()
+        )
+
+    @classmethod
+    def from_bytes(cls, blob):
+        zero, offset = _HEADER.unpack_from(blob)
+        return cls(zero, offset, np.frombuffer(blob, "<u4", offset=_HEADER.size))
+
+
+def merge_by(rows):
+    """{key: merged DDSketch} from (key, sketch blob) rows."""
+    merged = defaultdict(DDSketch)
+    for key, blob in rows:
+        merged[key].merge(DDSketch.from_bytes(blob))
+    return dict(merged)
+
+
+def summarize(rows, quantiles=QUANTILES):
+    """One record per key of (key, sketch blob) rows: flights and p50...p99."""
+    return [
+        {"key": key, "flights": merged.count,
+         **{f"p{round(q * 100)}": round(merged.quantile(q), 1)
+            for q in quantiles}}
+        for key, merged in merge_by(rows).items()
+    ]
+
+
+def week(day):
+    """Monday of ``day``'s ISO week."""
+    day = date.fromisoformat(day)
+    return (day - timedelta(days=day.weekday())).isoformat()
+
+
+# ======================================================
+# BUILD
+# ======================================================
+def _day_rows(conn, day):
+    """(dim, value, day, flights, sketch) rows for one UTC day."""
+    fetched = conn.execute(DAY_DELAYS_SQL, (day, day, day)).fetchall()
+    if not fetched:
+        return []
+    origins, airlines, delays = zip(*fetched)
+    delays = np.array(delays, float)
+    rows = [("all", "", day, len(delays), DDSketch.of(delays).to_bytes())]
+    for dim, keys in (("origin", origins), ("airline", airlines)):
+        groups = defaultdict(list)
+        for position, key in enumerate(keys):
+            groups[key].append(position)
+        for key, positions in groups.items():
+            sketch = DDSketch.of(delays[positions])
+            rows.append((dim, key, day, len(positions), sketch.to_bytes()))
+    return rows
+
+
+def refresh(conn, full=False):
+    """Bring ``flight_delay_sketch`` up to date; returns days rebuilt."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        partitions, cursor = changes.pending(conn, CONSUMER)
+        if full or partitions is None:
+            conn.execute("DELETE FROM flight_delay_sketch")
+            days = {day for (day,) in conn.execute(
+                "SELECT DISTINCT date(scheduled_time) FROM flights"
+            )}
+        else:
+            days = {day for _, day in partitions}
+        days.discard(None)  # no date, no delay
+
+        for day in sorted(days):
+            conn.execute("DELETE FROM flight_delay_sketch WHERE day = ?", (day,))
+            conn.executemany(
+                "INSERT INTO flight_delay_sketch VALUES (?, ?, ?, ?, ?)",
+                _day_rows(conn, day),
+            )
+        changes.commit(conn, CONSUMER, cursor)
+        if days:
+            db.bump_data_version(conn, "flight_delay_sketch")
+    except Exception:
+        conn.rollback()
+        raise
+    conn.commit()
+    return len(days)
+
+
+# ======================================================
+# CHECK
+# ======================================================
+def check(conn, quantiles=QUANTILES, log=print):
+    """Compare merged sketches with exact quantiles; returns the failures."""
+    exact = defaultdict(list)  # (level, key) -> delays
+    for day, origin, airline, delay in conn.execute(f"""
+        SELECT date(f.scheduled_time), f.origin_iata, f.airline_name,
+               {DELAY_MIN_SQL}
+        FROM flights f
+        WHERE f.actual_epoch IS NOT NULL AND f.scheduled_epoch IS NOT NULL
+          AND date(f.scheduled_time) IS NOT NULL
+    """):
+        for key in (("all", ""), ("day", day), ("week", week(day)),
+                    ("origin", origin), ("airline", airline),
+                    ("origin-day", (origin, day))):
+            exact[key].append(delay)
+
+    sketches = {}
+    rows = conn.execute(
+        "SELECT dim, value, day, sketch FROM flight_delay_sketch"
+    ).fetchall()
+    for level, dim, key_of in (
+        ("all", "all", lambda value, day: ""),
+        ("day", "all", lambda value, day: day),
+        ("week", "all", lambda value, day: week(day)),
+        ("origin", "origin", lambda value, day: value),
+        ("airline", "airline", lambda value, day: value),
+        ("origin-day", "origin", lambda value, day: (value, day)),
+    ):
+        merged = merge_by(
+            (key_of(value, day), blob)
+            for d, value, day, blob in rows if d == dim
+        )
+        sketches.update({(level, k): s for k, s in merged.items()})
+
+    failures = []
+    worst = defaultdict(float)
+    for (level, key), delays in exact.items():
+        sketch = sketches.get((level, key))
+        delays = np.sort(np.array(delays, float))
+        if sketch is None or sketch.count != len(delays):
+            failures.append((level, key, "count"))
+            continue
+        for q in quantiles:
+            want = delays[math.floor(q * (len(delays) - 1))]
+            got = sketch.quantile(q)
+            error = abs(got - want) / want if want else abs(got)
+            worst[level] = max(worst[level], error)
+            if error > ALPHA * (1 + 1e-9):
+                failures.append((level, key, q))
+    for level in dict.fromkeys(level for level, _ in exact):
+        groups = sum(1 for lv, _ in exact if lv == level)
+        log(f"{level:<11} {groups:>7} groups  max relative error "
+            f"{worst[level]:.4%} (bound {ALPHA:.0%})")
+    return failures
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--db", default=db.DB_PATH, help="SQLite database path")
+    parser.add_argument("--full", action="store_true", help="rebuild every day")
+    parser.add_argument(
+        "--check", action="store_true",
+        help="compare sketch quantiles with exact ones instead of refreshing",
+    )
+    args = parser.parse_args(argv)
+
+    conn = db.connect(args.db)
+    try:
+        if args.check:
+            failures = check(conn)
+            for failure in failures[:20]:
+                print("FAIL", *failure)
+            if failures:
+                raise SystemExit(1)
+            return
+        count = refresh(conn, full=args.full)
+    finally:
+        conn.close()
+    print(f"flight_delay_sketch: {count} days rebuilt")
+
+
+if __name__ == "__main__":
+    main()
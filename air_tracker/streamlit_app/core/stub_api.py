@@ -0,0 +1,205 @@
+"""Local stand-in for the AeroDataBox endpoints used by core.fetch.
+
+Serves AeroDataBox-shaped JSON built from the CSV snapshots in ``data/`` so
+the fetcher can be exercised (and load-tested) without an API key. Optional
+latency and random 429/503 responses make retry/backoff paths observable:
+
+    python -m core.stub_api --port 8089 --latency-ms 50 --fail-rate 0.1
+    python -m core.fetch aircraft VT-TNM --base-url http://127.0.0.1:8089 --out /tmp/a.csv
+"""
+import argparse
+import csv
+import json
+import math
+import random
+import sys
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from . import db
+
+
+def _read_csv(name):
+    with open(db.DATA_DIR / name, newline="", encoding="utf-8") as f:
+        return [
+            {k: (v or None) for k, v in row.items()}
+            for row in csv.DictReader(f)
+        ]
+
+
+def _time(value):
+    return {"utc": value} if value else {}
+
+
+def _flight_payload(row):
+    side = {"airport": {"iata": row["origin_iata"]}}
+    other = {"airport": {"iata": row["destination_iata"]}}
+    movement = {
+        "scheduledTime": _time(row["scheduled_time"]),
+        "runwayTime": _time(row["actual_time"]),
+    }
+    payload = {
+        "number": row["flight_number"],
+        "airline": {"name": row["airline_name"]},
+        "aircraft": {"reg": row["aircraft_registration"]},
+        "status": row["status"],
+        "codeshareStatus": "IsOperator",
+    }
+    if row["flight_type"] == "arrival":
+        payload["departure"] = side
+        payload["movement"] = dict(other, **movement)
+    else:
+        payload["movement"] = dict(side, **movement)
+        payload["arrival"] = other
+    return payload
+
+
+class StubData:
+    """Indexes over the CSV snapshots, built once at start-up."""
+
+    def __init__(self):
+        self.airports = {a["iata_code"]: a for a in _read_csv("airports.csv")}
+        self.aircraft = {a["registration"]: a for a in _read_csv("aircraft.csv")}
+        self.flights = defaultdict(lambda: {"arrivals": [], "departures": []})
+        for row in _read_csv("flights.csv"):
+            bucket = "arrivals" if row["flight_type"] == "arrival" else "departures"
+            for code in {row["origin_iata"], row["destination_iata"]} - {None}:
+                self.flights[code][bucket].append(_flight_payload(row))
+
+    def airport(self, code):
+        a = self.airports.get(code)
+        if a is None:
+            return None
+        return {
+            "icao": a["icao_code"], "iata": a["iata_code"],
+            "shortname": a["name"], "timeZone": a["timezone"],
+            "location": {
+                "lat": float(a["latitude"]), "lon": float(a["longitude"]),
+                "city": a["city"],
+                "country": {"name": a["country"], "continent": a["continent"]},
+            },
+        }
+
+    def nearest_airport(self, lat, lon):
+        def distance(a):
+            return math.hypot(
+                float(a["latitude"]) - lat, float(a["longitude"]) - lon
+            )
+
+        if not self.airports:
+            return {"items": []}
+        a = min(self.airports.values(), key=distance)
+        return {"items": [{
+            "name": a["name"], "municipalityName": a["city"],
+            "countryCode": a["country"],
+        }]}
+
+    def aircraft_by_reg(self, reg):
+        a = self.aircraft.get(reg)
+        if a is None:
+            return None
+        return [{
+            "reg": a["registration"], "model": a["model"],
+            "icaoCode": a["icao_type_code"], "airlineName": a["owner"],
+        }]
+
+
+def make_handler(data, latency_ms=0, fail_rate=0.0):
+    lock = threading.Lock()
+    rng = random.Random(0)
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+        def log_message(self, *args):
+            pass
+
+        def _send(self, status, body=None, headers=()):
+            raw = json.dumps(body).encode() if body is not None else b""
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            for name, value in headers:
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_GET(self):
+            if latency_ms:
+                time.sleep(latency_ms / 1000)
+            with lock:
+                fail = rng.random() < fail_rate
+                status = rng.choice([429, 503])
+            if fail:
+                return self._send(status, {"message": "stub failure"},
+                                  [("Retry-After", "0")])
+
+            url = urlparse(self.path)
+            parts = url.path.strip("/").split("/")
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            body = None
+            if parts[:2] == ["airports", "iata"] and len(parts) == 3:
+                body = data.airport(parts[2])
+            elif parts == ["airports", "search", "location"]:
+                body = data.nearest_airport(
+                    float(query.get("lat", 0)), float(query.get("lon", 0))
+                )
+            elif parts[:2] == ["aircrafts", "reg"] and len(parts) >= 3:
+                body = data.aircraft_by_reg(parts[2])
+            elif parts[:3] == ["flights", "airports", "iata"] and len(parts) == 4:
+                body = data.flights.get(parts[3]) or {
+                    "arrivals": [], "departures": []
+                }
+            if body is None:
+                return self._send(404, {"message": "not found"})
+            self._send(200, body)
+
+    return Handler
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address):
+        # Clients dropping idle keep-alive connections is not an error.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+def make_server(host="127.0.0.1", port=8089, latency_ms=0, fail_rate=0.0):
+    return StubServer(
+        (host, port), make_handler(StubData(), latency_ms, fail_rate)
+    )
+
+
+def serve(host="127.0.0.1", port=8089, latency_ms=0, fail_rate=0.0):
+    """Start the stub in a background thread; returns the server."""
+    server = make_server(host, port, latency_ms, fail_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency-ms", type=int, default=0)
+    parser.add_argument("--fail-rate", type=float, default=0.0,
+                        help="fraction of requests answered with 429/503")
+    args = parser.parse_args(argv)
+
+    server = make_server(
+        args.host, args.port, args.latency_ms, args.fail_rate
+    )
+    print(f"AeroDataBox stub on http://{args.host}:{server.server_port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
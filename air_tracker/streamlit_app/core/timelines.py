@@ -0,0 +1,213 @@
+"""Fleet utilization from per-aircraft flight timelines.
+
+Each ``flights`` row is one movement of a tail: a departure from its
+origin or an arrival at its destination. The rows are read once per data
+version and time window in (registration, scheduled_time) order, straight off
+idx_flights_registration_sched, into a ``FleetTimeline``: NumPy columns plus
+an ``indptr`` so tail ``i``'s movements are ``indptr[i]:indptr[i + 1]``.
+
+Every metric comes from consecutive movements of the same tail:
+
+* block time - a departure followed by the arrival of the same flight
+  number;
+* turnaround - an arrival followed by a departure from the same airport
+  within ``MAX_TURNAROUND`` seconds;
+* idle time - any other gap (overnight stops and stretches the feed did not
+  see);
+* rotations - legs flown per active UTC day, where a departure/arrival pair
+  counts as one leg and an unmatched movement as one leg of its own.
+
+Cancelled flights count towards ``flights`` but never towards the timeline.
+"""
+import numpy as np
+import pandas as pd
+
+from .window import ALL
+
+TIMELINE_SQL = """
+SELECT
+    f.aircraft_registration,
+    f.scheduled_epoch,
+    f.flight_number,
+    f.flight_type = 'departure' AS is_departure,
+    CASE WHEN f.flight_type = 'departure'
+        THEN f.origin_iata ELSE f.destination_iata
+    END AS airport_iata,
+    f.status = 'Canceled' AS is_cancelled
+FROM flights f
+WHERE f.aircraft_registration IS NOT NULL
+  AND f.scheduled_epoch IS NOT NULL
+  {window}
+ORDER BY f.aircraft_registration, f.scheduled_time
+"""
+
+# Only added for a bounded window (see core.route_graph).
+WINDOW_SQL = "AND f.epoch_day BETWEEN ? AND ?"
+
+MAX_TURNAROUND = 6 * 3600
+
+
+class FleetTimeline:
+    """Movements of every tail, sorted by time, with derived utilization."""
+
+    def __init__(self, movements, aircraft=()):
+        """``movements``: rows of TIMELINE_SQL; ``aircraft``: (registration,
+        model) rows, which also adds tails that have not flown."""
+        movements = pd.DataFrame(movements, columns=[
+            "registration", "epoch", "flight_number", "is_departure",
+            "airport_iata", "is_cancelled",
+        ])
+        models = dict(aircraft)
+        self.codes = np.unique(np.concatenate([
+            np.asarray(list(models), dtype=object),
+            movements["registration"].to_numpy(object),
+        ]).astype(str))
+        self.model = np.array([models.get(c) for c in self.codes], dtype=object)
+        self.node = {code: i for i, code in enumerate(self.codes)}
+
+        n = len(self.codes)
+        tail = np.searchsorted(
+            self.codes, movements["registration"].to_numpy(str)
+        )
+        self.flights = np.bincount(tail, minlength=n)
+
+        # The timeline: flown movements only, already in (tail, time) order.
+        flown = ~movements["is_cancelled"].fillna(0).to_numpy(bool)
+        self.tail = tail[flown]
+        self.epoch = movements["epoch"].to_numpy(np.int64)[flown]
+        self.departure = (
+            movements["is_departure"].fillna(0).to_numpy(bool)[flown]
+        )
+        self.flight_number = movements["flight_number"].to_numpy(object)[flown]
+        self.airport = (
+            movements["airport_iata"].fillna("").to_numpy(object)[flown]
+        )
+        self.indptr = np.r_[0, np.cumsum(np.bincount(self.tail, minlength=n))]
+        self._classify()
+        self._utilization = None
+
+    @classmethod
+    def from_db(cls, conn, window=ALL):
+        aircraft = conn.execute(
+            "SELECT registration, model FROM aircraft "
+            "WHERE registration IS NOT NULL"
+        ).fetchall()
+        movements = conn.execute(
+            TIMELINE_SQL.format(window=WINDOW_SQL if window.bounded else ""),
+            window.params("epoch_day") if window.bounded else (),
+        )
+        return cls(movements.fetchall(), aircraft)
+
+    def _classify(self):
+        """Label every gap between consecutive movements of one tail."""
+        self.gap = np.diff(self.epoch)
+        same = (self.tail[1:] == self.tail[:-1]) & (self.gap >= 0)
+        dep_then_arr = self.departure[:-1] & ~self.departure[1:]
+        arr_then_dep = ~self.departure[:-1] & self.departure[1:]
+        self.block = (
+            same & dep_then_arr & (self.gap > 0)
+            & (self.flight_number[:-1] == self.flight_number[1:])
+        )
+        self.turnaround = (
+            same & arr_then_dep & (self.gap <= MAX_TURNAROUND)
+            & (self.airport[:-1] == self.airport[1:])
+            & (self.airport[1:] != "")
+        )
+        self.idle = same & ~self.block & ~self.turnaround
+
+        # A leg starts at every movement that is not the arrival of a block.
+        self.leg_start = np.r_[True, ~self.block][:len(self.tail)]
+
+    def _per_tail(self, mask, weights=None):
+        """Sum of ``weights`` (or count) over masked gaps, per tail."""
+        return np.bincount(
+            self.tail[:-1][mask],
+            None if weights is None else weights[mask],
+            minlength=len(self.codes),
+        )
+
+    @property
+    def tail_count(self):
+        """Tails with at least one flight."""
+        return int((self.flights > 0).sum())
+
+    # ---------------- METRICS ----------------
+    def utilization(self):
+        """One row per tail: volume, block/turnaround/idle time, rotations."""
+        if self._utilization is None:
+            self._utilization = self._compute_utilization()
+        return self._utilization
+
+    def _compute_utilization(self):
+        n = len(self.codes)
+        legs = np.bincount(self.tail[self.leg_start], minlength=n)
+        # Movements are time-ordered within a tail, so a new (tail, day)
+        # starts wherever either changes.
+        day = self.epoch // 86400
+        new_day = np.r_[True, (np.diff(self.tail) != 0) | (np.diff(day) != 0)]
+        active_days = np.bincount(self.tail[new_day[:len(self.tail)]],
+                                  minlength=n)
+        span = np.zeros(n, np.int64)
+        flown = np.diff(self.indptr) > 0
+        span[flown] = (
+            self.epoch[self.indptr[1:][flown] - 1]
+            - self.epoch[self.indptr[:-1][flown]]
+        )
+
+        block = self._per_tail(self.block, self.gap)
+        turns = self._per_tail(self.turnaround)
+        turn_time = self._per_tail(self.turnaround, self.gap)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return pd.DataFrame({
+                "registration": self.codes,
+                "model": self.model,
+                "flights": self.flights,
+                "legs": legs,
+                "active_days": active_days,
+                "rotations_per_day": np.round(legs / active_days, 2),
+                "block_hours": np.round(block / 3600, 2),
+                "turnarounds": turns,
+                "avg_turnaround_min": np.round(turn_time / turns / 60, 1),
+                "idle_hours": np.round(
+                    self._per_tail(self.idle, self.gap) / 3600, 2
+                ),
+                "utilization_pct": np.round(
+                    np.where(span > 0, 100 * block / span, np.nan), 1
+                ),
+            })
+
+    def turnaround_minutes(self):
+        return self.gap[self.turnaround] / 60
+
+    def block_hours(self):
+        return float(self.gap[self.block].sum() / 3600)
+
+    # ---------------- TIMELINE ----------------
+    def segments(self, registrations):
+        """Gantt rows (registration, start, end, activity, detail) for the
+        gaps of the given tails."""
+        tails = [self.node[r] for r in registrations if r in self.node]
+        gaps = np.concatenate(
+            [np.arange(self.indptr[i], self.indptr[i + 1] - 1) for i in tails]
+            or [np.zeros(0, np.int64)]
+        ).astype(np.int64)
+        keep = self.block[gaps] | self.turnaround[gaps] | self.idle[gaps]
+        gaps = gaps[keep]
+
+        activity = np.select(
+            [self.block[gaps], self.turnaround[gaps]],
+            ["Flight", "Turnaround"],
+            "Idle",
+        )
+        detail = np.where(
+            self.block[gaps],
+            self.flight_number[gaps],
+            self.airport[gaps + 1],
+        )
+        return pd.DataFrame({
+            "registration": self.codes[self.tail[gaps]],
+            "start": pd.to_datetime(self.epoch[gaps], unit="s", utc=True),
+            "end": pd.to_datetime(self.epoch[gaps + 1], unit="s", utc=True),
+            "activity": activity,
+            "detail": detail,
+        })
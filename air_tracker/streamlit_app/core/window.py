@@ -0,0 +1,176 @@
+"""Global time window shared by every page.
+
+The sidebar control picks a range of UTC days: a preset anchored on the
+newest day in the data ("Last 7 days" means the seven days up to it), or a
+custom range. The choice is kept in ``st.session_state``, so it follows the
+user from page to page, and core.data prepends it to the params of every
+query in ``core.queries.WINDOWED``. Those queries start their filter with
+the window on a day-partitioned, indexed column, so a narrow window reads
+only the index ranges of the days it covers however much history is kept:
+
+* ``"day"`` - ISO day text: ``flight_cube.day``, ``airport_delays.delay_date``
+  and ``flight_delay_sketch.day``, ``col BETWEEN ? AND ?``;
+* ``"epoch_day"`` - UTC days since 1970-01-01: ``flights.epoch_day`` (added
+  by migration 8), ``col BETWEEN ? AND ?``;
+* ``"time"`` - ISO timestamps: ``airport_movements.scheduled_time``,
+  ``col >= ? AND col < ?`` with the day after the window as the bound.
+"""
+from datetime import date, timedelta
+from typing import NamedTuple
+
+EPOCH = date(1970, 1, 1)
+SESSION_KEY = "time_window"
+
+# label -> days up to the newest day in the data (None: all of it)
+PRESETS = {
+    "All time": None,
+    "Last day": 1,
+    "Last 7 days": 7,
+    "Last 30 days": 30,
+}
+CUSTOM = "Custom range"
+
+# Installed by migration 8 (see core.migrations). The backfill goes through
+# the change-tracking triggers like migration 6's, so the Parquet copy gains
+# the column on the next export.
+WINDOW_DDL = [
+    "ALTER TABLE flights ADD COLUMN epoch_day INTEGER",
+    "UPDATE flights SET epoch_day = scheduled_epoch / 86400",
+    "CREATE INDEX IF NOT EXISTS idx_flights_epoch_day ON flights (epoch_day)",
+    "CREATE INDEX IF NOT EXISTS idx_flight_cube_day ON flight_cube (day)",
+    """
+    CREATE INDEX IF NOT EXISTS idx_airport_delays_date
+    ON airport_delays (delay_date)
+    """,
+]
+
+
+def epoch_day(day):
+    """UTC days since 1970-01-01, the value of ``flights.epoch_day``."""
+    return (date.fromisoformat(str(day)) - EPOCH).days
+
+
+class Window(NamedTuple):
+    """Inclusive range of UTC days."""
+
+    first: date
+    last: date
+
+    @property
+    def bounded(self):
+        return self != ALL
+
+    def params(self, kind):
+        """The two query params of the window for a column ``kind``."""
+        if kind == "epoch_day":
+            return epoch_day(self.first), epoch_day(self.last)
+        if kind == "time":
+            end = self.last if self.last == date.max else (
+                self.last + timedelta(days=1)
+            )
+            return self.first.isoformat(), end.isoformat()
+        return self.first.isoformat(), self.last.isoformat()
+
+    def clip(self, date_from=None, date_to=None):
+        """Intersect an inclusive (date_from, date_to) filter, either end
+        None for open, with the window; open ends stay None when the window
+        does not bound them."""
+        if self.first != ALL.first:
+            date_from = max(date_from or self.first, self.first)
+        if self.last != ALL.last:
+            date_to = min(date_to or self.last, self.last)
+        return date_from, date_to
+
+    def label(self):
+        if not self.bounded:
+            return "all time"
+        if self.first == self.last:
+            return f"{self.first:%d %b %Y}"
+        return f"{self.first:%d %b %Y} – {self.last:%d %b %Y}"
+
+
+ALL = Window(date.min, date.max)
+
+
+def preset(label, last_day):
+    """The ``PRESETS`` window ending on ``last_day`` (the newest data day)."""
+    days = PRESETS[label]
+    if days is None or last_day is None:
+        return ALL
+    return Window(last_day - timedelta(days=days - 1), last_day)
+
+
+def presets(last_day):
+    """{label: Window} of every preset; what core.serving prebuilds."""
+    return {label: preset(label, last_day) for label in PRESETS}
+
+
+def current():
+    """The session's window; ``ALL`` until a page renders ``control``."""
+    import streamlit as st
+
+    return st.session_state.get(SESSION_KEY, ALL)
+
+
+def persisted(key, default):
+    """Seed widget ``key`` from its copy that survives page switches."""
+    import streamlit as st
+
+    if key not in st.session_state:
+        st.session_state[key] = st.session_state.get(f"_{key}", default)
+    return key
+
+
+def control():
+    """Render the window picker (and the live-updates switch) in the
+    sidebar; returns the window.
+
+    Call near the top of every page, before its queries. Streamlit drops
+    widget state when the user switches page, so each widget is re-seeded
+    from a plain session key that mirrors it.
+    """
+    import streamlit as st
+
+    from .data import follow, load
+
+    bounds = load("flight_date_bounds").iloc[0]
+    first_day = (
+        date.fromisoformat(bounds["first_day"]) if bounds["first_day"] else None
+    )
+    last_day = (
+        date.fromisoformat(bounds["last_day"]) if bounds["last_day"] else None
+    )
+
+    choice = st.sidebar.selectbox(
+        "Time window",
+        [*PRESETS, CUSTOM],
+        key=persisted("window_preset", "All time"),
+        help="Applies to every page; presets end on the newest day in the data.",
+    )
+    st.session_state["_window_preset"] = choice
+
+    if choice != CUSTOM or first_day is None:
+        window = preset(choice if choice in PRESETS else "All time", last_day)
+    else:
+        # Keep a range saved against older data inside the current bounds.
+        saved = tuple(
+            min(max(day, first_day), last_day)
+            for day in st.session_state.get("_window_days", (first_day, last_day))
+        )
+        st.session_state["_window_days"] = saved
+        picked = st.sidebar.date_input(
+            "Days (UTC)",
+            min_value=first_day,
+            max_value=last_day,
+            key=persisted("window_days", saved),
+        )
+        if len(picked) == 2:
+            st.session_state["_window_days"] = tuple(picked)
+        # A half-picked range keeps the last complete one.
+        window = Window(*st.session_state["_window_days"])
+
+    st.session_state[SESSION_KEY] = window
+    if window.bounded:
+        st.sidebar.caption(f"Showing {window.label()} (UTC)")
+    follow()
+    return window
@@ -1,37 +1,25 @@
 import streamlit as st
-import pandas as pd
-import sqlite3
 import plotly.express as px
 
-# ---------------- DB CONNECTION ----------------
-def get_connection():
-    return sqlite3.connect(
-        "air_tracker/streamlit_app/database/air_tracker.db",
-        check_same_thread=False
-    )
+from core import geo
+from core.data import load, snapshot
+from core.figures import figure
+from core.profiling import timed
+from core.sections import tabs
+from core.window import control
 
-conn = get_connection()
 st.title("🌍 Airports Analysis")
 
+control()
+
 # ================= KPI: BUSIEST AIRPORT =================
-busiest_airport_df = pd.read_sql(
-    """
-    SELECT
-        a.iata_code AS airport,
-        COUNT(f.flight_number) AS movements
-    FROM airport a
-    LEFT JOIN flights f
-        ON a.iata_code IN (f.origin_iata, f.destination_iata)
-    GROUP BY a.iata_code
-    ORDER BY movements DESC
-    LIMIT 1
-    """,
-    conn
-)
+# Static datasets; only the map viewport and the selected airport's flights
+# are queried on interaction.
+traffic_df = snapshot("airport_traffic")["airport_traffic"]
 
-if not busiest_airport_df.empty:
-    busiest_airport = busiest_airport_df.iloc[0]["airport"]
-    busiest_movements = busiest_airport_df.iloc[0]["movements"]
+if not traffic_df.empty:
+    busiest_airport = traffic_df.iloc[0]["iata_code"]
+    busiest_movements = traffic_df.iloc[0]["total_movements"]
 else:
     busiest_airport = "N/A"
     busiest_movements = 0
@@ -41,66 +29,65 @@ col1.metric("Busiest Airport (Movements)", busiest_airport)
 col2.metric("Total Movements", busiest_movements)
 
 # ================= TABS =================
-tab1, tab2, tab3 = st.tabs(
-    ["🌍 Airport Map", "🏢 Airport Details", "📋 Airport Tables"]
-)
+# Each tab is built only while it is open (core.sections).
+
 
 # ======================================================
 # TAB 1 : MAP — FLIGHT DENSITY
 # ======================================================
-with tab1:
-    map_df = pd.read_sql(
-        """
-        SELECT
-            a.iata_code,
-            a.name,
-            a.city,
-            a.latitude,
-            a.longitude,
-            COUNT(f.flight_number) AS total_movements
-        FROM airport a
-        LEFT JOIN flights f
-            ON a.iata_code IN (f.origin_iata, f.destination_iata)
-        GROUP BY a.iata_code, a.name, a.city, a.latitude, a.longitude
-        """,
-        conn
+def airport_map():
+    colA, colB = st.columns([2, 1])
+    region = colA.selectbox(
+        "Region", list(geo.VIEWPORTS), key="airport_map.region"
     )
-
-    fig = px.scatter_mapbox(
-        map_df,
-        lat="latitude",
-        lon="longitude",
-        size="total_movements",
-        hover_name="name",
-        hover_data=["iata_code", "city", "total_movements"],
-        zoom=1.5,
-        height=550,
-        title="Airport Flight Density (Arrivals + Departures)"
+    cells = colB.select_slider(
+        "Detail", options=[12, 24, 48, 96, 192], value=geo.CELLS,
+        help="Grid columns across the view; nearby airports share a marker.",
+        key="airport_map.cells",
     )
-
-    fig.update_layout(
-        mapbox_style="open-street-map",
-        margin={"r": 0, "t": 40, "l": 0, "b": 0}
+    bounds = geo.VIEWPORTS[region]
+    center, zoom = geo.map_view(bounds)
+
+    # One marker per occupied grid cell in view, never the raw airport list.
+    map_df = geo.airport_bins(bounds, cells)
+
+    with timed("Airport Flight Density (Arrivals + Departures)"):
+        fig = figure(
+            px.scatter_mapbox,
+            map_df,
+            lat="latitude",
+            lon="longitude",
+            size="total_movements",
+            hover_name="name",
+            hover_data=["iata_code", "city", "airports", "total_movements"],
+            center=center,
+            zoom=zoom,
+            height=550,
+            title="Airport Flight Density (Arrivals + Departures)",
+            layout={
+                "mapbox_style": "open-street-map",
+                "margin": {"r": 0, "t": 40, "l": 0, "b": 0},
+            },
+        )
+
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.caption(
+        f"{len(map_df)} markers for {int(map_df['airports'].sum())} "
+        f"airports in view."
     )
 
-    st.plotly_chart(fig, use_container_width=True)
 
 # ======================================================
 # TAB 2 : AIRPORT DETAILS VIEWER
 # ======================================================
-with tab2:
-    airports_df = pd.read_sql(
-        """
-        SELECT iata_code, name, city, country, timezone
-        FROM airport
-        ORDER BY iata_code
-        """,
-        conn
-    )
+def airport_details():
+    airports_df = snapshot("airport_list")["airport_list"]
 
     selected_iata = st.selectbox(
         "Select Airport (IATA)",
-        airports_df["iata_code"]
+        airports_df["iata_code"],
+        key="airport_details.iata",
     )
 
     airport_info = airports_df[
@@ -114,45 +101,27 @@ with tab2:
 
     st.subheader("✈️ Linked Flights")
 
-    linked_flights = pd.read_sql(
-        """
-        SELECT
-            flight_number,
-            airline_name,
-            origin_iata,
-            destination_iata,
-            status,
-            flight_type
-        FROM flights
-        WHERE origin_iata = ? OR destination_iata = ?
-        ORDER BY scheduled_time DESC
-        LIMIT 50
-        """,
-        conn,
-        params=[selected_iata, selected_iata]
-    )
+    linked_flights = load("linked_flights", [selected_iata])
 
     st.dataframe(linked_flights, use_container_width=True)
 
+
 # ======================================================
 # TAB 3 : AIRPORT TABLES
 # ======================================================
-with tab3:
+def airport_tables():
     st.subheader("Airport Movement Summary")
 
-    movement_df = pd.read_sql(
-        """
-        SELECT
-            a.iata_code,
-            a.city,
-            COUNT(f.flight_number) AS total_movements
-        FROM airport a
-        LEFT JOIN flights f
-            ON a.iata_code IN (f.origin_iata, f.destination_iata)
-        GROUP BY a.iata_code, a.city
-        ORDER BY total_movements DESC
-        """,
-        conn
-    )
+    movement_df = traffic_df[["iata_code", "city", "total_movements"]]
 
     st.dataframe(movement_df, use_container_width=True)
+
+
+tabs(
+    {
+        "🌍 Airport Map": airport_map,
+        "🏢 Airport Details": airport_details,
+        "📋 Airport Tables": airport_tables,
+    },
+    key="airports_tab",
+)
@@ -1,66 +1,54 @@
+from datetime import date
+
 import streamlit as st
-import pandas as pd
-import sqlite3
 import plotly.express as px
 
-# ---------------- DB CONNECTION ----------------
-def get_connection():
-    return sqlite3.connect(
-        "air_tracker/streamlit_app/database/air_tracker.db",
-        check_same_thread=False
-    )
+from core.data import run, snapshot
+from core.figures import figure
+from core.kpis import flight_kpis
+from core.profiling import timed
+from core.queries import flights_table_query
+from core.sections import tabs
+from core.window import control
 
-conn = get_connection()
 st.title("✈️ Flights – Operational Analysis")
 
+window = control()
+
 # ================= KPIs (ONLY FLIGHT-SPECIFIC) =================
 col1, col2, col3, col4 = st.columns(4)
 
-arrivals = pd.read_sql(
-    "SELECT COUNT(*) AS cnt FROM flights WHERE flight_type='arrival'", conn
-)["cnt"][0]
-
-departures = pd.read_sql(
-    "SELECT COUNT(*) AS cnt FROM flights WHERE flight_type='departure'", conn
-)["cnt"][0]
-
-delayed = pd.read_sql(
-    "SELECT COUNT(*) AS cnt FROM flights WHERE status='Delayed'", conn
-)["cnt"][0]
-
-cancelled = pd.read_sql(
-    "SELECT COUNT(*) AS cnt FROM flights WHERE LOWER(status) IN ('cancelled','canceled')",
-    conn
-)["cnt"][0]
+kpis = flight_kpis()
 
-col1.metric("Arrivals", arrivals)
-col2.metric("Departures", departures)
-col3.metric("Delayed Flights", delayed)
-col4.metric("Cancelled Flights", cancelled)
+col1.metric("Arrivals", kpis["arrivals"])
+col2.metric("Departures", kpis["departures"])
+col3.metric("Delayed Flights", kpis["delayed"])
+col4.metric("Cancelled Flights", kpis["cancelled"])
 
 # ================= TABS =================
-tab1, tab2, tab3 = st.tabs(
-    ["📊 Flight Overview", "🧭 Operations Breakdown", "📋 Flights Table"]
-)
+# Each tab is built only while it is open (core.sections), with its own
+# static datasets; only the flights table is queried on interaction.
+DIMS = ("airline", "status", "flight_type", "origin", "destination")
+
 
 # ======================================================
 # TAB 1 : FLIGHT OVERVIEW
 # ======================================================
-with tab1:
+def overview():
+    static = snapshot(
+        "status_counts",
+        "status_by_flight_type",
+        ("top_airlines", 10),
+        "flight_type_counts",
+    )
     colA, colB = st.columns(2)
 
     # 1. Flight Status Distribution
-    status_df = pd.read_sql(
-        """
-        SELECT status, COUNT(*) AS flights
-        FROM flights
-        GROUP BY status
-        """,
-        conn
-    )
+    status_df = static["status_counts"]
 
-    with colA:
-        fig = px.pie(
+    with colA, timed("Overall Flight Status Distribution"):
+        fig = figure(
+            px.pie,
             status_df,
             names="status",
             values="flights",
@@ -69,17 +57,11 @@ with tab1:
         st.plotly_chart(fig, use_container_width=True)
 
     # 2. Status by Arrival vs Departure
-    status_type_df = pd.read_sql(
-        """
-        SELECT flight_type, status, COUNT(*) AS flights
-        FROM flights
-        GROUP BY flight_type, status
-        """,
-        conn
-    )
+    status_type_df = static["status_by_flight_type"]
 
-    with colB:
-        fig = px.bar(
+    with colB, timed("Flight Status by Arrival vs Departure"):
+        fig = figure(
+            px.bar,
             status_type_df,
             x="flight_type",
             y="flights",
@@ -92,19 +74,11 @@ with tab1:
     colC, colD = st.columns(2)
 
     # 3. Flights by Airline (Operational Load)
-    airline_df = pd.read_sql(
-        """
-        SELECT airline_name, COUNT(*) AS flights
-        FROM flights
-        GROUP BY airline_name
-        ORDER BY flights DESC
-        LIMIT 10
-        """,
-        conn
-    )
+    airline_df = static["top_airlines", 10]
 
-    with colC:
-        fig = px.bar(
+    with colC, timed("Flights by Airline"):
+        fig = figure(
+            px.bar,
             airline_df,
             x="airline_name",
             y="flights",
@@ -114,17 +88,11 @@ with tab1:
         st.plotly_chart(fig, use_container_width=True)
 
     # 4. Arrival vs Departure Volume
-    movement_df = pd.read_sql(
-        """
-        SELECT flight_type, COUNT(*) AS flights
-        FROM flights
-        GROUP BY flight_type
-        """,
-        conn
-    )
+    movement_df = static["flight_type_counts"]
 
-    with colD:
-        fig = px.bar(
+    with colD, timed("Arrival vs Departure Volume"):
+        fig = figure(
+            px.bar,
             movement_df,
             x="flight_type",
             y="flights",
@@ -133,27 +101,20 @@ with tab1:
         )
         st.plotly_chart(fig, use_container_width=True)
 
+
 # ======================================================
 # TAB 2 : OPERATIONS BREAKDOWN (JOINS, NO REPEAT)
 # ======================================================
-with tab2:
+def breakdown():
+    static = snapshot("flights_by_origin_country", "airline_status")
     colA, colB = st.columns(2)
 
     # 1. Flights by Origin Country
-    country_df = pd.read_sql(
-        """
-        SELECT o.country, COUNT(*) AS flights
-        FROM flights f
-        JOIN airport o
-            ON f.origin_iata = o.iata_code
-        GROUP BY o.country
-        ORDER BY flights DESC
-        """,
-        conn
-    )
+    country_df = static["flights_by_origin_country"]
 
-    with colA:
-        fig = px.pie(
+    with colA, timed("Flights by Origin Country"):
+        fig = figure(
+            px.pie,
             country_df,
             names="country",
             values="flights",
@@ -162,17 +123,11 @@ with tab2:
         st.plotly_chart(fig, use_container_width=True)
 
     # 2. Airline-wise Flight Status (Treemap)
-    airline_status_df = pd.read_sql(
-        """
-        SELECT airline_name, status, COUNT(*) AS flights
-        FROM flights
-        GROUP BY airline_name, status
-        """,
-        conn
-    )
+    airline_status_df = static["airline_status"]
 
-    with colB:
-        fig = px.treemap(
+    with colB, timed("Airline-wise Flight Status Distribution"):
+        fig = figure(
+            px.treemap,
             airline_status_df,
             path=["airline_name", "status"],
             values="flights",
@@ -181,52 +136,114 @@ with tab2:
         )
         st.plotly_chart(fig, use_container_width=True)
 
+
 # ======================================================
 # TAB 3 : FLIGHTS TABLE (ONLY PLACE FOR RAW DATA)
 # ======================================================
-with tab3:
+def table():
+    static = snapshot(
+        "flight_date_bounds", *(("dim_values", dim) for dim in DIMS)
+    )
     st.subheader("🔎 Filter Flights")
 
-    airlines = pd.read_sql(
-        "SELECT DISTINCT airline_name FROM flights ORDER BY airline_name",
-        conn
-    )["airline_name"].dropna().tolist()
-
-    statuses = pd.read_sql(
-        "SELECT DISTINCT status FROM flights ORDER BY status",
-        conn
-    )["status"].dropna().tolist()
-
-    colF1, colF2 = st.columns(2)
-    selected_airline = colF1.selectbox("Airline", ["All"] + airlines)
-    selected_status = colF2.selectbox("Status", ["All"] + statuses)
-
-    base_query = """
-    SELECT
-        f.flight_number,
-        f.airline_name,
-        o.city AS origin_city,
-        d.city AS destination_city,
-        f.scheduled_time,
-        f.status,
-        f.flight_type
-    FROM flights f
-    LEFT JOIN airport o ON f.origin_iata = o.iata_code
-    LEFT JOIN airport d ON f.destination_iata = d.iata_code
-    WHERE 1=1
-    """
-
-    params = []
-
-    if selected_airline != "All":
-        base_query += " AND f.airline_name = ?"
-        params.append(selected_airline)
-
-    if selected_status != "All":
-        base_query += " AND f.status = ?"
-        params.append(selected_status)
-
-    base_query += " ORDER BY f.scheduled_time DESC LIMIT 100"
-
-    flights_table = pd.read_sql(base_query, conn, params=params)
-    st.dataframe(flights_table, use_container_width=True)
+    PAGE_SIZE = 100
+
+    def dim_options(dim):
+        return ["All"] + static["dim_values", dim]["value"].tolist()
+
+    def chosen(value):
+        return None if value == "All" else value
+
+    colF1, colF2, colF3 = st.columns(3)
+    selected_airline = colF1.selectbox(
+        "Airline", dim_options("airline"), key="table.airline"
+    )
+    selected_status = colF2.selectbox(
+        "Status", dim_options("status"), key="table.status"
+    )
+    selected_type = colF3.selectbox(
+        "Flight Type", dim_options("flight_type"), key="table.flight_type"
+    )
+
+    colF4, colF5, colF6 = st.columns(3)
+    selected_origin = colF4.selectbox(
+        "Origin", dim_options("origin"), key="table.origin"
+    )
+    selected_destination = colF5.selectbox(
+        "Destination", dim_options("destination"), key="table.destination"
+    )
+
+    # Days to pick from: the data's, narrowed to the time window.
+    bounds = static["flight_date_bounds"].iloc[0]
+    first_day, last_day = window.clip(
+        date.fromisoformat(bounds["first_day"]) if bounds["first_day"] else None,
+        date.fromisoformat(bounds["last_day"]) if bounds["last_day"] else None,
+    )
+    # Keyed by its bounds too: a new time window starts a fresh picker
+    # rather than one holding days outside it.
+    date_range = colF6.date_input(
+        "Scheduled Date (UTC)",
+        value=(),
+        min_value=first_day,
+        max_value=last_day,
+        key=f"table.days.{first_day}.{last_day}",
+    )
+
+    date_from, date_to = window.clip(
+        date_range[0] if len(date_range) > 0 else None,
+        date_range[1] if len(date_range) > 1 else None,
+    )
+
+    filters = dict(
+        airline=chosen(selected_airline),
+        status=chosen(selected_status),
+        flight_type=chosen(selected_type),
+        origin=chosen(selected_origin),
+        destination=chosen(selected_destination),
+        date_from=date_from,
+        date_to=date_to,
+    )
+
+    # ---------------- Keyset pagination ----------------
+    # The session keeps the cursor of every page visited so far (None for
+    # the first page); changing any filter starts again from page 1.
+    if st.session_state.get("flights_filters") != filters:
+        st.session_state["flights_filters"] = filters
+        st.session_state["flights_cursors"] = [None]
+
+    cursors = st.session_state["flights_cursors"]
+
+    flights_sql, params = flights_table_query(
+        after=cursors[-1], limit=PAGE_SIZE + 1, **filters
+    )
+    flights_table = run(flights_sql, params, name="flights_table")
+
+    has_next = len(flights_table) > PAGE_SIZE
+    flights_table = flights_table.head(PAGE_SIZE)
+
+    def next_page():
+        last = flights_table.iloc[-1]
+        cursors.append((last["scheduled_time"], int(last["flight_rowid"])))
+
+    def previous_page():
+        cursors.pop()
+
+    st.dataframe(
+        flights_table.drop(columns="flight_rowid"),
+        use_container_width=True
+    )
+
+    colP1, colP2, colP3 = st.columns([1, 2, 1])
+    colP1.button("◀ Newer", on_click=previous_page, disabled=len(cursors) == 1)
+    colP2.caption(f"Page {len(cursors)} · {len(flights_table)} flights")
+    colP3.button("Older ▶", on_click=next_page, disabled=not has_next)
+
+
+tabs(
+    {
+        "📊 Flight Overview": overview,
+        "🧭 Operations Breakdown": breakdown,
+        "📋 Flights Table": table,
+    },
+    key="flights_tab",
+)
@@ -1,48 +1,37 @@
 import streamlit as st
 import pandas as pd
-import sqlite3
 import plotly.express as px
 
-# ---------------- DB CONNECTION ----------------
-def get_connection():
-    return sqlite3.connect(
-        "air_tracker/streamlit_app/database/air_tracker.db",
-        check_same_thread=False
-    )
+from core.data import snapshot
+from core.figures import figure
+from core.fleet import MAX_TURNAROUND, fleet_timeline
+from core.profiling import timed
+from core.sections import tabs
+from core.window import control
 
-conn = get_connection()
 st.title("🛩️ Aircraft Utilization")
 
+window = control()
+
+# Static datasets; the rotation timeline reads the cached fleet engine.
+static = snapshot("total_aircraft")
+fleet = fleet_timeline()
+util_df = fleet.utilization()
+flown_df = util_df[util_df["flights"] > 0]
+
 # ======================================================
 # KPIs
 # ======================================================
-total_aircraft = pd.read_sql(
-    "SELECT COUNT(*) cnt FROM aircraft",
-    conn
-)["cnt"][0]
-
-assigned_aircraft = pd.read_sql(
-    """
-    SELECT COUNT(DISTINCT aircraft_registration) cnt
-    FROM flights
-    WHERE aircraft_registration IS NOT NULL
-    """,
-    conn
-)["cnt"][0]
+total_aircraft = int(static["total_aircraft"]["cnt"][0])
+
+assigned_aircraft = fleet.tail_count
 
 unassigned_aircraft = total_aircraft - assigned_aircraft
 
-avg_flights_per_aircraft = pd.read_sql(
-    """
-    SELECT ROUND(
-        CAST(COUNT(*) AS FLOAT) / COUNT(DISTINCT aircraft_registration),
-        2
-    ) AS avg_flights
-    FROM flights
-    WHERE aircraft_registration IS NOT NULL
-    """,
-    conn
-)["avg_flights"][0]
+avg_flights_per_aircraft = (
+    round(flown_df["flights"].sum() / assigned_aircraft, 2)
+    if assigned_aircraft else 0
+)
 
 col1, col2, col3, col4 = st.columns(4)
 col1.metric("Total Aircraft", total_aircraft)
@@ -50,34 +39,45 @@ col2.metric("Aircraft Assigned", assigned_aircraft)
 col3.metric("Unassigned Aircraft", max(unassigned_aircraft, 0))
 col4.metric("Avg Flights / Aircraft", avg_flights_per_aircraft)
 
+turnaround_min = fleet.turnaround_minutes()
+
+col5, col6, col7, col8 = st.columns(4)
+col5.metric("Fleet Block Hours", round(fleet.block_hours(), 1))
+col6.metric(
+    "Median Turnaround (min)",
+    round(float(pd.Series(turnaround_min).median()), 1)
+    if len(turnaround_min) else "–",
+)
+col7.metric(
+    "Avg Daily Rotations", round(flown_df["rotations_per_day"].mean(), 2)
+)
+col8.metric(
+    "Avg Utilization (%)", round(flown_df["utilization_pct"].mean(), 1)
+)
+
 # ======================================================
 # TABS
 # ======================================================
-tab1, tab2 = st.tabs(["📊 Aircraft Analysis", "📋 Aircraft Tables"])
+# Each tab is built only while it is open (core.sections).
+
 
 # ======================================================
 # TAB 1 : CHARTS
 # ======================================================
-with tab1:
+def charts():
     colA, colB = st.columns(2)
 
     # ---------------- Flights per Aircraft Model ----------------
-    model_df = pd.read_sql(
-        """
-        SELECT
-            a.model,
-            COUNT(f.flight_number) AS flights
-        FROM aircraft a
-        LEFT JOIN flights f
-            ON a.registration = f.aircraft_registration
-        GROUP BY a.model
-        ORDER BY flights DESC
-        """,
-        conn
+    model_df = (
+        util_df.dropna(subset=["model"])
+        .groupby("model", as_index=False)[["flights", "block_hours"]]
+        .sum()
+        .sort_values(["flights", "model"], ascending=[False, True])
     )
 
-    with colA:
-        fig = px.bar(
+    with colA, timed("Flights per Aircraft Model"):
+        fig = figure(
+            px.bar,
             model_df,
             x="model",
             y="flights",
@@ -87,22 +87,16 @@ with tab1:
         st.plotly_chart(fig, use_container_width=True)
 
     # ---------------- Top Aircraft by Flights ----------------
-    top_aircraft_df = pd.read_sql(
-        """
-        SELECT
-            aircraft_registration,
-            COUNT(*) AS flights
-        FROM flights
-        WHERE aircraft_registration IS NOT NULL
-        GROUP BY aircraft_registration
-        ORDER BY flights DESC
-        LIMIT 10
-        """,
-        conn
+    top_aircraft_df = (
+        flown_df.sort_values(["flights", "registration"],
+                             ascending=[False, True])
+        .head(10)
+        .rename(columns={"registration": "aircraft_registration"})
     )
 
-    with colB:
-        fig = px.bar(
+    with colB, timed("Top Aircraft by Number of Flights"):
+        fig = figure(
+            px.bar,
             top_aircraft_df,
             x="flights",
             y="aircraft_registration",
@@ -111,41 +105,114 @@ with tab1:
         )
         st.plotly_chart(fig, use_container_width=True)
 
+    colC, colD = st.columns(2)
+
+    # ---------------- Block Hours per Model ----------------
+    with colC, timed("Block Hours per Aircraft Model"):
+        fig = figure(
+            px.bar,
+            model_df.sort_values("block_hours", ascending=False),
+            x="model",
+            y="block_hours",
+            title="Block Hours per Aircraft Model",
+            labels={"block_hours": "Block Hours"}
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    # ---------------- Turnaround Distribution ----------------
+    with colD, timed("Turnaround Time Distribution"):
+        fig = figure(
+            px.histogram,
+            x=turnaround_min,
+            nbins=24,
+            title="Turnaround Time Distribution",
+            labels={"x": "Turnaround (min)"}
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
     # ---------------- Assignment Status ----------------
     assign_df = pd.DataFrame({
         "status": ["Assigned", "Unassigned"],
         "count": [assigned_aircraft, max(unassigned_aircraft, 0)]
     })
 
-    fig = px.pie(
-        assign_df,
-        names="status",
-        values="count",
-        hole=0.4,
-        title="Aircraft Assignment Status"
+    with timed("Aircraft Assignment Status"):
+        fig = figure(
+            px.pie,
+            assign_df,
+            names="status",
+            values="count",
+            hole=0.4,
+            title="Aircraft Assignment Status"
+        )
+
+        st.plotly_chart(fig, use_container_width=True)
+
+
+# ======================================================
+# TAB 2 : ROTATION TIMELINE
+# ======================================================
+def timeline():
+    busiest = flown_df.sort_values(
+        ["block_hours", "flights", "registration"],
+        ascending=[False, False, True],
+    )["registration"].tolist()
+
+    # The options follow the time window, and so does the selection.
+    tails = st.multiselect(
+        "Aircraft", busiest, default=busiest[:5], max_selections=20,
+        key=f"timeline.tails.{window.first}.{window.last}",
+    )
+    segments_df = fleet.segments(tails)
+
+    if segments_df.empty:
+        st.info("No timeline for the selected aircraft.")
+    else:
+        with timed("Aircraft Rotation Timeline"):
+            fig = figure(
+                px.timeline,
+                segments_df,
+                x_start="start",
+                x_end="end",
+                y="registration",
+                color="activity",
+                hover_data=["detail"],
+                color_discrete_map={
+                    "Flight": "#1f77b4",
+                    "Turnaround": "#ff7f0e",
+                    "Idle": "#c7c7c7",
+                },
+                title="Aircraft Rotation Timeline (UTC)",
+                height=max(300, 60 * len(tails)),
+                layout={"yaxis": {"autorange": "reversed"}},
+            )
+            st.plotly_chart(fig, use_container_width=True)
+
+    st.caption(
+        "Flight: departure to arrival of the same flight number. "
+        "Turnaround: arrival to next departure at the same airport within "
+        f"{MAX_TURNAROUND // 3600} hours. Idle: any other gap between movements."
     )
 
-    st.plotly_chart(fig, use_container_width=True)
 
 # ======================================================
-# TAB 2 : TABLES
+# TAB 3 : TABLES
 # ======================================================
-with tab2:
+def tables():
     st.subheader("Aircraft Utilization Table")
 
-    aircraft_table = pd.read_sql(
-        """
-        SELECT
-            a.registration,
-            a.model,
-            COUNT(f.flight_number) AS flights_assigned
-        FROM aircraft a
-        LEFT JOIN flights f
-            ON a.registration = f.aircraft_registration
-        GROUP BY a.registration, a.model
-        ORDER BY flights_assigned DESC
-        """,
-        conn
+    aircraft_table = util_df.sort_values(
+        ["flights", "registration"], ascending=[False, True]
     )
 
-    st.dataframe(aircraft_table, use_container_width=True)
+    st.dataframe(aircraft_table, use_container_width=True, hide_index=True)
+
+
+tabs(
+    {
+        "📊 Aircraft Analysis": charts,
+        "🕒 Rotation Timeline": timeline,
+        "📋 Aircraft Tables": tables,
+    },
+    key="aircraft_tab",
+)
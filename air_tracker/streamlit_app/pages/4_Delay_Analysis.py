@@ -1,87 +1,79 @@
-import streamlit as st
+import numpy as np
 import pandas as pd
-import sqlite3
+import streamlit as st
 import plotly.express as px
 
-# ---------------- DB CONNECTION ----------------
-def get_connection():
-    return sqlite3.connect(
-        "air_tracker/streamlit_app/database/air_tracker.db",
-        check_same_thread=False
-    )
+from core.data import run, snapshot
+from core.delays import GROUPS, delay_histogram_query, delay_query
+from core.figures import figure
+from core.profiling import timed
+from core.sections import tabs
+from core.sketch import merge_by, summarize, week
+from core.window import control
 
-conn = get_connection()
 st.title("⏱️ Delay Analysis")
 
+window = control()
+
 # ======================================================
 # KPIs (HIGH-LEVEL CONTEXT)
 # ======================================================
-kpi_df = pd.read_sql(
-    """
-    SELECT
-        ROUND(AVG(avg_delay_min), 2) AS avg_delay,
-        ROUND(100.0 * SUM(delayed_flights) / SUM(total_flights), 2) AS delay_pct,
-        ROUND(100.0 * SUM(canceled_flights) / SUM(total_flights), 2) AS cancel_pct
-    FROM airport_delays
-    """,
-    conn
-)
+kpi_df = snapshot("delay_kpis")["delay_kpis"]
 
 col1, col2, col3 = st.columns(3)
 col1.metric("Avg Delay (min)", kpi_df["avg_delay"][0])
 col2.metric("Delayed Flights (%)", kpi_df["delay_pct"][0])
 col3.metric("Cancelled Flights (%)", kpi_df["cancel_pct"][0])
 
+# delay_pct is NULL only when the window holds no flights.
+if pd.isna(kpi_df["delay_pct"][0]):
+    st.info(f"No flights in the time window ({window.label()}).")
+    st.stop()
+
 # ================= TABS =================
-tab1, tab2 = st.tabs(
-    ["📊 Delay Insights", "📋 Delay Leaderboard"]
-)
+# Each tab is built only while it is open (core.sections), with its own
+# static datasets; only the explorer's filtered queries run on interaction.
+
 
 # ======================================================
 # TAB 1 : DELAY INSIGHTS (MEANINGFUL CHARTS ONLY)
 # ======================================================
-with tab1:
+def insights():
+    static = snapshot(
+        "delay_severity",
+        "delay_contribution",
+        "delay_rate_vs_volume",
+        ("delay_sketches", "all"),
+    )
     colA, colB = st.columns(2)
 
     # ---------------- 1. Delay Distribution ----------------
-    delay_dist_df = pd.read_sql(
-        """
-        SELECT avg_delay_min
-        FROM airport_delays
-        WHERE avg_delay_min IS NOT NULL
-        """,
-        conn
-    )
+    # Merged per-day sketches: one small array per day, not one row per flight.
+    daily_df = static["delay_sketches", "all"]
+    overall = merge_by(("", blob) for blob in daily_df["sketch"]).get("")
+    edges = np.arange(0, 181, 15)
+    delay_dist_df = pd.DataFrame({
+        "delay_min": [f"{lo}–{lo + 15}" for lo in edges[:-1]] + ["180+"],
+        "flights": overall.histogram(edges) if overall else 0,
+    })
 
-    with colA:
-        fig = px.histogram(
+    with colA, timed("Distribution of Flight Delay (Minutes)"):
+        fig = figure(
+            px.bar,
             delay_dist_df,
-            x="avg_delay_min",
-            nbins=15,
-            title="Distribution of Average Delay (Minutes)"
+            x="delay_min",
+            y="flights",
+            title="Distribution of Flight Delay (Minutes)",
+            labels={"delay_min": "Delay (min)", "flights": "Flights"}
         )
         st.plotly_chart(fig, use_container_width=True)
 
     # ---------------- 2. Delay Severity Buckets ----------------
-    severity_df = pd.read_sql(
-        """
-        SELECT
-            CASE
-                WHEN avg_delay_min <= 15 THEN '0–15 min'
-                WHEN avg_delay_min <= 30 THEN '15–30 min'
-                WHEN avg_delay_min <= 60 THEN '30–60 min'
-                ELSE '60+ min'
-            END AS delay_bucket,
-            COUNT(*) AS airports
-        FROM airport_delays
-        WHERE avg_delay_min IS NOT NULL
-        GROUP BY delay_bucket
-        """,
-        conn
-    )
+    severity_df = static["delay_severity"]
 
-    with colB:
-        fig = px.pie(
+    with colB, timed("Delay Severity Share Across Airports"):
+        fig = figure(
+            px.pie,
             severity_df,
             names="delay_bucket",
             values="airports",
@@ -93,21 +85,11 @@ with tab1:
     colC, colD = st.columns(2)
 
     # ---------------- 3. Delay Contribution Share ----------------
-    contribution_df = pd.read_sql(
-        """
-        SELECT
-            airport_iata,
-            delayed_flights
-        FROM airport_delays
-        WHERE delayed_flights > 0
-        ORDER BY delayed_flights DESC
-        LIMIT 8
-        """,
-        conn
-    )
+    contribution_df = static["delay_contribution"]
 
-    with colC:
-        fig = px.pie(
+    with colC, timed("Contribution to Total Delayed Flights (Top Airports)"):
+        fig = figure(
+            px.pie,
             contribution_df,
             names="airport_iata",
             values="delayed_flights",
@@ -117,21 +99,11 @@ with tab1:
         st.plotly_chart(fig, use_container_width=True)
 
     # ---------------- 4. Delay Rate vs Traffic Volume ----------------
-    bubble_df = pd.read_sql(
-        """
-        SELECT
-            airport_iata,
-            total_flights,
-            delayed_flights,
-            ROUND(100.0 * delayed_flights / total_flights, 2) AS delay_pct
-        FROM airport_delays
-        WHERE total_flights > 0
-        """,
-        conn
-    )
+    bubble_df = static["delay_rate_vs_volume"]
 
-    with colD:
-        fig = px.scatter(
+    with colD, timed("Delay Rate vs Traffic Volume"):
+        fig = figure(
+            px.scatter,
             bubble_df,
             x="total_flights",
             y="delay_pct",
@@ -145,27 +117,18 @@ with tab1:
         )
         st.plotly_chart(fig, use_container_width=True)
 
+
 # ======================================================
 # TAB 2 : DELAY LEADERBOARD (TABLE — NO DUPLICATION)
 # ======================================================
-with tab2:
+def leaderboard():
+    static = snapshot(
+        "delay_leaderboard",
+        *(("delay_sketches", dim) for dim in ("all", "origin", "airline")),
+    )
     st.subheader("🚨 Most Delayed Airports")
 
-    delay_table = pd.read_sql(
-        """
-        SELECT
-            airport_iata,
-            total_flights,
-            delayed_flights,
-            canceled_flights,
-            avg_delay_min,
-            ROUND(100.0 * delayed_flights / total_flights, 2) AS delay_pct
-        FROM airport_delays
-        WHERE total_flights > 0
-        ORDER BY delay_pct DESC
-        """,
-        conn
-    )
+    delay_table = static["delay_leaderboard"]
 
     st.dataframe(delay_table, use_container_width=True)
 
@@ -173,3 +136,123 @@ with tab2:
         "This table ranks airports by delay percentage and provides "
         "exact operational metrics for audit and comparison."
     )
+
+    st.subheader("📐 Delay Percentiles")
+
+    level = st.selectbox(
+        "Per", ["Airport", "Airline", "Day", "Week"], key="leaderboard.level"
+    )
+    dim = {"Airport": "origin", "Airline": "airline"}.get(level, "all")
+    sketch_df = static["delay_sketches", dim]
+    keys = (
+        sketch_df["day"].map(week) if level == "Week"
+        else sketch_df["day"] if level == "Day"
+        else sketch_df["value"]
+    )
+    percentile_df = (
+        pd.DataFrame(
+            summarize(zip(keys, sketch_df["sketch"])),
+            columns=["key", "flights", "p50", "p90", "p95", "p99"],
+        )
+        .dropna(subset=["key"])
+        .rename(columns={"key": level.lower()})
+        .sort_values("p90", ascending=False)
+    )
+
+    st.dataframe(percentile_df, use_container_width=True, hide_index=True)
+
+    st.caption(
+        "Per-flight delay percentiles in minutes, merged from daily sketches; "
+        "each value is within 1% of the exact percentile."
+    )
+
+
+# ======================================================
+# TAB 3 : DELAY EXPLORER (LIVE FROM FLIGHTS, FLIGHT-WEIGHTED)
+# ======================================================
+def explorer():
+    static = snapshot(
+        *(("dim_values", dim) for dim in ("airline", "origin", "destination"))
+    )
+
+    def options(dim):
+        return ["All"] + static["dim_values", dim]["value"].tolist()
+
+    colA, colB, colC = st.columns(3)
+    airline = colA.selectbox(
+        "Airline", options("airline"), key="explorer.airline"
+    )
+    origin = colB.selectbox("Origin", options("origin"), key="explorer.origin")
+    destination = colC.selectbox(
+        "Destination", options("destination"), key="explorer.destination"
+    )
+
+    colD, colE, colF = st.columns(3)
+    hours = colD.slider(
+        "Scheduled hour (UTC)", 0, 23, (0, 23), key="explorer.hours"
+    )
+    group_by = colE.selectbox(
+        "Group by", list(GROUPS), key="explorer.group_by"
+    )
+    min_flights = colF.number_input(
+        "Minimum flights", min_value=1, value=5, key="explorer.min_flights"
+    )
+
+    date_from, date_to = window.clip()
+    filters = {
+        "airline": None if airline == "All" else airline,
+        "origin": None if origin == "All" else origin,
+        "destination": None if destination == "All" else destination,
+        "hours": None if hours == (0, 23) else hours,
+        "date_from": date_from,
+        "date_to": date_to,
+    }
+
+    summary = run(*delay_query(**filters), name="delay_explorer").iloc[0]
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Flights", int(summary["flights"]))
+    col2.metric("Avg Delay (min)", summary["avg_delay_min"])
+    col3.metric("Delayed Flights (%)", summary["delay_pct"])
+
+    grouped_df = run(
+        *delay_query(group_by, min_flights=min_flights, **filters),
+        name="delay_explorer_grouped",
+    )
+    histogram_df = run(
+        *delay_histogram_query(**filters), name="delay_explorer_histogram"
+    )
+
+    colG, colH = st.columns(2)
+
+    with colG, timed("Delay Rate by Group"):
+        fig = figure(
+            px.bar,
+            grouped_df.head(20),
+            x=group_by,
+            y="delay_pct",
+            hover_data=["flights", "avg_delay_min"],
+            title=f"Delay Rate by {group_by.title()} (Top 20)"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    with colH, timed("Per-Flight Delay Distribution"):
+        fig = figure(
+            px.bar,
+            histogram_df,
+            x="delay_min",
+            y="flights",
+            title="Per-Flight Delay (Minutes, 5-min Buckets)"
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(grouped_df, use_container_width=True, hide_index=True)
+
+
+tabs(
+    {
+        "📊 Delay Insights": insights,
+        "📋 Delay Leaderboard": leaderboard,
+        "🔍 Delay Explorer": explorer,
+    },
+    key="delay_tab",
+)
@@ -0,0 +1,184 @@
+import numpy as np
+import streamlit as st
+import plotly.express as px
+
+from core.figures import figure
+from core.profiling import timed
+from core.routes import route_graph
+from core.sections import tabs
+from core.window import control
+
+st.title("🧭 Route Network")
+
+window = control()
+
+graph = route_graph()
+
+if not graph.route_count and window.bounded:
+    st.info(f"No routes in the time window ({window.label()}).")
+    st.stop()
+
+if not graph.route_count:
+    st.info(
+        "No routes yet: the loaded flights record only one end of each trip "
+        "(origin or destination). Routes appear once flights carry both."
+    )
+    st.stop()
+
+routes_df = graph.routes()
+hubs_df = graph.hubs()
+
+# ================= KPIs =================
+busiest = graph.top_routes(1).iloc[0]
+
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Routes", graph.route_count)
+col2.metric(
+    "Connected Airports",
+    int(((hubs_df["outbound_routes"] + hubs_df["inbound_routes"]) > 0).sum()),
+)
+col3.metric(
+    "Busiest Route",
+    f"{busiest['origin_iata']} → {busiest['destination_iata']}",
+)
+col4.metric(
+    "Network Delay Rate (%)",
+    round(100 * routes_df["delayed"].sum() / routes_df["flights"].sum(), 2),
+)
+
+# ================= TABS =================
+# Each tab is built only while it is open (core.sections).
+
+
+# ======================================================
+# TAB 1 : TOP ROUTES
+# ======================================================
+def top_routes():
+    colA, colB, colC = st.columns(3)
+    rank_by = colA.selectbox(
+        "Rank by",
+        ["flights", "delay_rate_pct", "avg_delay_min", "cancelled"],
+        key="top_routes.rank_by",
+    )
+    min_flights = colB.number_input(
+        "Minimum flights", min_value=1, value=5, key="top_routes.min_flights"
+    )
+    top_n = colC.slider("Routes", 5, 50, 20, key="top_routes.top_n")
+
+    top_df = graph.top_routes(top_n, by=rank_by, min_flights=min_flights)
+    top_df["route"] = top_df["origin_iata"] + " → " + top_df["destination_iata"]
+
+    with timed("Top Routes"):
+        fig = figure(
+            px.bar,
+            top_df,
+            x="route",
+            y=rank_by,
+            hover_data=["flights", "delay_rate_pct", "avg_delay_min"],
+            title=f"Top {top_n} Routes by {rank_by.replace('_', ' ')}",
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(top_df.drop(columns="route"), use_container_width=True)
+
+
+# ======================================================
+# TAB 2 : ROUTE HEATMAP (BUSIEST HUBS)
+# ======================================================
+def heatmap():
+    hub_count = st.slider("Hubs", 5, 40, 15, key="heatmap.hubs")
+    top_hubs = hubs_df["iata_code"].head(hub_count).tolist()
+    among = routes_df[
+        routes_df["origin_iata"].isin(top_hubs)
+        & routes_df["destination_iata"].isin(top_hubs)
+    ]
+    matrix = (
+        among.pivot(
+            index="origin_iata", columns="destination_iata", values="flights"
+        )
+        .reindex(index=top_hubs, columns=top_hubs)
+    )
+
+    with timed("Route Traffic Between the Busiest Hubs"):
+        fig = figure(
+            px.imshow,
+            matrix,
+            labels={"x": "Destination", "y": "Origin", "color": "Flights"},
+            color_continuous_scale="Blues",
+            title="Route Traffic Between the Busiest Hubs",
+            height=600,
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+
+# ======================================================
+# TAB 3 : HUBS AND CONNECTIVITY
+# ======================================================
+def hubs():
+    labels = graph.components()
+    sizes = np.bincount(labels, minlength=graph.airport_count)
+    connected = sizes[labels] > 1
+
+    colA, colB = st.columns(2)
+    colA.metric("Connected Groups", int(len(np.unique(labels[connected]))))
+    colB.metric("Largest Group (Airports)", int(sizes.max()))
+
+    with timed("Hub Centrality"):
+        fig = figure(
+            px.bar,
+            hubs_df.head(20),
+            x="iata_code",
+            y="centrality",
+            hover_data=["outbound_routes", "inbound_routes", "departures",
+                        "arrivals"],
+            title="Hub Centrality (Traffic-Weighted PageRank)",
+        )
+        st.plotly_chart(fig, use_container_width=True)
+
+    st.dataframe(hubs_df, use_container_width=True, hide_index=True)
+
+
+# ======================================================
+# TAB 4 : REACHABILITY
+# ======================================================
+def reachability():
+    codes = hubs_df["iata_code"].tolist()
+
+    # The airports follow the time window, and so do the picks.
+    picks = f"reachability.{window.first}.{window.last}"
+
+    colA, colB = st.columns(2)
+    origin = colA.selectbox("From", codes, key=f"{picks}.origin")
+    max_hops = colB.slider(
+        "Maximum hops", 1, 6, 2, key="reachability.max_hops"
+    )
+
+    reach_df = graph.reachable(origin, max_hops)
+    by_hops = reach_df["hops"].value_counts().sort_index()
+
+    col1, col2 = st.columns(2)
+    col1.metric("Direct Destinations", int(by_hops.get(1, 0)))
+    col2.metric(f"Reachable within {max_hops} Hops", len(reach_df))
+
+    destination = st.selectbox(
+        "Fewest-stop itinerary to", [c for c in codes if c != origin],
+        key=f"{picks}.destination.{origin}",
+    )
+    path = graph.path(origin, destination) if destination else None
+    if path:
+        st.success(" → ".join(path) + f"  ({len(path) - 1} hops)")
+    elif destination:
+        st.warning(f"No route from {origin} to {destination}.")
+
+    st.dataframe(reach_df, use_container_width=True, hide_index=True)
+
+
+tabs(
+    {
+        "🏆 Top Routes": top_routes,
+        "🔥 Route Heatmap": heatmap,
+        "🕸️ Hubs": hubs,
+        "🔎 Reachability": reachability,
+    },
+    key="routes_tab",
+)
@@ -0,0 +1,181 @@
+import json
+
+import pandas as pd
+import streamlit as st
+
+from core import profiling
+from core.figures import get_cache
+from core.sections import tabs
+
+st.title("🔬 Performance")
+
+# ======================================================
+# RECORDING SWITCH (OPT-IN, THIS SESSION ONLY)
+# ======================================================
+def _toggle():
+    st.session_state[profiling.SESSION_KEY] = st.session_state["_profiling"]
+
+
+st.toggle(
+    "Record query and chart timings for this session",
+    value=profiling.enabled(),
+    key="_profiling",
+    on_change=_toggle,
+    disabled=profiling.ALWAYS,
+    help="Timings stay in this browser session. "
+         "AIR_TRACKER_PROFILE=1 turns recording on for every session.",
+)
+
+events = profiling.events()
+if not events:
+    st.info(
+        "Nothing recorded yet. Turn recording on, then open the other pages."
+    )
+    st.stop()
+
+df = pd.DataFrame(events, columns=profiling.FIELDS)
+df["page"] = df["page"].fillna("(other)")
+queries = df[df["kind"] == "query"]
+charts = df[df["kind"] == "chart"]
+sections = df[df["kind"] == "section"]
+
+# ================= KPIs =================
+col1, col2, col3, col4 = st.columns(4)
+col1.metric("Queries", len(queries))
+col2.metric("Query Time (ms)", round(queries["ms"].sum(), 1))
+col3.metric(
+    "Cache Hit Rate (%)",
+    round(100 * (queries["cache"] == "hit").mean(), 1) if len(queries) else 0,
+)
+col4.metric(
+    "Full-Scan Queries",
+    queries.loc[queries["full_scan"].eq(True), "fingerprint"].nunique(),
+)
+
+# Each tab is built only while it is open (core.sections).
+
+
+# ======================================================
+# TAB 1 : PER PAGE
+# ======================================================
+def by_page():
+    per_page = (
+        df.groupby(["page", "kind"])["ms"]
+        .agg(events="size", total_ms="sum", max_ms="max")
+        .reset_index()
+    )
+    st.dataframe(per_page.round(2), use_container_width=True)
+
+
+# ======================================================
+# TAB 2 : PER QUERY (SLOWEST FIRST)
+# ======================================================
+def by_query():
+    if queries.empty:
+        st.info("No queries recorded.")
+    else:
+        per_query = (
+            queries.groupby(["name", "fingerprint"])
+            .agg(
+                calls=("ms", "size"),
+                misses=("cache", lambda c: int((c == "miss").sum())),
+                total_ms=("ms", "sum"),
+                mean_ms=("ms", "mean"),
+                max_ms=("ms", "max"),
+                rows=("rows", "max"),
+                backend=("backend", "first"),
+                full_scan=("full_scan", "max"),
+            )
+            .sort_values("total_ms", ascending=False)
+            .reset_index()
+        )
+        st.dataframe(per_query.round(2), use_container_width=True)
+
+        st.subheader("Query Plan")
+        latest = queries.drop_duplicates("fingerprint", keep="last")
+        choice = st.selectbox(
+            "Query",
+            latest.index,
+            format_func=lambda i: (
+                f"{'⚠️ ' if latest.at[i, 'full_scan'] else ''}"
+                f"{latest.at[i, 'name']} ({latest.at[i, 'fingerprint']})"
+            ),
+        )
+        st.code(latest.at[choice, "sql"], language="sql")
+        plan = latest.at[choice, "plan"]
+        if plan:
+            st.code("\n".join(plan), language="text")
+            for scan in profiling.full_scans(plan):
+                st.warning(f"Full table scan: {scan}")
+        else:
+            st.caption("No plan recorded (served by DuckDB).")
+
+
+# ======================================================
+# TAB 3 : CHART BLOCKS AND TABS
+# ======================================================
+def blocks():
+    if charts.empty:
+        st.info("No charts recorded.")
+    else:
+        by_chart = (
+            charts.groupby(["page", "name"])["ms"]
+            .agg(renders="size", total_ms="sum", mean_ms="mean", max_ms="max")
+            .sort_values("total_ms", ascending=False)
+            .reset_index()
+        )
+        st.dataframe(by_chart.round(2), use_container_width=True)
+
+    # Shared by every session of this server process (core.figures).
+    cache = get_cache()
+    st.caption(
+        f"Figure cache: {len(cache)} figures, "
+        f"{cache.size / 2**20:.1f} of {cache.budget / 2**20:.0f} MiB, "
+        f"{cache.hits} hits, {cache.misses} misses, "
+        f"{cache.evictions} evicted since the server started."
+    )
+
+    # One event per build of a tab, queries and charts included.
+    if not sections.empty:
+        st.subheader("Tabs Built")
+        by_section = (
+            sections.groupby(["page", "name"])["ms"]
+            .agg(builds="size", total_ms="sum", mean_ms="mean", max_ms="max")
+            .sort_values("total_ms", ascending=False)
+            .reset_index()
+        )
+        st.dataframe(by_section.round(2), use_container_width=True)
+
+
+# ======================================================
+# TAB 4 : EXPORT
+# ======================================================
+def export():
+    st.caption(f"{len(df)} events recorded in this session.")
+    colA, colB, colC = st.columns(3)
+    colA.download_button(
+        "Download CSV",
+        df.assign(plan=df["plan"].map(
+            lambda p: " | ".join(p) if isinstance(p, list) else p
+        )).to_csv(index=False),
+        file_name="air_tracker_profile.csv",
+        mime="text/csv",
+    )
+    colB.download_button(
+        "Download JSON",
+        json.dumps(events, indent=1, default=str),
+        file_name="air_tracker_profile.json",
+        mime="application/json",
+    )
+    colC.button("Clear", on_click=profiling.clear)
+
+
+tabs(
+    {
+        "📄 By Page": by_page,
+        "🗄️ By Query": by_query,
+        "📊 Charts": blocks,
+        "📤 Export": export,
+    },
+    key="performance_tab",
+)
@@ -0,0 +1,34 @@
+"""Shared fixtures: small synthetic databases loaded like real data."""
+import sys
+from pathlib import Path
+
+import pytest
+
+APP_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(APP_DIR))
+
+from benchmarks.synth import generate  # noqa: E402
+from core import db  # noqa: E402
+from core.ingest import ingest  # noqa: E402
+
+
+def quiet(*args):
+    pass
+
+
+@pytest.fixture(scope="session")
+def synthetic_csvs(tmp_path_factory):
+    """data/*.csv-shaped files: 3,000 flights over 10 days, 40 airports."""
+    return generate(
+        tmp_path_factory.mktemp("synth"), flights=3_000, airport_count=40,
+        days=10, log=quiet,
+    )
+
+
+@pytest.fixture
+def synthetic_db(synthetic_csvs, tmp_path):
+    """A fresh database loaded from the synthetic CSVs by core.ingest."""
+    conn = db.connect(tmp_path / "synthetic.db")
+    ingest(conn, data_dir=synthetic_csvs, parquet=False, log=quiet)
+    yield conn
+    conn.close()
@@ -0,0 +1,62 @@
+import subprocess
+import sys
+
+import pytest
+
+from conftest import APP_DIR
+
+pa = pytest.importorskip("pyarrow")
+
+from core.api import _arrow_rows  # noqa: E402
+
+
+def test_api_does_not_import_streamlit():
+    code = "import sys, core.api; print('streamlit' in sys.modules)"
+    out = subprocess.run(
+        [sys.executable, "-c", code], cwd=APP_DIR, check=True,
+        capture_output=True, text=True,
+    )
+    assert out.stdout.strip() == "False"
+
+
+def _read(columns, batches):
+    body = b"".join(_arrow_rows(columns, batches))
+    return pa.ipc.open_stream(body).read_all()
+
+
+def test_arrow_widens_int_to_double_across_batches():
+    table = _read(["a"], [[(1,), (2,)], [(2.5,)]])
+    assert table.schema.field("a").type == pa.float64()
+    assert table.column("a").to_pylist() == [1.0, 2.0, 2.5]
+
+
+def test_arrow_types_a_column_null_in_the_first_batch_from_later_ones():
+    table = _read(["a", "b"], [[(None, "x")], [(7, "y")]])
+    assert table.schema.field("a").type == pa.float64()
+    assert table.column("a").to_pylist() == [None, 7.0]
+
+
+def test_arrow_writes_each_batch_as_it_is_fetched():
+    fetched = []
+
+    def batches():
+        for n in range(3):
+            fetched.append(n)
+            yield [(n, f"row {n}")]
+
+    chunks = _arrow_rows(["a", "b"], batches())
+    next(chunks)
+    assert fetched == [0]
+    rest = list(chunks)
+    assert fetched == [0, 1, 2] and len(rest) == 3
+
+
+def test_arrow_falls_back_to_string_for_mixed_columns():
+    table = _read(["a"], [[(1,), ("BLR",)], [(None,)]])
+    assert table.column("a").to_pylist() == ["1", "BLR", None]
+
+
+def test_arrow_empty_result_keeps_its_columns():
+    table = _read(["a", "b"], [])
+    assert table.num_rows == 0
+    assert table.schema.names == ["a", "b"]
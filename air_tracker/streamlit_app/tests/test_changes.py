@@ -0,0 +1,30 @@
+from core import changes, columnar, cube, sketch
+from core.rollup import rollup
+
+
+def _log_rows(conn):
+    return conn.execute("SELECT COUNT(*) FROM flight_changes").fetchone()[0]
+
+
+def test_released_consumer_no_longer_holds_the_log(synthetic_db):
+    conn = synthetic_db
+    # A Parquet export ran once, then loads went on without it.
+    conn.execute("BEGIN")
+    _, cursor = changes.pending(conn, columnar.CONSUMER)
+    changes.commit(conn, columnar.CONSUMER, cursor)
+    conn.commit()
+
+    conn.execute(
+        "UPDATE flight_facts SET actual_time = NULL WHERE flight_id IN "
+        "(SELECT flight_id FROM flight_facts LIMIT 20)"
+    )
+    conn.commit()
+    rollup(conn)
+    cube.refresh(conn)
+    sketch.refresh(conn)
+    assert _log_rows(conn) > 0
+
+    columnar.release(conn)
+    assert _log_rows(conn) == 0
+    partitions, _ = changes.pending(conn, columnar.CONSUMER)
+    assert partitions is None  # the next export is a full one
@@ -0,0 +1,39 @@
+import os
+
+from core import db
+from core.migrations import LATEST_VERSION, migrate
+
+
+def _touch(path):
+    # Writes inside one clock tick can leave the mtime as it was.
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+
+def test_version_key_follows_the_file_while_no_table_is_versioned(tmp_path):
+    path = tmp_path / "versions.db"
+    conn = db.connect(path)
+    migrate(conn)
+    assert conn.execute("SELECT COUNT(*) FROM table_version").fetchone() == (0,)
+
+    before = db.version_key(conn, ("airport",), path)
+    # A writer that does not bump any version.
+    conn.execute("INSERT INTO airport (iata_code) VALUES ('AAA')")
+    conn.commit()
+    _touch(path)
+    assert db.version_key(conn, ("airport",), path) != before
+
+
+def test_version_key_follows_only_its_tables_once_versioned(tmp_path):
+    path = tmp_path / "versions.db"
+    conn = db.connect(path)
+    migrate(conn)
+    db.bump_data_version(conn, "airport")
+    conn.commit()
+    assert db.version_key(conn, ("airport",), path) == (LATEST_VERSION, 1)
+
+    db.bump_data_version(conn, "aircraft")
+    conn.commit()
+    _touch(path)
+    assert db.version_key(conn, ("airport",), path) == (LATEST_VERSION, 1)
+    assert db.version_key(conn, ("aircraft",), path) == (LATEST_VERSION, 1)
@@ -0,0 +1,100 @@
+import asyncio
+import csv
+import json
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("aiohttp")
+
+from core import db  # noqa: E402
+from core.fetch import AIRCRAFT, fetch_all  # noqa: E402
+from core.stub_api import make_server  # noqa: E402
+
+with open(db.DATA_DIR / "aircraft.csv", newline="", encoding="utf-8") as f:
+    REGISTRATIONS = [row["registration"] for row in csv.DictReader(f)][:30]
+
+
+@pytest.fixture
+def stub():
+    """Start a core.stub_api server; returns (base_url, request times)."""
+    servers = []
+
+    def start(fail_rate=0.0):
+        server = make_server(port=0, fail_rate=fail_rate)
+        hits = []
+
+        class Counting(server.RequestHandlerClass):
+            def do_GET(self):
+                hits.append(time.monotonic())
+                super().do_GET()
+
+        server.RequestHandlerClass = Counting
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_port}", hits
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def _fetch(keys, base_url, **kwargs):
+    return asyncio.run(fetch_all(keys, AIRCRAFT, base_url=base_url, **kwargs))
+
+
+def test_fetch_retries_failures_within_the_rate_limit(stub):
+    base_url, hits = stub(fail_rate=0.3)
+    rate = 10.0
+    results = _fetch(REGISTRATIONS, base_url, rate=rate, max_retries=8)
+
+    assert all(results[reg]["registration"] == reg for reg in REGISTRATIONS)
+    assert len(hits) > len(REGISTRATIONS)  # some 429/503s were retried
+    # The bucket starts full (``rate`` tokens) and refills at ``rate``/s.
+    assert len(hits) <= rate + rate * (hits[-1] - hits[0]) + 1
+
+
+def test_fetch_resume_skips_checkpointed_keys(stub, tmp_path):
+    base_url, hits = stub()
+    checkpoint = tmp_path / "aircraft.jsonl"
+    first = _fetch([*REGISTRATIONS[:5], "XX-NONE"], base_url,
+                   checkpoint=checkpoint)
+    assert first["XX-NONE"] is None  # a 404, checkpointed as done
+    assert len(hits) == 6
+
+    resumed = _fetch([*REGISTRATIONS[:8], "XX-NONE"], base_url,
+                     checkpoint=checkpoint)
+    assert len(hits) == 6 + 3
+    assert resumed["XX-NONE"] is None
+    assert all(resumed[reg] is not None for reg in REGISTRATIONS[:8])
+
+
+def test_fetch_resume_retries_keys_that_failed_transiently(stub, tmp_path):
+    checkpoint = tmp_path / "aircraft.jsonl"
+    down, _ = stub(fail_rate=1.0)
+    assert _fetch(["VT-TNM"], down, checkpoint=checkpoint,
+                  max_retries=1) == {"VT-TNM": None}
+    # An entry a run before this fix would have written.
+    with open(checkpoint, "a", encoding="utf-8") as f:
+        f.write(json.dumps({"key": "VT-EXL", "status": 503, "data": None}))
+        f.write("\n")
+
+    healthy, hits = stub()
+    resumed = _fetch(["VT-TNM", "VT-EXL"], healthy, checkpoint=checkpoint)
+    assert len(hits) == 2
+    assert resumed["VT-TNM"]["registration"] == "VT-TNM"
+    assert resumed["VT-EXL"]["registration"] == "VT-EXL"
+
+
+def test_fetch_carries_on_after_connection_failures(tmp_path):
+    checkpoint = tmp_path / "aircraft.jsonl"
+    seen = []
+    results = _fetch(
+        ["VT-TNM", "VT-EXL"], "http://127.0.0.1:1", checkpoint=checkpoint,
+        max_retries=0, progress=lambda *args: seen.append(args),
+    )
+    assert results == {"VT-TNM": None, "VT-EXL": None}
+    assert [done for done, *_ in seen] == [1, 2]
+    assert checkpoint.read_text() == ""
@@ -0,0 +1,10 @@
+from statistics import median
+
+from core.rollup import summarize
+
+
+def test_summarize_reads_the_median_off_the_sorted_run():
+    for delays in ([], [7], [0, 3], [0, 2, 2, 9], [1, 4, 15, 30, 61]):
+        rows = [("AI 1", 0, None)] + [("AI 1", 0, d) for d in delays]
+        *_, med, _ = summarize(rows)
+        assert med == (round(median(delays)) if delays else None)
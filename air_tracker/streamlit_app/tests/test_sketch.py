@@ -0,0 +1,30 @@
+from core import sketch
+
+LEVELS = ["all", "day", "week", "origin", "airline", "origin-day"]
+
+
+def _check(conn):
+    lines = []
+    failures = sketch.check(conn, log=lines.append)
+    return failures, [line.split()[0] for line in lines]
+
+
+def test_sketch_quantiles_stay_within_alpha_at_every_level(synthetic_db):
+    failures, levels = _check(synthetic_db)
+    assert failures == []
+    assert levels == LEVELS
+
+
+def test_sketch_stays_within_alpha_after_an_incremental_refresh(synthetic_db):
+    conn = synthetic_db
+    # Drop the actual times of some flights; their days are rebuilt from
+    # the change log.
+    conn.execute(
+        "UPDATE flight_facts SET actual_time = NULL, actual_epoch = NULL "
+        "WHERE flight_id % 7 = 0"
+    )
+    conn.commit()
+    assert sketch.refresh(conn) > 0
+    failures, levels = _check(conn)
+    assert failures == []
+    assert levels == LEVELS